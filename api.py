@@ -2,17 +2,29 @@
 FastAPI service for rule violation detection.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from starlette.requests import ClientDisconnect
+from typing import AsyncIterator, Callable, List, Dict, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+import asyncio
+import json
 import numpy as np
 import logging
 
 from src.config.model_config import Config
+from src.models.embedding_cache import EmbeddingCache
 from src.models.embedding_model import EmbeddingModel
+from src.models.length_batching import padding_ratio
+from src.inference.admission import AdmissionController, QueueFullError
+from src.inference.batching import DeadlineExceededError, MicroBatcher
+from src.inference.centroid_cache import CentroidCache
 from src.inference.predictor import ViolationPredictor
 from src.data.preprocessor import TextPreprocessor
 from src.utils.logging_utils import setup_logging
+from src.utils.metrics import REGISTRY
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -27,6 +39,10 @@ app = FastAPI(
 model_wrapper = None
 predictor = None
 preprocessor = None
+batcher = None
+encode_executor = None
+admission = None
+centroid_cache = None
 config = None
 
 
@@ -47,6 +63,62 @@ class PredictionResponse(BaseModel):
     confidence: float
 
 
+class InvalidRequestError(ValueError):
+    """Raised for a request that is well-formed but cannot be scored."""
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body iterator is still reading the request body.
+    
+    The stock implementation polls ``receive`` for disconnects while streaming,
+    which would swallow request body chunks that are still being uploaded. Here
+    the disconnect listener only starts once ``upload_done`` is set; until then
+    the body iterator sees a disconnect itself through ``Request.stream``.
+    ``on_close`` runs however the response ends, including when the client is
+    gone before the body iterator has started.
+    """
+    
+    def __init__(self, content, upload_done: asyncio.Event, on_close: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.upload_done = upload_done
+        self.on_close = on_close
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            spec_version = tuple(map(int, scope.get("asgi", {}).get("spec_version", "2.0").split(".")))
+            if spec_version >= (2, 4):
+                # The server raises OSError from send once the client is gone
+                try:
+                    await self.stream_response(send)
+                except OSError:
+                    raise ClientDisconnect()
+            else:
+                await self._stream_until_disconnect(receive, send)
+        finally:
+            await self.body_iterator.aclose()
+            self.on_close()
+        
+        if self.background is not None:
+            await self.background()
+    
+    async def _stream_until_disconnect(self, receive, send):
+        async def listen():
+            await self.upload_done.wait()
+            await self.listen_for_disconnect(receive)
+        
+        streaming = asyncio.ensure_future(self.stream_response(send))
+        listener = asyncio.ensure_future(listen())
+        try:
+            await asyncio.wait({streaming, listener}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (streaming, listener):
+                task.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+            await asyncio.gather(streaming, return_exceptions=True)
+        if not streaming.cancelled():
+            streaming.result()
+
+
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
@@ -57,17 +129,31 @@ class HealthResponse(BaseModel):
 @app.on_event("startup")
 async def load_model():
     """Load model on startup."""
-    global model_wrapper, predictor, preprocessor, config
+    global model_wrapper, predictor, preprocessor, batcher, encode_executor, admission, centroid_cache, config
     
     try:
         logger.info("Loading model and initializing components...")
         config = Config()
         
+        # Optional cache for hot texts (bot messages, reposted spam)
+        embedding_cache = None
+        if config.inference.embedding_cache_mb > 0:
+            embedding_cache = EmbeddingCache(
+                max_bytes=int(config.inference.embedding_cache_mb * 1024 * 1024),
+                ttl_seconds=config.inference.embedding_cache_ttl_s,
+            )
+        
         # Load model
         model_wrapper = EmbeddingModel(
             model_path=f"{config.data.output_dir}/final",
             max_seq_length=config.model.max_seq_length,
-            use_fp16=config.model.use_fp16
+            use_fp16=config.model.use_fp16,
+            cache=embedding_cache,
+            backend=config.model.backend,
+            onnx_dir=config.model.onnx_dir,
+            quantize=config.model.onnx_quantize,
+            num_threads=config.model.num_threads,
+            max_tokens_per_batch=config.inference.max_tokens_per_batch,
         )
         model_wrapper.load_model()
         
@@ -75,12 +161,56 @@ async def load_model():
         predictor = ViolationPredictor(config.inference.distance_metric)
         preprocessor = TextPreprocessor()
         
+        # Coalesce texts from concurrent requests into shared forward passes, run off the event loop
+        encode_executor = ThreadPoolExecutor(
+            max_workers=config.inference.encode_workers, thread_name_prefix="encode"
+        )
+        batcher = MicroBatcher(
+            lambda texts: model_wrapper.encode(texts, batch_size=config.inference.batch_size, show_progress_bar=False),
+            max_batch_size=config.inference.max_batch_size,
+            max_wait_ms=config.inference.max_batch_wait_ms,
+            executor=encode_executor,
+            max_concurrent_batches=config.inference.encode_workers,
+        )
+        batcher.start()
+        
+        admission = AdmissionController(
+            max_depth=config.inference.max_queue_depth,
+            retry_after_s=config.inference.retry_after_s,
+        )
+        
+        centroid_cache = CentroidCache(
+            max_entries=config.inference.centroid_cache_max_entries,
+            max_bytes=int(config.inference.centroid_cache_max_mb * 1024 * 1024),
+        )
+        
+        # Read by the gauges below; registered here so /metrics has their HELP before the first encode
+        REGISTRY.counter("texts_encoded_total", "Texts run through the transformer")
+        REGISTRY.counter("tokens_total", "Non-padding tokens run through the transformer")
+        REGISTRY.counter("padding_tokens_total", "Padding tokens run through the transformer")
+        REGISTRY.histogram("model_forward_seconds", "Transformer forward time per batch")
+        
+        # Gauges sampled at scrape time
+        REGISTRY.gauge("admission_queue_depth", lambda: admission.depth, "Requests currently admitted")
+        REGISTRY.gauge("batcher_pending_texts", lambda: batcher.pending_texts, "Texts waiting for a batch")
+        REGISTRY.gauge("model_texts_per_second", _model_throughput, "Texts encoded per second of forward time")
+        REGISTRY.gauge("padding_ratio", _padding_ratio, "Fraction of encoded tokens that are padding")
+        
         logger.info("Model loaded successfully")
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
         raise
 
 
+@app.on_event("shutdown")
+async def stop_batcher():
+    """Stop the micro-batcher and its executor on shutdown."""
+    if batcher:
+        await batcher.stop()
+    if encode_executor:
+        encode_executor.shutdown(wait=True)
+
+
 @app.get("/", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
@@ -91,89 +221,345 @@ async def health_check():
     )
 
 
+def _model_throughput() -> float:
+    forward = REGISTRY.histogram("model_forward_seconds")
+    texts = REGISTRY.counter("texts_encoded_total").value
+    return texts / forward.sum if forward.sum > 0 else 0.0
+
+
+def _padding_ratio() -> float:
+    real = REGISTRY.counter("tokens_total").value
+    padding = REGISTRY.counter("padding_tokens_total").value
+    return padding_ratio(real, real + padding)
+
+
+@contextmanager
+def _instrumented(endpoint: str):
+    """Count and time a request to an endpoint."""
+    REGISTRY.counter("requests_total", "Requests received", labels={"endpoint": endpoint}).inc()
+    with REGISTRY.timer("request_seconds", "End-to-end request latency", labels={"endpoint": endpoint}):
+        yield
+
+
+@contextmanager
+def _admitted():
+    """Hold an admission slot, turning a full queue into 503 + Retry-After."""
+    try:
+        with admission.admit():
+            yield
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503, detail="Server overloaded, retry later", headers={"Retry-After": str(e.retry_after_s)}
+        )
+
+
+def _request_deadline(deadline_ms: Optional[float]) -> Optional[float]:
+    """Translate a relative deadline (header or config default) into event-loop time."""
+    if deadline_ms is None:
+        deadline_ms = config.inference.request_deadline_ms
+    if deadline_ms is None:
+        return None
+    return asyncio.get_running_loop().time() + deadline_ms / 1000.0
+
+
+def _clean_request(request: PredictionRequest) -> Tuple[str, List[str], List[str]]:
+    """Clean the query text and examples of a request."""
+    if not request.positive_examples or not request.negative_examples:
+        raise InvalidRequestError("positive_examples and negative_examples must not be empty")
+    
+    with REGISTRY.timer("clean_text_seconds", "Text cleaning time per request"):
+        clean_text = preprocessor.clean_text(request.text)
+        clean_positives = [preprocessor.clean_text(ex) for ex in request.positive_examples]
+        clean_negatives = [preprocessor.clean_text(ex) for ex in request.negative_examples]
+    return clean_text, clean_positives, clean_negatives
+
+
+def _normalized_centroid(embeddings: np.ndarray) -> np.ndarray:
+    """Mean of the given embeddings, projected back onto the unit sphere."""
+    with REGISTRY.timer("centroid_seconds", "Centroid computation time"):
+        centroid = np.mean(embeddings, axis=0)
+        return centroid / np.linalg.norm(centroid)
+
+
+def _build_responses(
+    requests: List[PredictionRequest], text_embs: np.ndarray, pos_centroids: np.ndarray, neg_centroids: np.ndarray
+) -> List[PredictionResponse]:
+    """Score row-aligned query embeddings and centroids in one pass."""
+    with REGISTRY.timer("scoring_seconds", "Scoring time per scoring pass"):
+        scores, pos_dists, neg_dists = predictor.score_embeddings(text_embs, pos_centroids, neg_centroids)
+        
+        # Confidence: normalized distance difference
+        max_dists = np.maximum(pos_dists, neg_dists)
+        confidences = np.divide(np.abs(scores), max_dists, out=np.zeros_like(scores), where=max_dists > 0)
+    
+    return [
+        PredictionResponse(
+            text=request.text,
+            rule=request.rule,
+            violation_score=float(score),
+            is_violation=bool(score > 0),
+            confidence=float(confidence)
+        )
+        for request, score, confidence in zip(requests, scores, confidences)
+    ]
+
+
+async def _encode_unique(texts: List[str], deadline: Optional[float] = None) -> np.ndarray:
+    """Encode already-deduplicated texts in batcher-sized chunks."""
+    chunk_size = config.inference.max_batch_size
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    return np.vstack(await asyncio.gather(*(batcher.encode(chunk, deadline=deadline) for chunk in chunks)))
+
+
+async def _predict_many(
+    requests: List[PredictionRequest], deadline: Optional[float] = None
+) -> List[Union[PredictionResponse, Dict[str, str]]]:
+    """Score a list of requests with one deduplicated encode and one vectorized scoring pass.
+    
+    Failures are reported per item as ``{"error": ...}`` in the request's position.
+    """
+    results: List[Union[PredictionResponse, Dict[str, str]]] = [None] * len(requests)
+    prepared = []  # (position, clean text, centroid key)
+    centroids: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    uncached: Dict[str, Tuple[List[str], List[str]]] = {}
+    
+    for i, request in enumerate(requests):
+        try:
+            clean_text, clean_positives, clean_negatives = _clean_request(request)
+            key = centroid_cache.make_key(request.rule, clean_positives, clean_negatives)
+            if key not in centroids and key not in uncached:
+                cached = centroid_cache.get(key)
+                if cached is not None:
+                    centroids[key] = cached
+                else:
+                    uncached[key] = (clean_positives, clean_negatives)
+            prepared.append((i, clean_text, key))
+        except Exception as e:
+            logger.error(f"Error in batch prediction: {e}")
+            results[i] = {"error": str(e)}
+    
+    if not prepared:
+        return results
+    
+    # Deduplicate every text the batch needs: queries plus examples of uncached example sets
+    positions: Dict[str, int] = {}
+    unique_texts: List[str] = []
+    texts_needed = [text for _, text, _ in prepared]
+    for clean_positives, clean_negatives in uncached.values():
+        texts_needed.extend(clean_positives)
+        texts_needed.extend(clean_negatives)
+    for text in texts_needed:
+        if text not in positions:
+            positions[text] = len(unique_texts)
+            unique_texts.append(text)
+    
+    try:
+        embeddings = await _encode_unique(unique_texts, deadline=deadline)
+    except Exception as e:
+        logger.error(f"Error in batch prediction: {e}")
+        for i, _, _ in prepared:
+            results[i] = {"error": str(e)}
+        return results
+    
+    # One centroid pair per distinct example set
+    for key, (clean_positives, clean_negatives) in uncached.items():
+        pos_centroid = _normalized_centroid(embeddings[[positions[text] for text in clean_positives]])
+        neg_centroid = _normalized_centroid(embeddings[[positions[text] for text in clean_negatives]])
+        centroid_cache.put(key, pos_centroid, neg_centroid)
+        centroids[key] = (pos_centroid, neg_centroid)
+    
+    # Gather row-aligned query/centroid matrices and score them together
+    key_order = {key: j for j, key in enumerate(centroids)}
+    pos_matrix = np.stack([pos for pos, _ in centroids.values()])
+    neg_matrix = np.stack([neg for _, neg in centroids.values()])
+    
+    text_embs = embeddings[[positions[text] for _, text, _ in prepared]]
+    centroid_idx = np.array([key_order[key] for _, _, key in prepared])
+    
+    responses = _build_responses(
+        [requests[i] for i, _, _ in prepared], text_embs, pos_matrix[centroid_idx], neg_matrix[centroid_idx]
+    )
+    for (i, _, _), response in zip(prepared, responses):
+        results[i] = response
+    
+    return results
+
+
 @app.post("/predict", response_model=PredictionResponse)
-async def predict(request: PredictionRequest):
-    """Predict rule violation."""
+async def predict(request: PredictionRequest, x_deadline_ms: Optional[float] = Header(None)):
+    """Predict rule violation.
+    
+    An optional ``X-Deadline-Ms`` header bounds how long the request may wait for the model.
+    """
     if not model_wrapper:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
+    with _instrumented("/predict"), _admitted():
+        return await _predict_one(request, _request_deadline(x_deadline_ms))
+
+
+async def _predict_one(request: PredictionRequest, deadline: Optional[float]) -> PredictionResponse:
     try:
         # Preprocess text
-        clean_text = preprocessor.clean_text(request.text)
-        clean_positives = [preprocessor.clean_text(ex) for ex in request.positive_examples]
-        clean_negatives = [preprocessor.clean_text(ex) for ex in request.negative_examples]
+        clean_text, clean_positives, clean_negatives = _clean_request(request)
         
-        # Get embeddings
-        all_texts = [clean_text] + clean_positives + clean_negatives
-        embeddings = model_wrapper.encode(all_texts, batch_size=32)
+        # Reuse centroids for rule/example sets we have already seen
+        cache_key = centroid_cache.make_key(request.rule, clean_positives, clean_negatives)
+        cached = centroid_cache.get(cache_key)
         
-        # Split embeddings
-        text_emb = embeddings[0]
-        pos_embs = embeddings[1:1+len(clean_positives)]
-        neg_embs = embeddings[1+len(clean_positives):]
-        
-        # Calculate centroids
-        pos_centroid = np.mean(pos_embs, axis=0)
-        neg_centroid = np.mean(neg_embs, axis=0)
-        
-        # Normalize
-        pos_centroid /= np.linalg.norm(pos_centroid)
-        neg_centroid /= np.linalg.norm(neg_centroid)
-        
-        # Calculate distances
-        pos_dist = np.linalg.norm(text_emb - pos_centroid)
-        neg_dist = np.linalg.norm(text_emb - neg_centroid)
+        if cached is not None:
+            pos_centroid, neg_centroid = cached
+            text_emb = (await batcher.encode([clean_text], deadline=deadline))[0]
+        else:
+            # Get embeddings
+            all_texts = [clean_text] + clean_positives + clean_negatives
+            embeddings = await batcher.encode(all_texts, deadline=deadline)
+            
+            # Split embeddings
+            text_emb = embeddings[0]
+            pos_embs = embeddings[1:1+len(clean_positives)]
+            neg_embs = embeddings[1+len(clean_positives):]
+            
+            # Calculate normalized centroids
+            pos_centroid = _normalized_centroid(pos_embs)
+            neg_centroid = _normalized_centroid(neg_embs)
+            
+            centroid_cache.put(cache_key, pos_centroid, neg_centroid)
         
         # Score: positive if closer to violation examples
-        violation_score = float(neg_dist - pos_dist)
-        is_violation = violation_score > 0
-        
-        # Confidence: normalized distance difference
-        max_dist = max(pos_dist, neg_dist)
-        confidence = float(abs(violation_score) / max_dist) if max_dist > 0 else 0.0
-        
-        return PredictionResponse(
-            text=request.text,
-            rule=request.rule,
-            violation_score=violation_score,
-            is_violation=is_violation,
-            confidence=confidence
-        )
+        return _build_responses([request], text_emb[None, :], pos_centroid[None, :], neg_centroid[None, :])[0]
         
+    except InvalidRequestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/batch_predict")
-async def batch_predict(requests: List[PredictionRequest]):
-    """Batch prediction endpoint."""
+async def batch_predict(requests: List[PredictionRequest], x_deadline_ms: Optional[float] = Header(None)):
+    """Batch prediction endpoint.
+    
+    All requests share one deduplicated encode and one vectorized scoring pass.
+    """
     if not model_wrapper:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
-    results = []
-    for req in requests:
-        try:
-            result = await predict(req)
-            results.append(result)
-        except Exception as e:
-            logger.error(f"Error in batch prediction: {e}")
-            results.append({"error": str(e)})
+    with _instrumented("/batch_predict"), _admitted():
+        return await _predict_many(requests, _request_deadline(x_deadline_ms))
+
+
+def _to_dict(result: Union[PredictionResponse, Dict[str, str]]) -> Dict:
+    if isinstance(result, BaseModel):
+        return result.model_dump() if hasattr(result, "model_dump") else result.dict()
+    return result
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[bytes]:
+    """Yield newline-delimited records from the request body as it arrives."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def _score_window(window: List[Tuple[int, Union[PredictionRequest, str]]], x_deadline_ms: Optional[float]) -> bytes:
+    """Score one window of parsed lines and serialize the results as NDJSON."""
+    valid = [(index, item) for index, item in window if isinstance(item, PredictionRequest)]
+    results = dict(zip(
+        (index for index, _ in valid),
+        await _predict_many([item for _, item in valid], _request_deadline(x_deadline_ms)) if valid else [],
+    ))
     
-    return results
+    lines = []
+    for index, item in window:
+        result = results[index] if index in results else {"error": item}
+        lines.append(json.dumps({"index": index, **_to_dict(result)}))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+@app.post("/stream_predict")
+async def stream_predict(request: Request, x_deadline_ms: Optional[float] = Header(None)):
+    """Streaming prediction endpoint.
+    
+    Accepts an NDJSON body (one PredictionRequest per line) and streams NDJSON
+    results back in input order, each tagged with its zero-based line ``index``.
+    Input is scored in windows of ``stream_window_size`` lines, so memory stays
+    flat regardless of body size and results start before the upload finishes.
+    """
+    if not model_wrapper:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    
+    # Hold one admission slot for the lifetime of the stream
+    slot = ExitStack()
+    slot.enter_context(_instrumented("/stream_predict"))
+    try:
+        slot.enter_context(_admitted())
+    except HTTPException:
+        slot.close()
+        raise
+    
+    window_size = config.inference.stream_window_size
+    upload_done = asyncio.Event()
+    
+    async def results() -> AsyncIterator[bytes]:
+        window: List[Tuple[int, Union[PredictionRequest, str]]] = []
+        index = 0
+        async for line in _iter_lines(request):
+            if not line.strip():
+                continue
+            try:
+                window.append((index, PredictionRequest(**json.loads(line))))
+            except Exception as e:
+                window.append((index, f"Invalid request line: {e}"))
+            index += 1
+            
+            if len(window) >= window_size:
+                yield await _score_window(window, x_deadline_ms)
+                window = []
+        upload_done.set()
+        
+        if window:
+            yield await _score_window(window, x_deadline_ms)
+    
+    # The response releases the slot, even if the client leaves before the first chunk
+    return DuplexStreamingResponse(
+        results(), upload_done=upload_done, on_close=slot.close, media_type="application/x-ndjson"
+    )
 
 
 @app.get("/metrics")
-async def get_metrics():
-    """Get model metrics and statistics."""
+async def get_metrics(format: str = "json"):
+    """Get model metrics and statistics.
+    
+    ``?format=prometheus`` returns the stage histograms and counters in the
+    Prometheus text exposition format.
+    """
     if not model_wrapper:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
+    if format == "prometheus":
+        return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+    
     return {
         "model_path": config.data.output_dir,
         "max_seq_length": config.model.max_seq_length,
         "embedding_dim": config.model.embedding_dim,
         "distance_metric": config.inference.distance_metric,
+        "max_batch_size": config.inference.max_batch_size,
+        "max_batch_wait_ms": config.inference.max_batch_wait_ms,
+        "centroid_cache": centroid_cache.stats(),
+        "embedding_cache": model_wrapper.cache.stats() if model_wrapper.cache else None,
+        "admission": admission.stats(),
+        "pending_texts": batcher.pending_texts,
+        "expired_requests": batcher.expired,
+        "stages": REGISTRY.snapshot(),
     }
 
 
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Scaling of multi-process CPU data-parallel training.
+
+Builds a tiny randomly initialised BERT (vocabulary from the synthetic data, so no
+download is needed), then trains it on the same synthetic triplets with 1, 2, 4, ...
+gloo ranks and reports job-wide tokens/sec and the speedup over one process. Each
+run splits the machine's cores evenly between its ranks.
+
+    python benchmarks/ddp_scaling.py --nproc 1 2 4 --rows 4000
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.append(".")
+
+from benchmarks.synthetic import make_jigsaw_frame
+from config.model_config import TrainingConfig
+from src.data.triplet_dataset import TripletDatasetCreator
+from src.models import distributed
+from src.models.embedding_model import EmbeddingModel
+from src.models.trainer import ModelTrainer
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+
+
+def build_tiny_model(model_dir: str, texts, hidden_size: int, layers: int, max_seq_length: int):
+    """Save a random BERT and a word-level vocabulary of ``texts`` to ``model_dir``."""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    words = sorted({word for text in texts for word in text.lower().split()})
+    with open(os.path.join(model_dir, "vocab.txt"), "w") as f:
+        f.write("\n".join(SPECIAL_TOKENS + words))
+    BertTokenizerFast(os.path.join(model_dir, "vocab.txt")).save_pretrained(model_dir)
+
+    config = BertConfig(
+        vocab_size=len(SPECIAL_TOKENS) + len(words),
+        hidden_size=hidden_size,
+        num_hidden_layers=layers,
+        num_attention_heads=max(1, hidden_size // 32),
+        intermediate_size=hidden_size * 4,
+        max_position_embeddings=max_seq_length,
+    )
+    BertModel(config).save_pretrained(model_dir)
+
+
+def train_rank(model_dir: str, dataset_dir: str, config: TrainingConfig, max_seq_length: int, result_path: str):
+    """Body of every rank: train on the shared dataset; rank 0 records the throughput."""
+    from datasets import load_from_disk
+
+    logging.disable(logging.INFO)
+    model = EmbeddingModel(model_dir, max_seq_length=max_seq_length, use_fp16=False).load_model()
+    trainer = ModelTrainer(model, config)
+    with tempfile.TemporaryDirectory() as output_dir:
+        trainer.train(load_from_disk(dataset_dir), output_dir)
+
+    if distributed.is_main_process():
+        with open(result_path, "w") as f:
+            json.dump(trainer.last_throughput, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nproc", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--rows", type=int, default=4000)
+    parser.add_argument("--batch-size", type=int, default=16, help="Triplets per rank per step")
+    parser.add_argument("--hidden-size", type=int, default=128)
+    parser.add_argument("--layers", type=int, default=2)
+    parser.add_argument("--max-seq-length", type=int, default=128)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    df = make_jigsaw_frame(rows=args.rows, seed=args.seed)
+    config = TrainingConfig(
+        epochs=1,
+        batch_size=args.batch_size,
+        learning_rate=2e-5,
+        triplet_margin=0.25,
+        augmentation_factor=1,
+        subsample_fraction=1.0,
+        seed=args.seed,
+        gradient_checkpointing=False,
+        length_grouped_sampler=True,
+    )
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        model_dir, dataset_dir = os.path.join(work_dir, "model"), os.path.join(work_dir, "triplets")
+        os.makedirs(model_dir)
+        dataset = TripletDatasetCreator(config).create_triplet_dataset(df)
+        dataset.save_to_disk(dataset_dir)
+        texts = list(dataset["anchor"]) + list(dataset["negative"])
+        build_tiny_model(model_dir, texts, args.hidden_size, args.layers, args.max_seq_length)
+
+        print(f"{len(dataset)} triplets, {os.cpu_count()} cores, batch size {args.batch_size} per rank")
+        print(f"{'nproc':>5} {'seconds':>9} {'tokens/s':>10} {'speedup':>8}")
+        for nproc in args.nproc:
+            result_path = os.path.join(work_dir, f"result-{nproc}.json")
+            run_args = (model_dir, dataset_dir, config, args.max_seq_length, result_path)
+            if nproc == 1:
+                train_rank(*run_args)
+            else:
+                distributed.launch(train_rank, nproc, args=run_args)
+            with open(result_path) as f:
+                results[nproc] = json.load(f)
+
+            speedup = results[nproc]["tokens_per_second"] / results[args.nproc[0]]["tokens_per_second"]
+            print(
+                f"{nproc:>5} {results[nproc]['train_runtime']:>9.1f} "
+                f"{results[nproc]['tokens_per_second']:>10.0f} {speedup:>7.2f}x"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
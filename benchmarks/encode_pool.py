@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for multi-process CPU encoding.
+
+Encodes the same synthetic texts with 1, 2, 4, ... up to --max-workers worker
+processes (threads per worker = cores / workers unless --threads is given) and
+reports throughput, speedup over one worker and drift from the one-worker output.
+
+    python benchmarks/encode_pool.py --model-path ./models/test-finetuned-bge/final --max-workers 32
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(".")
+
+from benchmarks.onnx_backend import synthetic_texts
+from src.features.encode_pool import EncodePool
+from src.models.embedding_model import EmbeddingModel
+from src.models.onnx_backend import compare_embeddings
+
+
+def worker_counts(max_workers: int):
+    count = 1
+    while count < max_workers:
+        yield count
+        count *= 2
+    yield max_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--max-seq-length", type=int, default=128)
+    parser.add_argument("--num-texts", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--threads", type=int, default=None, help="Threads per worker (default: cores / workers)")
+    parser.add_argument("--task-size", type=int, default=1024)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.num_texts)
+    model = EmbeddingModel(args.model_path, args.max_seq_length, use_fp16=False)
+
+    results = {}
+    reference = None
+    print(f"{'workers':>7} {'threads':>7} {'texts/s':>10} {'speedup':>8} {'min cos':>9}")
+    for workers in worker_counts(args.max_workers):
+        with EncodePool.from_model(
+            model, num_workers=workers, threads_per_worker=args.threads, task_size=args.task_size
+        ) as pool:
+            start = time.perf_counter()
+            embeddings = pool.encode(texts, batch_size=args.batch_size)
+            seconds = time.perf_counter() - start
+            threads = pool.threads_per_worker
+
+        if reference is None:
+            reference = embeddings
+        result = {
+            "threads_per_worker": threads,
+            "seconds": seconds,
+            "texts_per_second": len(texts) / seconds,
+            "speedup": results[1]["seconds"] / seconds if results else 1.0,
+            **compare_embeddings(reference, embeddings),
+        }
+        results[workers] = result
+        print(
+            f"{workers:>7} {threads:>7} {result['texts_per_second']:>10.1f} "
+            f"{result['speedup']:>7.2f}x {result['min_cosine']:>9.5f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
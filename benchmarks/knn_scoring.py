@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Build and query cost of the scoring modes on synthetic embeddings.
+
+Scores --num-queries bodies against one rule with --num-examples examples per
+polarity three ways: centroid distance, exact kNN and IVF kNN. Reports build and
+query time per mode, plus IVF recall@k against the exact neighbours.
+
+    python benchmarks/knn_scoring.py --num-examples 50000 --num-queries 20000
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(".")
+
+from src.inference.knn import ExactIndex, IVFIndex, RuleIndex
+from src.inference.predictor import ViolationPredictor
+
+
+def clustered_embeddings(count: int, dim: int, rng: np.random.Generator, centers: np.ndarray) -> np.ndarray:
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.3 * rng.normal(size=(count, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-examples", type=int, default=50000, help="Examples per polarity")
+    parser.add_argument("--num-queries", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n-probe", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.normal(size=(64, args.dim))
+    examples = {
+        "positive": clustered_embeddings(args.num_examples, args.dim, rng, centers[:48]),
+        "negative": clustered_embeddings(args.num_examples, args.dim, rng, centers[16:]),
+    }
+    queries = clustered_embeddings(args.num_queries, args.dim, rng, centers)
+
+    def centroid_scores():
+        pos, neg = examples["positive"].mean(axis=0), examples["negative"].mean(axis=0)
+        return ViolationPredictor.score_embeddings(queries, pos, neg)[0]
+
+    results = {}
+    _, build = timed(lambda: (examples["positive"].mean(axis=0), examples["negative"].mean(axis=0)))
+    _, query = timed(centroid_scores)
+    results["centroid"] = {"build_seconds": build, "query_seconds": query}
+
+    exact_max = {"exact": args.num_examples, "ivf": 0}
+    for mode, max_examples in exact_max.items():
+        index, build = timed(
+            lambda: RuleIndex({"rule": examples}, k=args.k, exact_max_examples=max_examples, n_probe=args.n_probe)
+        )
+        _, query = timed(lambda: index.score("rule", queries))
+        results[mode] = {"build_seconds": build, "query_seconds": query}
+
+    # Recall of the approximate neighbours on a sample of the queries
+    sample = queries[: min(2000, len(queries))]
+    _, exact_ids = ExactIndex(examples["positive"]).search(sample, args.k)
+    _, ivf_ids = IVFIndex(examples["positive"], n_probe=args.n_probe).search(sample, args.k)
+    results["ivf"]["recall_at_k"] = float(
+        np.mean([len(set(a) & set(b)) / args.k for a, b in zip(exact_ids, ivf_ids)])
+    )
+
+    print(f"{'mode':>8} {'build s':>9} {'query s':>9} {'queries/s':>11}")
+    for mode, result in results.items():
+        result["queries_per_second"] = args.num_queries / result["query_seconds"]
+        print(
+            f"{mode:>8} {result['build_seconds']:>9.3f} {result['query_seconds']:>9.3f} "
+            f"{result['queries_per_second']:>11.0f}"
+        )
+    print(f"IVF recall@{args.k}: {results['ivf']['recall_at_k']:.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Encodes saved and score drift of near-duplicate embedding reuse.
+
+Runs the offline pipeline on a validation file once with exact embeddings and once
+per --thresholds value with near-duplicate reuse, then reports how many encodes were
+skipped and how far the violation scores moved (max and mean absolute deviation).
+
+    python benchmarks/near_duplicates.py --model-path ./models/test-finetuned-bge/final \\
+        --data data/validation.csv --thresholds 0.8 0.9 0.95
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(".")
+
+from src.data.loader import DataLoader
+from src.data.preprocessor import TextPreprocessor
+from src.features.centroids import CentroidBuilder
+from src.features.embeddings import EmbeddingGenerator
+from src.features.near_duplicates import NearDuplicateClusterer
+from src.inference.predictor import ViolationPredictor
+from src.models.embedding_model import EmbeddingModel
+
+
+def score(df, model, preprocessor, batch_size, near_duplicates=None):
+    generator = EmbeddingGenerator(model, batch_size=batch_size, near_duplicates=near_duplicates)
+    start = time.perf_counter()
+    text_to_embedding, rule_embeddings = generator.build_dataframe_embeddings(df, preprocessor)
+    centroids = CentroidBuilder.build_rule_centroids(df, text_to_embedding, rule_embeddings, preprocessor)
+    row_ids, predictions = ViolationPredictor().predict(df, text_to_embedding, centroids, preprocessor)
+    seconds = time.perf_counter() - start
+    return dict(zip(row_ids, predictions)), generator.encodes_saved, len(text_to_embedding), seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--data", required=True, help="Validation file (CSV, Parquet or Arrow IPC)")
+    parser.add_argument("--max-seq-length", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.9, 0.95])
+    parser.add_argument("--num-perm", type=int, default=64)
+    parser.add_argument("--bands", type=int, default=16)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    preprocessor = TextPreprocessor()
+    df = preprocessor.add_clean_columns(DataLoader.load_test_data(args.data))
+    model = EmbeddingModel(args.model_path, args.max_seq_length, use_fp16=False)
+    model.load_model()
+
+    reference, _, num_texts, seconds = score(df, model, preprocessor, args.batch_size)
+    results = {"exact": {"texts": num_texts, "encodes": num_texts, "seconds": seconds}}
+    print(f"{'threshold':>9} {'encodes':>9} {'saved':>7} {'seconds':>8} {'max dev':>9} {'mean dev':>9}")
+    print(f"{'exact':>9} {num_texts:>9} {0:>7} {seconds:>8.2f} {0.0:>9.2e} {0.0:>9.2e}")
+
+    for threshold in args.thresholds:
+        clusterer = NearDuplicateClusterer(threshold=threshold, num_perm=args.num_perm, bands=args.bands)
+        scores, saved, num_texts, seconds = score(df, model, preprocessor, args.batch_size, clusterer)
+        deviation = np.abs(np.array([scores[row_id] - reference[row_id] for row_id in reference]))
+        result = {
+            "texts": num_texts,
+            "encodes": num_texts - saved,
+            "encodes_saved": saved,
+            "seconds": seconds,
+            "max_score_deviation": float(deviation.max(initial=0.0)),
+            "mean_score_deviation": float(deviation.mean()) if len(deviation) else 0.0,
+        }
+        results[str(threshold)] = result
+        print(
+            f"{threshold:>9} {result['encodes']:>9} {saved:>7} {seconds:>8.2f} "
+            f"{result['max_score_deviation']:>9.2e} {result['mean_score_deviation']:>9.2e}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Compare PyTorch, ONNX Runtime and int8-quantized ONNX encoding on CPU.
+
+Reports encode throughput, speedup over PyTorch, embedding drift and the drift of
+centroid violation scores computed from each backend's embeddings. Each ONNX
+backend must pass ``check_parity`` on the benchmark texts first.
+
+    python benchmarks/onnx_backend.py --model-path ./models/test-finetuned-bge/final
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+sys.path.append(".")
+
+import numpy as np
+
+from src.inference.predictor import ViolationPredictor
+from src.models.embedding_model import EmbeddingModel
+from src.models.onnx_backend import INT8_MIN_COSINE, check_parity, compare_embeddings
+
+WORDS = (
+    "please remove this spam link buy cheap followers now the rule says no self promotion "
+    "great post thanks for sharing check out my channel free crypto giveaway click here "
+    "i disagree with your opinion but respect it this comment violates community guidelines"
+).split()
+
+
+def synthetic_texts(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 60))) for _ in range(count)]
+
+
+def time_encode(model: EmbeddingModel, texts, batch_size: int, repeats: int) -> float:
+    model.encode(texts[:batch_size], batch_size=batch_size, show_progress_bar=False)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+    return (time.perf_counter() - start) / repeats
+
+
+def centroid_scores(embeddings: np.ndarray, n_examples: int) -> np.ndarray:
+    def centroid(embs):
+        c = embs.mean(axis=0)
+        return c / np.linalg.norm(c)
+
+    pos = centroid(embeddings[:n_examples])
+    neg = centroid(embeddings[n_examples : 2 * n_examples])
+    scores, _, _ = ViolationPredictor.score_embeddings(embeddings[2 * n_examples :], pos, neg)
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--onnx-dir", default=None)
+    parser.add_argument("--max-seq-length", type=int, default=128)
+    parser.add_argument("--num-texts", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.num_texts)
+    n_examples = max(1, args.num_texts // 10)
+
+    backends = {
+        "torch": EmbeddingModel(args.model_path, args.max_seq_length, use_fp16=False),
+        "onnx": EmbeddingModel(
+            args.model_path, args.max_seq_length, use_fp16=False, backend="onnx", onnx_dir=args.onnx_dir,
+            num_threads=args.threads,
+        ),
+        "onnx-int8": EmbeddingModel(
+            args.model_path, args.max_seq_length, use_fp16=False, backend="onnx", onnx_dir=args.onnx_dir,
+            quantize=True, num_threads=args.threads,
+        ),
+    }
+    for model in backends.values():
+        model.load_model()
+
+    for name, model in backends.items():
+        if model.onnx_encoder is not None:
+            min_cosine = INT8_MIN_COSINE if model.quantize else None
+            check_parity(backends["torch"], model.onnx_encoder, texts, min_cosine=min_cosine)
+
+    reference = backends["torch"].encode(texts, batch_size=args.batch_size, show_progress_bar=False)
+    reference_scores = centroid_scores(reference, n_examples)
+
+    results = {}
+    for name, model in backends.items():
+        seconds = time_encode(model, texts, args.batch_size, args.repeats)
+        embeddings = model.encode(texts, batch_size=args.batch_size, show_progress_bar=False)
+        drift = compare_embeddings(reference, embeddings)
+        results[name] = {
+            "seconds": seconds,
+            "texts_per_second": len(texts) / seconds,
+            **drift,
+            "max_score_drift": float(np.max(np.abs(centroid_scores(embeddings, n_examples) - reference_scores))),
+        }
+
+    base = results["torch"]["seconds"]
+    print(f"{'backend':<10} {'texts/s':>10} {'speedup':>8} {'min cos':>9} {'score drift':>12}")
+    for name, result in results.items():
+        result["speedup"] = base / result["seconds"]
+        print(
+            f"{name:<10} {result['texts_per_second']:>10.1f} {result['speedup']:>7.2f}x "
+            f"{result['min_cosine']:>9.5f} {result['max_score_drift']:>12.2e}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
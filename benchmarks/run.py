@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the inference pipeline.
+
+Runs every stage on a synthetic Jigsaw-shaped dataframe with a stub embedding model
+(seeded vectors, simulated encode cost), so no checkpoint or GPU is needed. Results
+are written as JSON; ``compare`` flags benchmarks whose best-of-repeats time regressed
+by more than a tolerance between two result files and exits non-zero if any did.
+
+    python benchmarks/run.py run --rows 100000 --output benchmarks/results/baseline.json
+    python benchmarks/run.py run --rows 100000 --output benchmarks/results/new.json
+    python benchmarks/run.py compare benchmarks/results/baseline.json benchmarks/results/new.json
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(".")
+
+from benchmarks.stub_model import StubEmbeddingModel
+from benchmarks.synthetic import make_jigsaw_frame
+from src.data.preprocessor import TextPreprocessor, _clean_urls
+from src.features.centroids import CentroidBuilder
+from src.features.embeddings import EmbeddingGenerator
+from src.inference.predictor import ViolationPredictor
+
+# A benchmark prepares untimed state and returns (timed callable, items processed)
+Benchmark = Callable[[dict], Tuple[Callable[[], object], int]]
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str):
+    def register(fn: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = fn
+        return fn
+
+    return register
+
+
+@benchmark("clean_text")
+def bench_clean_text(ctx):
+    _clean_urls.cache_clear()
+    bodies = ctx["df"]["body"].tolist()
+    return lambda: [TextPreprocessor.clean_text(text) for text in bodies], len(bodies)
+
+
+@benchmark("add_clean_columns")
+def bench_add_clean_columns(ctx):
+    _clean_urls.cache_clear()
+    df = ctx["df"]
+    return lambda: TextPreprocessor.add_clean_columns(df), len(df)
+
+
+@benchmark("collect_unique_texts")
+def bench_collect_unique_texts(ctx):
+    df = ctx["clean_df"]
+    return lambda: TextPreprocessor.collect_unique_texts(df), len(df)
+
+
+@benchmark("build_text_embeddings")
+def bench_build_text_embeddings(ctx):
+    generator = EmbeddingGenerator(ctx["model"], batch_size=ctx["batch_size"])
+    texts = ctx["texts"]
+    return lambda: generator.build_text_embeddings(texts), len(texts)
+
+
+@benchmark("build_rule_centroids")
+def bench_build_rule_centroids(ctx):
+    df, text_to_embedding, rule_embeddings = ctx["clean_df"], ctx["text_to_embedding"], ctx["rule_embeddings"]
+    return (
+        lambda: CentroidBuilder.build_rule_centroids(df, text_to_embedding, rule_embeddings, TextPreprocessor()),
+        len(df),
+    )
+
+
+@benchmark("predict")
+def bench_predict(ctx):
+    df, text_to_embedding, rule_centroids = ctx["clean_df"], ctx["text_to_embedding"], ctx["rule_centroids"]
+    return lambda: ViolationPredictor().predict(df, text_to_embedding, rule_centroids, TextPreprocessor()), len(df)
+
+
+def _api_requests(df: pd.DataFrame, count: int):
+    rows = df.head(count)
+    return [
+        {
+            "text": row.body,
+            "rule": row.rule,
+            "positive_examples": [row.positive_example_1, row.positive_example_2],
+            "negative_examples": [row.negative_example_1, row.negative_example_2],
+        }
+        for row in rows.itertuples()
+    ]
+
+
+@benchmark("api_predict")
+def bench_api_predict(ctx):
+    api, loop, requests = ctx["api"], ctx["api_loop"], ctx["api_requests"]
+    api.centroid_cache.clear()
+    waves = [requests[i : i + ctx["api_concurrency"]] for i in range(0, len(requests), ctx["api_concurrency"])]
+
+    async def run():
+        # Waves of concurrent single-item requests, coalesced by the micro-batcher
+        for wave in waves:
+            await asyncio.gather(*(api.predict(api.PredictionRequest(**request), None) for request in wave))
+
+    return lambda: loop.run_until_complete(run()), len(requests)
+
+
+@benchmark("api_batch_predict")
+def bench_api_batch_predict(ctx):
+    api, loop, requests = ctx["api"], ctx["api_loop"], ctx["api_requests"]
+    api.centroid_cache.clear()
+    batches = [requests[i : i + 64] for i in range(0, len(requests), 64)]
+
+    async def run():
+        for batch in batches:
+            await api.batch_predict([api.PredictionRequest(**request) for request in batch], None)
+
+    return lambda: loop.run_until_complete(run()), len(requests)
+
+
+def start_api(model_factory: Callable):
+    """Run the API startup hook against the stub model, without serving HTTP.
+
+    Returns the ``api`` module and the event loop its micro-batcher runs on; the
+    handlers are awaited on that loop directly.
+    """
+    if "src.config.model_config" not in sys.modules:
+        # api.py imports the config package as ``src.config`` (the deployed layout)
+        import config.model_config
+
+        sys.modules["src.config.model_config"] = config.model_config
+
+    import api
+
+    api.EmbeddingModel = model_factory
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(api.load_model())
+    return api, loop
+
+
+def stop_api(api, loop):
+    loop.run_until_complete(api.stop_batcher())
+    loop.close()
+
+
+def build_context(args) -> dict:
+    start = time.perf_counter()
+    df = make_jigsaw_frame(
+        rows=args.rows,
+        rules=args.rules,
+        url_density=args.url_density,
+        mean_words=args.mean_words,
+        length_sigma=args.length_sigma,
+        seed=args.seed,
+    )
+    model = StubEmbeddingModel(dim=args.dim, batch_cost_ms=args.batch_cost_ms, token_cost_us=args.token_cost_us)
+    model.load_model()
+
+    clean_df = TextPreprocessor.add_clean_columns(df)
+    generator = EmbeddingGenerator(model, batch_size=args.batch_size)
+    text_to_embedding, rule_embeddings = generator.build_dataframe_embeddings(clean_df, TextPreprocessor())
+    ctx = {
+        "df": df,
+        "clean_df": clean_df,
+        "model": model,
+        "batch_size": args.batch_size,
+        "texts": TextPreprocessor.collect_unique_texts(clean_df)[: args.encode_texts],
+        "text_to_embedding": text_to_embedding,
+        "rule_embeddings": rule_embeddings,
+        "rule_centroids": CentroidBuilder.build_rule_centroids(
+            clean_df, text_to_embedding, rule_embeddings, TextPreprocessor()
+        ),
+        "api_requests": _api_requests(df, args.api_requests),
+        "api_concurrency": args.api_concurrency,
+    }
+    print(f"Prepared {len(df)} rows in {time.perf_counter() - start:.1f}s")
+    return ctx
+
+
+def run_suite(args) -> dict:
+    ctx = build_context(args)
+    selected = [name for name in BENCHMARKS if not args.only or name in args.only]
+
+    if any(name.startswith("api_") for name in selected):
+        factory = functools.partial(
+            StubEmbeddingModel, dim=args.dim, batch_cost_ms=args.batch_cost_ms, token_cost_us=args.token_cost_us
+        )
+        ctx["api"], ctx["api_loop"] = start_api(factory)
+
+    results = {}
+    try:
+        for name in selected:
+            timings = []
+            for _ in range(args.repeats):
+                fn, items = BENCHMARKS[name](ctx)
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            median = statistics.median(timings)
+            results[name] = {
+                "items": items,
+                "repeats": args.repeats,
+                "min_seconds": min(timings),
+                "median_seconds": median,
+                "mean_seconds": statistics.fmean(timings),
+                "items_per_second": items / median if median > 0 else float("inf"),
+            }
+            print(f"{name:<24} {median:>10.4f}s {results[name]['items_per_second']:>14.0f} items/s")
+    finally:
+        if "api" in ctx:
+            stop_api(ctx["api"], ctx["api_loop"])
+
+    return {"meta": _metadata(args), "results": results}
+
+
+def _metadata(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "cpu_count": os.cpu_count(),
+        "args": {key: value for key, value in vars(args).items() if key != "func"},
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> Dict[str, dict]:
+    """Best-time ratio per benchmark present in both runs; ``regression`` beyond ``tolerance``.
+
+    The minimum over repeats is compared because it is the least sensitive to noise
+    from other processes.
+    """
+    report = {}
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["min_seconds"] / before["min_seconds"] if before["min_seconds"] > 0 else float("inf")
+        report[name] = {
+            "baseline_seconds": before["min_seconds"],
+            "current_seconds": result["min_seconds"],
+            "ratio": ratio,
+            "regression": ratio > 1 + tolerance,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the suite")
+    run.add_argument("--rows", type=int, default=100000)
+    run.add_argument("--rules", type=int, default=50)
+    run.add_argument("--url-density", type=float, default=0.2)
+    run.add_argument("--mean-words", type=float, default=40.0)
+    run.add_argument("--length-sigma", type=float, default=0.8)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--dim", type=int, default=384)
+    run.add_argument("--batch-size", type=int, default=64)
+    run.add_argument("--batch-cost-ms", type=float, default=0.0, help="Simulated encode cost per batch")
+    run.add_argument("--token-cost-us", type=float, default=0.0, help="Simulated encode cost per token")
+    run.add_argument("--encode-texts", type=int, default=20000, help="Texts for build_text_embeddings")
+    run.add_argument("--api-requests", type=int, default=512)
+    run.add_argument("--api-concurrency", type=int, default=64, help="Concurrent /predict calls per wave")
+    run.add_argument("--repeats", type=int, default=5)
+    run.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=None)
+    run.add_argument("--output", default=None, help="JSON file for the results")
+    run.add_argument("--compare", default=None, help="Baseline JSON to compare the new results against")
+    run.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown (0.10 = 10%%)")
+
+    cmp = commands.add_parser("compare", help="Compare two result files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown (0.10 = 10%%)")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)  # stage logs would drown the result table
+
+    if args.command == "run":
+        current = run_suite(args)
+        if args.output:
+            os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+        if not args.compare:
+            return
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+
+    report = compare(baseline, current, args.tolerance)
+    print(f"{'benchmark':<24} {'baseline s':>11} {'current s':>11} {'ratio':>7}")
+    for name, row in report.items():
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{name:<24} {row['baseline_seconds']:>11.4f} {row['current_seconds']:>11.4f} {row['ratio']:>6.2f}x{flag}")
+    if any(row["regression"] for row in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Stand-in ``EmbeddingModel`` for offline benchmarks.
+
+Returns seeded random unit vectors (the same text always gets the same vector) and
+sleeps for a configurable simulated cost per batch and per token, so pipeline
+benchmarks run without a checkpoint while still paying a realistic encode cost.
+The cache, metrics and ``encode`` contract of ``EmbeddingModel`` are inherited.
+"""
+
+import hashlib
+import time
+from typing import List
+
+import numpy as np
+
+from src.models.embedding_model import EmbeddingModel
+from src.utils.metrics import REGISTRY
+
+
+class StubEmbeddingModel(EmbeddingModel):
+    """``EmbeddingModel`` whose transformer is replaced by seeded vectors.
+
+    Args:
+        model_path: Only used in the fingerprint
+        dim: Embedding dimension
+        batch_cost_ms: Simulated cost per forward batch
+        token_cost_us: Simulated cost per (whitespace) token, capped at ``max_seq_length``
+        seed: Mixed into every text's vector seed
+        **kwargs: Passed to ``EmbeddingModel``
+    """
+
+    def __init__(
+        self,
+        model_path: str = "stub",
+        dim: int = 384,
+        batch_cost_ms: float = 0.0,
+        token_cost_us: float = 0.0,
+        seed: int = 0,
+        **kwargs,
+    ):
+        kwargs.setdefault("model_version", f"stub-{seed}")
+        super().__init__(model_path, **kwargs)
+        self.dim = dim
+        self.batch_cost_ms = batch_cost_ms
+        self.token_cost_us = token_cost_us
+        self.seed = seed
+
+    def load_model(self):
+        self.model = self
+        self._fingerprint = self.fingerprint
+        return self.model
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def vector(self, text: str) -> np.ndarray:
+        """The (unnormalized) vector of one text."""
+        digest = hashlib.blake2b(f"{self.seed}\x00{text}".encode("utf-8"), digest_size=8).digest()
+        return np.random.default_rng(int.from_bytes(digest, "little")).standard_normal(self.dim, dtype=np.float32)
+
+    def _encode(self, texts: List[str], batch_size: int, normalize: bool, show_progress_bar: bool = True) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        num_batches = -(-len(texts) // batch_size)
+        tokens = sum(min(len(text.split()), self.max_seq_length) for text in texts)
+        cost = num_batches * self.batch_cost_ms / 1000 + tokens * self.token_cost_us / 1e6
+        if cost > 0:
+            time.sleep(cost)
+
+        embeddings = np.stack([self.vector(text) for text in texts])
+        if normalize:
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+        REGISTRY.counter("texts_encoded_total", "Texts run through the transformer").inc(len(texts))
+        return embeddings
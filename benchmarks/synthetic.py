@@ -0,0 +1,119 @@
+"""
+Deterministic synthetic data shaped like the Jigsaw rule-violation set.
+
+Rows carry a body, its rule and subreddit, two positive and two negative examples
+and a ``rule_violation`` label. Examples are drawn from a fixed pool per rule, so
+they repeat across rows like in the real data, and a share of bodies are reposts of
+earlier ones. The same arguments always produce the same frame.
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+SYLLABLES = (
+    "ba be bi bo bu ka ke ki ko ku la le li lo lu ma me mi mo mu na ne ni no nu "
+    "ra re ri ro ru sa se si so su ta te ti to tu va ve vi vo vu za ze zi zo zu"
+).split()
+
+DOMAINS = ("example.com", "www.shop-deals.net", "youtube.com", "reddit.com", "bit.ly", "www.news-site.org")
+
+
+def make_vocabulary(size: int, rng: np.random.Generator) -> np.ndarray:
+    """Pseudo-words of two to four syllables."""
+    lengths = rng.integers(2, 5, size)
+    syllables = rng.integers(0, len(SYLLABLES), (size, 4))
+    return np.array(["".join(SYLLABLES[s] for s in row[:n]) for row, n in zip(syllables, lengths)], dtype=object)
+
+
+def make_texts(
+    count: int,
+    rng: np.random.Generator,
+    vocabulary: np.ndarray,
+    url_density: float = 0.2,
+    mean_words: float = 40.0,
+    length_sigma: float = 0.8,
+) -> List[str]:
+    """Texts with log-normal word counts; ``url_density`` of them contain a URL.
+
+    Word frequencies follow a Zipf-like distribution so common words repeat, as in
+    natural text.
+    """
+    mu = np.log(mean_words) - length_sigma**2 / 2  # keeps the mean at mean_words
+    lengths = np.clip(rng.lognormal(mu, length_sigma, count).astype(int), 1, 2000)
+    ranks = np.arange(1, len(vocabulary) + 1)
+    word_ids = rng.choice(len(vocabulary), lengths.sum(), p=(1 / ranks) / (1 / ranks).sum())
+
+    has_url = rng.random(count) < url_density
+    url_positions = (rng.random(count) * lengths).astype(int)
+    domains = rng.integers(0, len(DOMAINS), count)
+    url_ids = rng.integers(0, 10**6, count)
+
+    texts = []
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    for i in range(count):
+        words = list(vocabulary[word_ids[offsets[i] : offsets[i + 1]]])
+        if has_url[i]:
+            segments = vocabulary[word_ids[offsets[i] : offsets[i] + 2]]
+            url = f"https://{DOMAINS[domains[i]]}/{'/'.join(segments)}/{url_ids[i]}?ref=share"
+            words.insert(url_positions[i], url)
+        texts.append(" ".join(words))
+    return texts
+
+
+def make_jigsaw_frame(
+    rows: int = 10000,
+    rules: int = 20,
+    url_density: float = 0.2,
+    mean_words: float = 40.0,
+    length_sigma: float = 0.8,
+    repost_rate: float = 0.1,
+    examples_per_rule: int = 50,
+    vocabulary_size: int = 20000,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Build a Jigsaw-shaped dataframe.
+
+    Args:
+        rows: Number of rows
+        rules: Number of distinct rules
+        url_density: Fraction of texts containing a URL
+        mean_words: Mean words per text
+        length_sigma: Spread of the log-normal text length distribution
+        repost_rate: Fraction of bodies that repeat an earlier body
+        examples_per_rule: Pool size per rule and polarity that examples are drawn from
+        vocabulary_size: Number of distinct pseudo-words
+        seed: Random seed
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = make_vocabulary(vocabulary_size, rng)
+    text_kwargs = dict(url_density=url_density, mean_words=mean_words, length_sigma=length_sigma)
+
+    rule_texts = [f"No {text}." for text in make_texts(rules, rng, vocabulary, url_density=0.0, mean_words=8)]
+    pools = {
+        kind: np.array(make_texts(rules * examples_per_rule, rng, vocabulary, **text_kwargs), dtype=object).reshape(
+            rules, examples_per_rule
+        )
+        for kind in ("positive", "negative")
+    }
+
+    bodies = np.array(make_texts(rows, rng, vocabulary, **text_kwargs), dtype=object)
+    reposts = np.flatnonzero(rng.random(rows) < repost_rate)
+    reposts = reposts[reposts > 0]
+    bodies[reposts] = bodies[(rng.random(len(reposts)) * reposts).astype(int)]
+
+    rule_ids = rng.integers(0, rules, rows)
+    example_ids = rng.integers(0, examples_per_rule, (rows, 4))
+    frame = {
+        "row_id": np.arange(rows),
+        "body": bodies,
+        "rule": np.array(rule_texts, dtype=object)[rule_ids],
+        "subreddit": np.array([f"sub{i}" for i in range(50)], dtype=object)[rng.integers(0, 50, rows)],
+        "positive_example_1": pools["positive"][rule_ids, example_ids[:, 0]],
+        "positive_example_2": pools["positive"][rule_ids, example_ids[:, 1]],
+        "negative_example_1": pools["negative"][rule_ids, example_ids[:, 2]],
+        "negative_example_2": pools["negative"][rule_ids, example_ids[:, 3]],
+        "rule_violation": rng.integers(0, 2, rows),
+    }
+    return pd.DataFrame(frame)
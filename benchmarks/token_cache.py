@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter-sweep cost with and without the tokenized triplet cache.
+
+Runs --runs short fine-tunes of --model-path on the same synthetic data, each with
+a different learning rate, once from text (triplets re-created, texts tokenized
+by the collator) and once from a fresh TokenizedTripletCache (built by the first
+run, memory-mapped by the rest). Reports data preparation and training seconds
+per run.
+
+    python benchmarks/token_cache.py --model-path /path/to/model --rows 5000 --runs 3
+"""
+
+import argparse
+import dataclasses
+import json
+import logging
+import sys
+import tempfile
+import time
+
+sys.path.append(".")
+
+from benchmarks.synthetic import make_jigsaw_frame
+from config.model_config import TrainingConfig
+from src.data.token_cache import TokenizedTripletCache
+from src.data.triplet_dataset import TripletDatasetCreator
+from src.models.embedding_model import EmbeddingModel
+from src.models.trainer import ModelTrainer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--max-seq-length", type=int, default=128)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--augmentation-factor", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    df = make_jigsaw_frame(rows=args.rows, seed=args.seed)
+    base = TrainingConfig(
+        epochs=1,
+        batch_size=args.batch_size,
+        learning_rate=2e-5,
+        triplet_margin=0.25,
+        augmentation_factor=args.augmentation_factor,
+        subsample_fraction=1.0,
+        seed=args.seed,
+        gradient_checkpointing=False,
+    )
+
+    results = {"text": [], "cache": []}
+    print(f"{'mode':<6} {'run':>3} {'prep s':>8} {'train s':>8}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = TokenizedTripletCache(f"{work_dir}/cache")
+        for mode in results:
+            for run in range(args.runs):
+                config = dataclasses.replace(base, learning_rate=base.learning_rate * (run + 1))
+                model = EmbeddingModel(args.model_path, max_seq_length=args.max_seq_length, use_fp16=False).load_model()
+                creator = TripletDatasetCreator(config)
+
+                start = time.perf_counter()
+                if mode == "cache":
+                    dataset = cache.get_or_build(df, model, creator)
+                else:
+                    dataset = creator.create_triplet_dataset(df)
+                prep = time.perf_counter() - start
+
+                start = time.perf_counter()
+                ModelTrainer(model, config).train(dataset, f"{work_dir}/model")
+                train = time.perf_counter() - start
+
+                results[mode].append({"prep_seconds": prep, "train_seconds": train})
+                print(f"{mode:<6} {run:>3} {prep:>8.2f} {train:>8.2f}")
+
+    for mode, runs in results.items():
+        total = sum(run["prep_seconds"] + run["train_seconds"] for run in runs)
+        print(f"{mode}: {total:.1f}s for {args.runs} runs")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
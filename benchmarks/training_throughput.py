@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Training throughput of the dataloader and memory settings.
+
+Fine-tunes --model-path on synthetic triplets once per setting, starting from the
+same checkpoint each time, and reports real (unpadded) tokens/sec and padding:
+
+    baseline  random batches, no dataloader workers, gradient checkpointing on
+              (--baseline-checkpointing false turns it off here and in grouped)
+    grouped   length-grouped batches
+    optimized length-grouped batches, --workers workers, checkpointing "auto"
+
+    python benchmarks/training_throughput.py --model-path /path/to/model --rows 2000
+"""
+
+import argparse
+import dataclasses
+import json
+import logging
+import sys
+import tempfile
+
+sys.path.append(".")
+
+from benchmarks.synthetic import make_jigsaw_frame
+from config.model_config import TrainingConfig
+from src.data.triplet_dataset import TripletDatasetCreator
+from src.models.embedding_model import EmbeddingModel
+from src.models.trainer import ModelTrainer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--max-seq-length", type=int, default=256)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--mean-words", type=float, default=40.0)
+    parser.add_argument("--length-sigma", type=float, default=0.8)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--budget-mb", type=float, default=4096.0, help="Activation budget for the auto setting")
+    parser.add_argument(
+        "--baseline-checkpointing",
+        choices=["true", "false"],
+        default="true",
+        help="Gradient checkpointing of the baseline and grouped settings",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    df = make_jigsaw_frame(rows=args.rows, mean_words=args.mean_words, length_sigma=args.length_sigma, seed=args.seed)
+    base = TrainingConfig(
+        epochs=1,
+        batch_size=args.batch_size,
+        learning_rate=2e-5,
+        triplet_margin=0.25,
+        augmentation_factor=1,
+        subsample_fraction=1.0,
+        seed=args.seed,
+        activation_memory_budget_mb=args.budget_mb,
+    )
+    dataset = TripletDatasetCreator(base).create_triplet_dataset(df)
+
+    checkpointing = args.baseline_checkpointing == "true"
+    settings = {
+        "baseline": dataclasses.replace(base, gradient_checkpointing=checkpointing),
+        "grouped": dataclasses.replace(base, gradient_checkpointing=checkpointing, length_grouped_sampler=True),
+        "optimized": dataclasses.replace(
+            base, gradient_checkpointing="auto", length_grouped_sampler=True, dataloader_num_workers=args.workers
+        ),
+    }
+
+    results = {}
+    print(f"{len(dataset)} triplets, batch size {args.batch_size}")
+    print(f"{'setting':<10} {'seconds':>9} {'tokens/s':>10} {'padding':>8} {'checkpointing':>14}")
+    for name, config in settings.items():
+        model = EmbeddingModel(args.model_path, max_seq_length=args.max_seq_length, use_fp16=False).load_model()
+        trainer = ModelTrainer(model, config)
+        enabled = trainer.use_gradient_checkpointing()
+        with tempfile.TemporaryDirectory() as output_dir:
+            trainer.train(dataset, output_dir)
+        results[name] = dict(trainer.last_throughput, gradient_checkpointing=enabled)
+        row = results[name]
+        print(
+            f"{name:<10} {row['train_runtime']:>9.1f} {row['tokens_per_second']:>10.0f} "
+            f"{row['padding_ratio']:>8.1%} {str(enabled):>14}"
+        )
+
+    speedup = results["optimized"]["tokens_per_second"] / results["baseline"]["tokens_per_second"]
+    print(f"optimized vs baseline: {speedup:.2f}x tokens/s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional, Union
 import yaml
 
 @dataclass
@@ -7,6 +8,10 @@ class ModelConfig:
     max_seq_length: int
     embedding_dim: int
     use_fp16: bool
+    backend: str = "torch"
+    onnx_dir: Optional[str] = None
+    onnx_quantize: bool = False
+    num_threads: Optional[int] = None
 
 @dataclass
 class TrainingConfig:
@@ -18,16 +23,59 @@ class TrainingConfig:
     subsample_fraction: float
     gradient_accumulation_steps: int = 1
     max_grad_norm: float = 1.0
+    seed: int = 42
+    triplet_mode: str = "memory"
+    triplet_shard_dir: Optional[str] = None
+    triplet_shard_rows: int = 1000000
+    hard_negative_mining: bool = False
+    hard_negatives_per_anchor: int = 3
+    mining_block_size: int = 4096
+    length_grouped_sampler: bool = False
+    length_group_batches: int = 50
+    dataloader_num_workers: int = 0
+    dataloader_prefetch_factor: Optional[int] = None
+    gradient_checkpointing: Union[bool, str] = "auto"
+    activation_memory_budget_mb: float = 4096.0
+    checkpoint_steps: Optional[int] = None
+    resume_from_checkpoint: bool = False
+    incremental: bool = False
+    replay_fraction: float = 0.2
+    token_cache_dir: Optional[str] = None
 
 @dataclass
 class DataConfig:
     test_data_path: str
     output_dir: str
+    embedding_store_dir: Optional[str] = None
+    embedding_store_dtype: str = "float32"
+    memory_map: bool = False
 
 @dataclass
 class InferenceConfig:
     batch_size: int
     distance_metric: str
+    max_batch_size: int = 64
+    max_batch_wait_ms: float = 5.0
+    centroid_cache_max_entries: int = 4096
+    centroid_cache_max_mb: float = 64.0
+    encode_workers: int = 1
+    max_queue_depth: int = 256
+    retry_after_s: int = 1
+    request_deadline_ms: Optional[float] = None
+    embedding_cache_mb: float = 0.0
+    embedding_cache_ttl_s: Optional[float] = None
+    stream_window_size: int = 256
+    max_tokens_per_batch: Optional[int] = None
+    chunk_size: Optional[int] = None
+    encode_processes: int = 1
+    encode_threads_per_process: Optional[int] = None
+    scoring_mode: str = "centroid"
+    knn_k: int = 5
+    knn_exact_max_examples: int = 20000
+    knn_n_probe: int = 8
+    near_duplicate_threshold: Optional[float] = None
+    near_duplicate_num_perm: int = 64
+    near_duplicate_bands: int = 16
 
 class Config:
     def __init__(self, config_path: str = "config/config.yaml"):
@@ -7,41 +7,115 @@ from src.data.loader import DataLoader
 from src.data.preprocessor import TextPreprocessor
 from src.models.embedding_model import EmbeddingModel
 from src.features.embeddings import EmbeddingGenerator
+from src.features.embedding_store import EmbeddingStore
+from src.features.encode_pool import EncodePool
+from src.features.near_duplicates import NearDuplicateClusterer
 from src.features.centroids import CentroidBuilder
+from src.inference.chunked import ChunkedInference
+from src.inference.knn import RuleIndex
 from src.inference.predictor import ViolationPredictor
 from src.utils.logging_utils import setup_logging
 import pandas as pd
 
+SUBMISSION_PATH = 'data/submissions/submission.csv'
+
 def main():
     setup_logging()
     config = Config()
     
-    # Load data
-    loader = DataLoader()
-    df = loader.load_test_data(config.data.test_data_path)
-    
     # Load model
     model_wrapper = EmbeddingModel(
         model_path=f"{config.data.output_dir}/final",
-        max_seq_length=config.model.max_seq_length
+        max_seq_length=config.model.max_seq_length,
+        backend=config.model.backend,
+        onnx_dir=config.model.onnx_dir,
+        quantize=config.model.onnx_quantize,
+        num_threads=config.model.num_threads,
+        max_tokens_per_batch=config.inference.max_tokens_per_batch,
     )
-    model_wrapper.load_model()
-    
+    pool = None
+    if config.inference.encode_processes > 1:
+        # Worker processes load the model themselves; this process only coordinates
+        pool = EncodePool.from_model(
+            model_wrapper,
+            num_workers=config.inference.encode_processes,
+            threads_per_worker=config.inference.encode_threads_per_process,
+        )
+    else:
+        model_wrapper.load_model()
+
+    try:
+        run(config, model_wrapper, pool)
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+def run(config: Config, model_wrapper: EmbeddingModel, pool=None):
     # Generate embeddings
     preprocessor = TextPreprocessor()
-    embedding_generator = EmbeddingGenerator(model_wrapper, batch_size=config.inference.batch_size)
+    store = None
+    if config.data.embedding_store_dir:
+        store = EmbeddingStore(
+            config.data.embedding_store_dir,
+            f"{model_wrapper.fingerprint}|normalize=True",
+            dtype=config.data.embedding_store_dtype
+        )
+    near_duplicates = None
+    if config.inference.near_duplicate_threshold:
+        near_duplicates = NearDuplicateClusterer(
+            threshold=config.inference.near_duplicate_threshold,
+            num_perm=config.inference.near_duplicate_num_perm,
+            bands=config.inference.near_duplicate_bands,
+        )
+    embedding_generator = EmbeddingGenerator(
+        model_wrapper,
+        batch_size=config.inference.batch_size,
+        store=store,
+        pool=pool,
+        near_duplicates=near_duplicates,
+    )
+    predictor = ViolationPredictor(config.inference.distance_metric, mode=config.inference.scoring_mode)
+
+    if config.inference.chunk_size:
+        if predictor.mode == "knn":
+            raise ValueError("kNN scoring needs every example in memory; set chunk_size to null")
+        # Bounded memory: centroids in one pass, then score and append chunk by chunk
+        chunked = ChunkedInference(
+            embedding_generator,
+            predictor,
+            preprocessor,
+            chunksize=config.inference.chunk_size,
+            memory_map=config.data.memory_map,
+        )
+        chunked.predict_to_csv(config.data.test_data_path, SUBMISSION_PATH)
+        return
+
+    # Load data
+    loader = DataLoader()
+    df = loader.load_test_data(config.data.test_data_path, memory_map=config.data.memory_map)
+    df = preprocessor.add_clean_columns(df)  # clean each raw string once for every stage
+
     text_to_embedding, rule_embeddings = embedding_generator.build_dataframe_embeddings(df, preprocessor)
     
-    # Build centroids
+    # Build centroids (or per-rule example indexes for kNN scoring)
     centroid_builder = CentroidBuilder()
-    rule_centroids = centroid_builder.build_rule_centroids(
-        df, text_to_embedding, rule_embeddings, preprocessor
-    )
+    rule_centroids, rule_index = {}, None
+    if predictor.mode == "knn":
+        rule_index = RuleIndex(
+            centroid_builder.build_rule_examples(df, text_to_embedding, preprocessor),
+            k=config.inference.knn_k,
+            exact_max_examples=config.inference.knn_exact_max_examples,
+            n_probe=config.inference.knn_n_probe,
+        )
+    else:
+        rule_centroids = centroid_builder.build_rule_centroids(
+            df, text_to_embedding, rule_embeddings, preprocessor
+        )
     
     # Predict
-    predictor = ViolationPredictor(config.inference.distance_metric)
     row_ids, predictions = predictor.predict(
-        df, text_to_embedding, rule_centroids, preprocessor
+        df, text_to_embedding, rule_centroids, preprocessor, rule_index=rule_index
     )
     
     # Save submission
@@ -49,7 +123,7 @@ def main():
         'row_id': row_ids,
         'rule_violation': predictions
     })
-    submission.to_csv('data/submissions/submission.csv', index=False)
+    submission.to_csv(SUBMISSION_PATH, index=False)
 
 if __name__ == "__main__":
     main()
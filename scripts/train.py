@@ -1,39 +1,116 @@
 #!/usr/bin/env python3
+import argparse
+import logging
 import sys
 sys.path.append('.')
 
+from datasets import load_from_disk
+
 from src.config.model_config import Config
+from src.data.hard_negatives import HardNegativeMiner
+from src.data.incremental import (
+    changed_rules,
+    changeset_id,
+    incremental_rows,
+    load_manifest,
+    rule_fingerprints,
+    save_manifest,
+)
 from src.data.loader import DataLoader
 from src.data.preprocessor import TextPreprocessor
+from src.data.token_cache import TokenizedTripletCache
 from src.data.triplet_dataset import TripletDatasetCreator
+from src.features.embeddings import EmbeddingGenerator
+from src.models import distributed
 from src.models.embedding_model import EmbeddingModel
 from src.models.trainer import ModelTrainer
 from src.utils.logging_utils import setup_logging
 
+logger = logging.getLogger(__name__)
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Fine-tune the embedding model on triplets")
+    parser.add_argument("--nproc", type=int, default=1, help="Data-parallel CPU training processes (gloo)")
+    args = parser.parse_args()
+
+    if args.nproc > 1:
+        distributed.launch(train, args.nproc)
+    else:
+        train()
+
+
+def train():
+    """Training job; under ``--nproc`` every rank runs it on the same data."""
     setup_logging()
     config = Config()
     
     # Load data
     loader = DataLoader()
     df = loader.load_test_data(config.data.test_data_path)
+    final_dir = f"{config.data.output_dir}/final"
+    fingerprints = rule_fingerprints(df)
+    
+    # Incremental mode: continue from the last model on new or changed rules only
+    model_path, checkpoint_dir, trained = config.model.base_model_path, None, {}
+    if config.training.incremental:
+        trained = load_manifest(final_dir)
+        if not trained:
+            logger.warning(f"No rule manifest in {final_dir}; training on every rule")
+        else:
+            changed = changed_rules(fingerprints, trained)
+            if not changed:
+                logger.info("No new or changed rules; nothing to train")
+                return
+            df = incremental_rows(df, changed, config.training.replay_fraction, seed=config.training.seed)
+            model_path = final_dir
+            # Keyed by the change, so resuming never picks up another change's checkpoint
+            checkpoint_dir = f"{config.data.output_dir}/incremental/{changeset_id(fingerprints, changed)}"
     
     # Initialize model
     model_wrapper = EmbeddingModel(
-        model_path=config.model.base_model_path,
+        model_path=model_path,
         max_seq_length=config.model.max_seq_length,
         use_fp16=config.model.use_fp16
     )
     model = model_wrapper.load_model()
     
-    # Create training dataset
+    # Create training dataset (every rank builds the same triplets; the trainer shards them)
     triplet_creator = TripletDatasetCreator(config.training)
-    train_dataset = triplet_creator.create_triplet_dataset(df)
+    num_examples = None
+    if config.training.hard_negative_mining:
+        miner = HardNegativeMiner(
+            EmbeddingGenerator(model_wrapper, batch_size=config.inference.batch_size),
+            negatives_per_anchor=config.training.hard_negatives_per_anchor,
+            block_size=config.training.mining_block_size,
+            seed=config.training.seed,
+        )
+        # Mined on rank 0 only, then shared through disk
+        mined_dir = f"{config.data.output_dir}/mined"
+        distributed.run_on_main(lambda: miner.mine(df).save_to_disk(mined_dir))
+        train_dataset = load_from_disk(mined_dir)
+    elif config.training.token_cache_dir:
+        # Tokenized once (on rank 0); later runs with the same data and tokenizer just map the shards
+        cache = TokenizedTripletCache(config.training.token_cache_dir)
+        fingerprint = distributed.run_on_main(lambda: cache.build_if_missing(df, model, triplet_creator))
+        train_dataset = cache.load(fingerprint)
+    elif config.training.triplet_mode == "stream":
+        train_dataset = triplet_creator.create_iterable_dataset(df)
+        num_examples = triplet_creator.count_triplets(df)
+    elif config.training.triplet_mode == "shards":
+        shard_dir = config.training.triplet_shard_dir or f"{config.data.output_dir}/triplets"
+        paths = distributed.run_on_main(
+            lambda: triplet_creator.write_triplet_shards(df, shard_dir, config.training.triplet_shard_rows)
+        )
+        train_dataset = triplet_creator.load_triplet_shards(paths)
+    else:
+        train_dataset = triplet_creator.create_triplet_dataset(df)
     
     # Train
     trainer = ModelTrainer(model, config.training)
-    trainer.train(train_dataset, config.data.output_dir)
+    trainer.train(train_dataset, config.data.output_dir, num_examples=num_examples, checkpoint_dir=checkpoint_dir)
+    if distributed.is_main_process():
+        save_manifest(final_dir, {**trained, **fingerprints})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
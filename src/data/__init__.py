@@ -2,12 +2,14 @@
 Data access and preprocessing tools.
 """
 
+from .hard_negatives import HardNegativeMiner
 from .loader import DataLoader
 from .preprocessor import TextPreprocessor
 from .triplet_dataset import TripletDatasetCreator
 
 __all__ = [
     "DataLoader",
+    "HardNegativeMiner",
     "TextPreprocessor",
     "TripletDatasetCreator",
 ]
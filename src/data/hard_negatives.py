@@ -0,0 +1,116 @@
+"""
+Hard-negative mining for triplet training.
+
+Every distinct text of the training frame is embedded once with the current model.
+Then, per rule, each distinct positive example becomes an anchor paired with the
+negatives of that rule (across all of its rows) that are most similar to it. The
+similarity search is blocked over both anchors and negatives, so memory is bounded
+by ``block_size ** 2`` however large a rule's pool is.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from datasets import Dataset
+
+from .triplet_dataset import NEGATIVE_COLUMNS, POSITIVE_COLUMNS
+
+if TYPE_CHECKING:
+    from src.features.embeddings import EmbeddingGenerator
+
+logger = logging.getLogger(__name__)
+
+
+def top_k_similar(queries: np.ndarray, pool: np.ndarray, k: int, block_size: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and dot-product similarities of the ``k`` most similar pool rows per query.
+
+    Query and pool blocks of ``block_size`` rows are multiplied one pair at a time,
+    keeping a running top-k per query. Results are sorted by decreasing similarity.
+    """
+    k = min(k, len(pool))
+    best_sims = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((len(queries), k), dtype=np.int64)
+
+    for q_start in range(0, len(queries), block_size):
+        block = queries[q_start : q_start + block_size]
+        sims_view = best_sims[q_start : q_start + len(block)]
+        ids_view = best_ids[q_start : q_start + len(block)]
+
+        for p_start in range(0, len(pool), block_size):
+            sims = block @ pool[p_start : p_start + block_size].T
+            candidate_sims = np.concatenate([sims_view, sims], axis=1)
+            candidate_ids = np.concatenate(
+                [ids_view, np.broadcast_to(np.arange(p_start, p_start + sims.shape[1]), sims.shape)], axis=1
+            )
+            top = np.argpartition(-candidate_sims, k - 1, axis=1)[:, :k]
+            sims_view[:] = np.take_along_axis(candidate_sims, top, axis=1)
+            ids_view[:] = np.take_along_axis(candidate_ids, top, axis=1)
+
+    order = np.argsort(-best_sims, axis=1, kind="stable")
+    return np.take_along_axis(best_ids, order, axis=1), np.take_along_axis(best_sims, order, axis=1)
+
+
+class HardNegativeMiner:
+    """Build triplets from the hardest same-rule negatives of each positive example.
+
+    Args:
+        embedding_generator: Embeds the candidate pool (its model is the one being trained)
+        negatives_per_anchor: Hardest negatives kept per anchor, one triplet each
+        block_size: Rows per block of the anchor x negative similarity search
+        seed: Seed for drawing each anchor's positive among the other positives of its rule
+    """
+
+    def __init__(
+        self,
+        embedding_generator: "EmbeddingGenerator",
+        negatives_per_anchor: int = 3,
+        block_size: int = 4096,
+        seed: Optional[int] = None,
+    ):
+        self.embedding_generator = embedding_generator
+        self.negatives_per_anchor = negatives_per_anchor
+        self.block_size = block_size
+        self.seed = seed
+
+    @staticmethod
+    def rule_pools(df: pd.DataFrame) -> Dict[str, Tuple[List[str], List[str]]]:
+        """Distinct positive and negative examples of each rule, in order of first appearance."""
+        pools = {}
+        for rule, group in df.groupby("rule", sort=False, observed=True):
+            pools[rule] = tuple(
+                [text for text in pd.unique(group[columns].to_numpy().ravel()) if pd.notna(text) and text]
+                for columns in (POSITIVE_COLUMNS, NEGATIVE_COLUMNS)
+            )
+        return pools
+
+    def mine(self, df: pd.DataFrame) -> Dataset:
+        """Return a triplet dataset of (anchor, positive, hardest negative) rows."""
+        pools = self.rule_pools(df)
+        texts = [text for positives, negatives in pools.values() for text in positives + negatives]
+        embeddings = self.embedding_generator.build_text_embeddings(texts)
+
+        rng = np.random.default_rng(self.seed)
+        triplets = {"anchor": [], "positive": [], "negative": []}
+        for positives, negatives in pools.values():
+            if not positives or not negatives:
+                continue
+
+            anchors = np.stack([embeddings[text] for text in positives])
+            pool = np.stack([embeddings[text] for text in negatives])
+            negative_ids, _ = top_k_similar(anchors, pool, self.negatives_per_anchor, self.block_size)
+
+            # Positive: another positive of the same rule (the anchor itself if it is the only one)
+            offsets = rng.integers(1, len(positives), len(positives)) if len(positives) > 1 else 0
+            positive_ids = (np.arange(len(positives)) + offsets) % len(positives)
+
+            k = negative_ids.shape[1]
+            triplets["anchor"].extend(np.repeat(np.array(positives, dtype=object), k).tolist())
+            triplets["positive"].extend(np.repeat(np.array(positives, dtype=object)[positive_ids], k).tolist())
+            triplets["negative"].extend(np.array(negatives, dtype=object)[negative_ids.ravel()].tolist())
+
+        logger.info(f"Mined {len(triplets['anchor'])} hard-negative triplets over {len(pools)} rules")
+        return Dataset.from_dict(triplets)
@@ -0,0 +1,83 @@
+"""
+Incremental fine-tuning: train only on rules whose examples changed.
+
+The examples of each rule are hashed into a fingerprint, and the fingerprints a
+model was trained on are stored next to it in ``training_rules.json``. A later run
+compares the current fingerprints with that manifest; rules that are new or whose
+example rows changed are retrained, together with a replay sample of rows from
+unchanged rules so the model does not drift away from them.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .triplet_dataset import NEGATIVE_COLUMNS, POSITIVE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "training_rules.json"
+
+
+def rule_fingerprints(df: pd.DataFrame) -> Dict[str, str]:
+    """Hash each rule's example rows (order-independent, duplicates counted)."""
+    columns = POSITIVE_COLUMNS + NEGATIVE_COLUMNS
+    fingerprints = {}
+    for rule, group in df.groupby("rule", sort=False, observed=True):
+        rows = sorted("\x1f".join(row) for row in group[columns].fillna("").astype(str).itertuples(index=False))
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (rule, *rows):
+            encoded = part.encode("utf-8")
+            digest.update(len(encoded).to_bytes(8, "little"))
+            digest.update(encoded)
+        fingerprints[rule] = digest.hexdigest()
+    return fingerprints
+
+
+def changed_rules(current: Dict[str, str], previous: Dict[str, str]) -> List[str]:
+    """Rules of ``current`` that are missing from ``previous`` or have a different fingerprint."""
+    return [rule for rule, fingerprint in current.items() if previous.get(rule) != fingerprint]
+
+
+def changeset_id(current: Dict[str, str], rules: List[str]) -> str:
+    """Short id of a set of rule fingerprints; names the checkpoint directory of an incremental run."""
+    digest = hashlib.blake2b(digest_size=8)
+    for rule in sorted(rules):
+        digest.update(f"{rule}\x00{current[rule]}\x00".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def incremental_rows(df: pd.DataFrame, rules: List[str], replay_fraction: float, seed=None) -> pd.DataFrame:
+    """Rows of ``rules`` plus a uniform replay sample of the other rows.
+
+    The replay sample holds ``replay_fraction`` times as many rows as the changed
+    rules, so the training set grows with the change rather than with the corpus.
+    """
+    selected = df["rule"].isin(rules).to_numpy()
+    others = np.flatnonzero(~selected)
+    replay = min(len(others), int(round(selected.sum() * replay_fraction)))
+    replayed = np.random.default_rng(seed).choice(others, replay, replace=False)
+    keep = np.sort(np.concatenate([np.flatnonzero(selected), replayed]))
+
+    logger.info(f"Incremental training on {selected.sum()} rows of {len(rules)} rules plus {replay} replay rows")
+    return df.iloc[keep]
+
+
+def load_manifest(model_dir: str) -> Dict[str, str]:
+    """Rule fingerprints the model in ``model_dir`` was trained on (empty if none were recorded)."""
+    path = os.path.join(model_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(model_dir: str, fingerprints: Dict[str, str]):
+    os.makedirs(model_dir, exist_ok=True)
+    with open(os.path.join(model_dir, MANIFEST_FILE), "w") as f:
+        json.dump(fingerprints, f, indent=2, sort_keys=True)
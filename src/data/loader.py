@@ -1,36 +1,155 @@
 import logging
-from typing import Tuple
+import os
+from typing import Iterator, Optional, Sequence, Tuple, Union
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
 
 logger = logging.getLogger(__name__)
 
+REQUIRED_COLUMNS = [
+    "row_id",
+    "body",
+    "rule",
+    "positive_example_1",
+    "positive_example_2",
+    "negative_example_1",
+    "negative_example_2",
+]
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+
+def _arrow_dtype(arrow_type: pa.DataType):
+    # Keep Arrow buffers (no per-row Python strings); dictionary columns become categoricals
+    return None if pa.types.is_dictionary(arrow_type) else pd.ArrowDtype(arrow_type)
+
+
+def _project(names: Sequence[str], columns: Optional[Sequence[str]]) -> Optional[list]:
+    # Only request columns the file has, so validate_data can report the missing ones
+    return None if columns is None else [col for col in columns if col in names]
+
+
+def _rechunk(batches: Iterator[pa.RecordBatch], chunksize: int) -> Iterator[pa.Table]:
+    # Regroup record batches into tables of chunksize rows (the last may be shorter) without copying
+    pending, rows = [], 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, chunksize)
+            rest = table.slice(chunksize)
+            pending, rows = rest.to_batches(), rest.num_rows
+    if rows:
+        yield pa.Table.from_batches(pending)
+
+
+def _encode_rule(table: pa.Table) -> pa.Table:
+    index = table.schema.get_field_index("rule")
+    if index < 0 or pa.types.is_dictionary(table.schema.field(index).type):
+        return table
+    return table.set_column(index, "rule", pc.dictionary_encode(table.column(index)))
+
 
 class DataLoader:
-    """Load and validate data."""
+    """Load and validate data.
+
+    CSV, Parquet and Arrow IPC (Feather v2) inputs are recognized by extension. Only
+    ``columns`` are read, and ``rule`` is loaded as a categorical. Columnar inputs
+    keep their string columns Arrow-backed; Arrow files can be memory-mapped so
+    loading does not copy the data.
+    """
 
     @staticmethod
-    def load_test_data(file_path: str) -> pd.DataFrame:
-        """Load test data from file."""
+    def load_test_data(
+        file_path: str, columns: Optional[Sequence[str]] = REQUIRED_COLUMNS, memory_map: bool = False
+    ) -> pd.DataFrame:
+        """Load test data from file.
+
+        Args:
+            file_path: CSV, Parquet or Arrow IPC file
+            columns: Columns to read (None reads all)
+            memory_map: Memory-map Parquet/Arrow files instead of reading them into memory
+        """
         logger.info(f"Loading test data from {file_path}...")
-        df = pd.read_csv(file_path)
+
+        if file_path.endswith(PARQUET_EXTENSIONS) or file_path.endswith(ARROW_EXTENSIONS):
+            table = DataLoader._read_table(file_path, columns, memory_map)
+            df = _encode_rule(table).to_pandas(types_mapper=_arrow_dtype)
+        else:
+            usecols = None if columns is None else (lambda col: col in columns)
+            df = pd.read_csv(file_path, usecols=usecols, dtype={"rule": "category"})
+
         logger.info(f"Loaded {len(df)} test examples with {df['rule'].nunique()} unique rules")
         return df
 
     @staticmethod
-    def validate_data(df: pd.DataFrame) -> bool:
-        """Validate data."""
-        required_cols = [
-            "row_id",
-            "body",
-            "rule",
-            "positive_example_1",
-            "positive_example_2",
-            "negative_example_1",
-            "negative_example_2",
-        ]
-
-        missing_cols = set(required_cols) - set(df.columns)
+    def iter_test_data(
+        file_path: str, chunksize: int, columns: Optional[Sequence[str]] = REQUIRED_COLUMNS, memory_map: bool = False
+    ) -> Iterator[pd.DataFrame]:
+        """Stream test data from file in chunks of ``chunksize`` rows."""
+        logger.info(f"Streaming test data from {file_path} in chunks of {chunksize} rows...")
+
+        if file_path.endswith(PARQUET_EXTENSIONS):
+            parquet_file = pq.ParquetFile(file_path, memory_map=memory_map)
+            projection = _project(parquet_file.schema_arrow.names, columns)
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=projection):
+                yield _encode_rule(pa.Table.from_batches([batch])).to_pandas(types_mapper=_arrow_dtype)
+        elif file_path.endswith(ARROW_EXTENSIONS):
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(file_path)
+            # Record batches are read one at a time, so peak memory stays around one chunk
+            with pa.memory_map(file_path) if memory_map else pa.OSFile(file_path) as source:
+                reader = ipc.open_file(source)
+                projection = _project(reader.schema.names, columns)
+                batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+                for table in _rechunk(batches, chunksize):
+                    table = table if projection is None else table.select(projection)
+                    yield _encode_rule(table).to_pandas(types_mapper=_arrow_dtype)
+        else:
+            usecols = None if columns is None else (lambda col: col in columns)
+            with pd.read_csv(file_path, chunksize=chunksize, usecols=usecols) as reader:
+                yield from reader
+
+    @staticmethod
+    def read_schema(file_path: str) -> pa.Schema:
+        """Read the schema of a Parquet or Arrow IPC file without loading any rows."""
+        if file_path.endswith(PARQUET_EXTENSIONS):
+            return pq.read_schema(file_path)
+        if file_path.endswith(ARROW_EXTENSIONS):
+            with pa.memory_map(file_path) as source:
+                return ipc.open_file(source).schema
+        raise ValueError(f"No schema for {file_path}: expected one of {PARQUET_EXTENSIONS + ARROW_EXTENSIONS}")
+
+    @staticmethod
+    def _read_table(file_path: str, columns: Optional[Sequence[str]], memory_map: bool) -> pa.Table:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+
+        if file_path.endswith(PARQUET_EXTENSIONS):
+            projection = _project(pq.read_schema(file_path).names, columns)
+            return pq.read_table(file_path, columns=projection, memory_map=memory_map)
+
+        if memory_map:
+            # Zero-copy: the table's buffers point into the mapping, which they keep alive
+            table = ipc.open_file(pa.memory_map(file_path)).read_all()
+        else:
+            with pa.OSFile(file_path) as source:
+                table = ipc.open_file(source).read_all()
+        projection = _project(table.schema.names, columns)
+        return table if projection is None else table.select(projection)
+
+    @staticmethod
+    def validate_data(data: Union[pd.DataFrame, pa.Schema]) -> bool:
+        """Validate data (a dataframe, or a file schema from ``read_schema``)."""
+        names = data.names if isinstance(data, pa.Schema) else data.columns
+
+        missing_cols = set(REQUIRED_COLUMNS) - set(names)
         if missing_cols:
             logger.error(f"Missing required columns: {missing_cols}")
             return False
@@ -1,12 +1,50 @@
 import re
-from typing import List, Optional, Set
+from functools import lru_cache
+from typing import List, Optional
 from urllib.parse import urlparse
 
+import numpy as np
 import pandas as pd
 
+URL_PATTERN = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+
+# Distinct URL-bearing strings remembered by clean_text
+CLEAN_CACHE_SIZE = 65536
+
+# Raw columns whose cleaned copies are attached by add_clean_columns
+TEXT_COLUMNS = ["body", "positive_example_1", "positive_example_2", "negative_example_1", "negative_example_2"]
+CLEAN_PREFIX = "clean_"
+
+
+def _replace_url(match) -> str:
+    url = match.group(0)
+    try:
+        parsed = urlparse(url)
+        domain = parsed.netloc.lower()
+        if domain.startswith("www."):
+            domain = domain[4:]
+
+        path_parts = [p for p in parsed.path.split("/") if p]
+        if path_parts:
+            important_path = "/".join(path_parts[:2])
+            return f"<url>: ({domain}/{important_path})"
+        else:
+            return f"<url>: ({domain})"
+    except Exception:
+        return "<url>: (unknown)"
+
+
+@lru_cache(maxsize=CLEAN_CACHE_SIZE)
+def _clean_urls(text: str) -> str:
+    return URL_PATTERN.sub(_replace_url, text)
+
 
 class TextPreprocessor:
-    """Preprocess text data."""
+    """Preprocess text data.
+
+    Cleaning is pure, so each raw string only needs it once: ``add_clean_columns``
+    attaches cleaned copies of the text columns that every downstream stage reads.
+    """
 
     @staticmethod
     def clean_text(text: Optional[str]) -> str:
@@ -14,42 +52,48 @@ class TextPreprocessor:
         if not text:
             return ""
 
-        url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
+        text = str(text)
+        if "http" not in text:
+            # Fast path: the URL pattern cannot match
+            return text
+        return _clean_urls(text)
 
-        def replace_url(match):
-            url = match.group(0)
-            try:
-                parsed = urlparse(url)
-                domain = parsed.netloc.lower()
-                if domain.startswith("www."):
-                    domain = domain[4:]
+    @staticmethod
+    def clean_series(series: pd.Series) -> pd.Series:
+        """Clean a column, running ``clean_text`` once per distinct value (NaN stays NaN)."""
+        codes, uniques = pd.factorize(series, sort=False)
+        cleaned = np.empty(len(uniques) + 1, dtype=object)
+        cleaned[:-1] = [TextPreprocessor.clean_text(text) for text in uniques]
+        cleaned[-1] = np.nan  # NaN codes (-1) hit the sentinel
+        return pd.Series(cleaned[codes], index=series.index, name=series.name)
 
-                path_parts = [p for p in parsed.path.split("/") if p]
-                if path_parts:
-                    important_path = "/".join(path_parts[:2])
-                    return f"<url>: ({domain}/{important_path})"
-                else:
-                    return f"<url>: ({domain})"
-            except:
-                return "<url>: (unknown)"
+    @staticmethod
+    def add_clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+        """Return ``df`` with ``clean_<col>`` copies of the text columns (existing ones are kept)."""
+        cleaned = {
+            CLEAN_PREFIX + col: TextPreprocessor.clean_series(df[col])
+            for col in TEXT_COLUMNS
+            if col in df.columns and CLEAN_PREFIX + col not in df.columns
+        }
+        return df.assign(**cleaned) if cleaned else df
 
-        return re.sub(url_pattern, replace_url, str(text))
+    @staticmethod
+    def cleaned_column(df: pd.DataFrame, col: str) -> pd.Series:
+        """Cleaned values of ``col``, reusing an attached ``clean_<col>`` column when present."""
+        clean_col = CLEAN_PREFIX + col
+        if clean_col in df.columns:
+            return df[clean_col]
+        return TextPreprocessor.clean_series(df[col])
 
     @staticmethod
     def collect_unique_texts(df: pd.DataFrame) -> List[str]:
         """Collect all unique texts from dataframe."""
-        all_texts = set()
-
-        # Add bodies
-        for body in df["body"]:
-            if pd.notna(body):
-                all_texts.add(TextPreprocessor.clean_text(body))
-
-        # Add positive and negative examples
-        example_cols = ["positive_example_1", "positive_example_2", "negative_example_1", "negative_example_2"]
-        for col in example_cols:
-            for example in df[col]:
-                if pd.notna(example):
-                    all_texts.add(TextPreprocessor.clean_text(example))
+        all_texts = {}
+
+        # Bodies, then positive and negative examples
+        for col in TEXT_COLUMNS:
+            for text in pd.unique(TextPreprocessor.cleaned_column(df, col)):
+                if pd.notna(text):
+                    all_texts[text] = None
 
         return list(all_texts)
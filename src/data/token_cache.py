@@ -0,0 +1,226 @@
+"""
+On-disk cache of tokenized training triplets.
+
+Tokenizing every anchor, positive and negative dominates data preparation and
+gives the same result on every run of a hyperparameter sweep. The cache stores
+the token ids of each triplet as Arrow stream shards (``list<int32>`` columns
+``anchor_input_ids``, ``positive_input_ids``, ``negative_input_ids``), which are
+memory-mapped on load. An entry is keyed by a fingerprint of the example columns
+of the dataframe, the tokenizer, ``max_seq_length`` and the triplet sampling
+settings (seed, augmentation factor, subsample fraction), so any change to those
+builds a new entry and anything else reuses it.
+
+``TokenizedTripletCollator`` pads the cached ids into the batch layout the
+sentence-transformers collator produces from text.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import torch
+from datasets import Dataset, concatenate_datasets
+
+from .triplet_dataset import NEGATIVE_COLUMNS, POSITIVE_COLUMNS, TRIPLET_COLUMNS, TripletDatasetCreator
+
+logger = logging.getLogger(__name__)
+
+TOKEN_COLUMNS = [f"{name}_input_ids" for name in TRIPLET_COLUMNS]
+TOKEN_SCHEMA = pa.schema([(name, pa.list_(pa.int32())) for name in TOKEN_COLUMNS])
+
+# Texts per tokenizer call while building an entry
+TOKENIZE_BATCH_SIZE = 4096
+
+
+def is_tokenized(dataset) -> bool:
+    """Whether ``dataset`` holds cached token ids rather than triplet texts."""
+    return set(TOKEN_COLUMNS) <= set(dataset.column_names or [])
+
+
+def tokenizer_fingerprint(model) -> str:
+    """Hash the tokenizer definition, lowercasing and ``max_seq_length`` of a SentenceTransformer."""
+    module = model[0]
+    tokenizer = module.tokenizer
+    if getattr(tokenizer, "is_fast", False):
+        definition = tokenizer.backend_tokenizer.to_str()
+    else:
+        definition = json.dumps(tokenizer.get_vocab(), sort_keys=True)
+
+    digest = hashlib.blake2b(digest_size=16)
+    settings = f"{type(tokenizer).__name__}|{getattr(module, 'do_lower_case', False)}|{model.max_seq_length}\x00"
+    digest.update(settings.encode("utf-8"))
+    digest.update(definition.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """Hash the example columns triplets are drawn from, in row order."""
+    hashes = pd.util.hash_pandas_object(df[POSITIVE_COLUMNS + NEGATIVE_COLUMNS], index=False)
+    return hashlib.blake2b(hashes.to_numpy().tobytes(), digest_size=16).hexdigest()
+
+
+class TokenizedTripletCache:
+    """Build and reuse tokenized triplet datasets under ``cache_dir``.
+
+    Each entry is a ``<fingerprint>/`` directory of ``tokens-*.arrow`` shards (one per
+    triplet block) plus ``meta.json``. Entries are written to a temporary directory
+    and renamed into place, so a crashed build never leaves a partial entry.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame, model, training_config) -> str:
+        parts = {
+            "data": dataframe_fingerprint(df),
+            "tokenizer": tokenizer_fingerprint(model),
+            "seed": getattr(training_config, "seed", None),
+            "augmentation_factor": training_config.augmentation_factor,
+            "subsample_fraction": training_config.subsample_fraction,
+        }
+        return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+    def entry_dir(self, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, fingerprint)
+
+    def load(self, fingerprint: str) -> Optional[Dataset]:
+        """Memory-map a cached entry, or return None if there is none."""
+        meta_path = os.path.join(self.entry_dir(fingerprint), "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        shards = [Dataset.from_file(os.path.join(self.entry_dir(fingerprint), name)) for name in meta["shards"]]
+        dataset = concatenate_datasets(shards) if shards else Dataset.from_dict({name: [] for name in TOKEN_COLUMNS})
+        logger.info(f"Loaded {len(dataset)} tokenized triplets from {self.entry_dir(fingerprint)}")
+        return dataset
+
+    def build(self, df: pd.DataFrame, model, creator: TripletDatasetCreator, fingerprint: str):
+        """Tokenize the creator's triplets for ``df`` into the entry ``fingerprint``.
+
+        Each distinct text is tokenized once, with the model's own tokenizing call
+        (``preprocess``, or ``tokenize`` on older sentence-transformers) so
+        truncation and lowercasing match training on text exactly.
+        """
+        tmp_dir = f"{self.entry_dir(fingerprint)}.tmp-{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        token_ids: Dict[str, np.ndarray] = {}
+        shards: List[str] = []
+        rows = 0
+
+        try:
+            for block in creator.iter_triplet_blocks(df):
+                texts = pd.unique(np.concatenate([block[name] for name in TRIPLET_COLUMNS]))
+                self._tokenize_missing(model, [text for text in texts if text not in token_ids], token_ids)
+
+                table = pa.table(
+                    {
+                        f"{name}_input_ids": pa.array([token_ids[text] for text in block[name]], pa.list_(pa.int32()))
+                        for name in TRIPLET_COLUMNS
+                    },
+                    schema=TOKEN_SCHEMA,
+                )
+                shards.append(f"tokens-{len(shards):05d}.arrow")
+                with pa.ipc.new_stream(os.path.join(tmp_dir, shards[-1]), TOKEN_SCHEMA) as writer:
+                    writer.write_table(table)
+                rows += table.num_rows
+
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({"fingerprint": fingerprint, "rows": rows, "shards": shards}, f)
+            try:
+                os.rename(tmp_dir, self.entry_dir(fingerprint))
+            except OSError:
+                # Another process committed the same entry first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Tokenized {rows} triplets ({len(token_ids)} distinct texts) into {self.entry_dir(fingerprint)}")
+
+    def build_if_missing(self, df: pd.DataFrame, model, creator: TripletDatasetCreator) -> str:
+        """Make sure an entry for ``df`` exists and return its fingerprint."""
+        fingerprint = self.fingerprint(df, model, creator.config)
+        if not os.path.exists(os.path.join(self.entry_dir(fingerprint), "meta.json")):
+            self.build(df, model, creator, fingerprint)
+        return fingerprint
+
+    def get_or_build(self, df: pd.DataFrame, model, creator: TripletDatasetCreator) -> Dataset:
+        """Cached tokenized triplets for ``df``, building them on a miss."""
+        return self.load(self.build_if_missing(df, model, creator))
+
+    @staticmethod
+    def _tokenize_missing(model, texts: List[str], token_ids: Dict[str, np.ndarray]):
+        # Imported here: src.models imports the trainer, which imports this module
+        from src.models.embedding_model import tokenize_function
+
+        tokenize = tokenize_function(model)
+        for start in range(0, len(texts), TOKENIZE_BATCH_SIZE):
+            chunk = texts[start : start + TOKENIZE_BATCH_SIZE]
+            encoded = tokenize(chunk)
+            ids = encoded["input_ids"].numpy()
+            mask = encoded["attention_mask"].numpy().astype(bool)
+            for text, row_ids, row_mask in zip(chunk, ids, mask):
+                token_ids[text] = row_ids[row_mask].astype(np.int32)
+
+
+class TokenizedTripletCollator:
+    """Pad cached token ids into ``{column}_input_ids`` / ``_attention_mask`` batches.
+
+    Model inputs besides ids and mask (e.g. BERT's ``token_type_ids``, all zero for
+    single sentences) and constant entries (e.g. ``modality``) are copied from the
+    layout of a probe batch, so the output matches the text collator's.
+    """
+
+    def __init__(self, pad_token_id: int = 0, padding_side: str = "right", zero_inputs=(), constants=None):
+        self.pad_token_id = pad_token_id
+        self.padding_side = padding_side
+        self.zero_inputs = tuple(zero_inputs)
+        self.constants = dict(constants or {})
+        # Read by the trainer when building batch samplers; triplets carry no labels
+        self.valid_label_columns: List[str] = []
+
+    @classmethod
+    def from_model(cls, model) -> "TokenizedTripletCollator":
+        from src.models.embedding_model import tokenize_function
+
+        tokenizer = model[0].tokenizer
+        probe = tokenize_function(model)(["probe"])
+        return cls(
+            pad_token_id=tokenizer.pad_token_id or 0,
+            padding_side=getattr(tokenizer, "padding_side", "right"),
+            zero_inputs=[
+                key
+                for key, value in probe.items()
+                if isinstance(value, torch.Tensor) and key not in ("input_ids", "attention_mask")
+            ],
+            constants={key: value for key, value in probe.items() if not isinstance(value, torch.Tensor)},
+        )
+
+    def __call__(self, features: List[dict]) -> Dict[str, object]:
+        batch = {}
+        for name in TRIPLET_COLUMNS:
+            sequences = [row[f"{name}_input_ids"] for row in features]
+            width = max(len(ids) for ids in sequences)
+            input_ids = torch.full((len(sequences), width), self.pad_token_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(sequences), width), dtype=torch.long)
+            for i, ids in enumerate(sequences):
+                span = slice(0, len(ids)) if self.padding_side == "right" else slice(width - len(ids), width)
+                input_ids[i, span] = torch.as_tensor(ids, dtype=torch.long)
+                attention_mask[i, span] = 1
+
+            batch[f"{name}_input_ids"] = input_ids
+            for key in self.zero_inputs:
+                batch[f"{name}_{key}"] = torch.zeros_like(input_ids)
+            batch[f"{name}_attention_mask"] = attention_mask
+            for key, value in self.constants.items():
+                batch[f"{name}_{key}"] = value
+        return batch
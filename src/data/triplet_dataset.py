@@ -1,47 +1,144 @@
 import logging
-import random
-from typing import List, Tuple
+import os
+from typing import Dict, Iterator, List
 
+import numpy as np
 import pandas as pd
-from datasets import Dataset
+import pyarrow as pa
+from datasets import Dataset, Features, IterableDataset, Value, concatenate_datasets
 
 logger = logging.getLogger(__name__)
 
+POSITIVE_COLUMNS = ["positive_example_1", "positive_example_2"]
+NEGATIVE_COLUMNS = ["negative_example_1", "negative_example_2"]
+TRIPLET_COLUMNS = ["anchor", "positive", "negative"]
+TRIPLET_SCHEMA = pa.schema([(name, pa.string()) for name in TRIPLET_COLUMNS])
+TRIPLET_FEATURES = Features({name: Value("string") for name in TRIPLET_COLUMNS})
+
+# Source rows expanded per block; bounds the triplets held in memory at once
+TRIPLET_BLOCK_ROWS = 65536
+
+
+def _compact_examples(df: pd.DataFrame, columns: List[str]):
+    """Per-row example matrix with non-null entries moved to the front, plus their counts."""
+    values = df[columns].to_numpy(dtype=object)
+    present = pd.notna(values)
+    order = np.argsort(~present, axis=1, kind="stable")
+    return np.take_along_axis(values, order, axis=1), present.sum(axis=1)
+
 
 class TripletDatasetCreator:
-    """Create triplet datasets for training."""
+    """Create triplet datasets for training.
+
+    For every row with at least one positive and one negative example,
+    ``augmentation_factor`` triplets are drawn: anchor and positive uniformly from
+    the row's positives, negative from its negatives. Sampling is vectorized with a
+    numpy ``Generator`` seeded from ``training_config.seed``, and rows are expanded in
+    blocks of ``TRIPLET_BLOCK_ROWS``, so the in-memory, streaming and sharded outputs
+    contain the same triplets in the same order for a given seed.
+
+    ``subsample_fraction`` keeps an exact uniform sample without replacement: each
+    block takes a hypergeometric share of the remaining quota. Triplets are shuffled
+    within each block.
+    """
 
     def __init__(self, training_config):
         self.config = training_config
+        self.seed = getattr(training_config, "seed", None)
+
+    def count_triplets(self, df: pd.DataFrame) -> int:
+        """Number of triplets the creator yields for ``df``."""
+        usable = (pd.notna(df[POSITIVE_COLUMNS]).any(axis=1) & pd.notna(df[NEGATIVE_COLUMNS]).any(axis=1)).sum()
+        return self._sample_size(int(usable) * self.config.augmentation_factor)
+
+    def iter_triplet_blocks(self, df: pd.DataFrame) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield triplets block by block as ``{"anchor", "positive", "negative"}`` arrays."""
+        rng = np.random.default_rng(self.seed)
+        repeats = self.config.augmentation_factor
+
+        positives, pos_counts = _compact_examples(df, POSITIVE_COLUMNS)
+        negatives, neg_counts = _compact_examples(df, NEGATIVE_COLUMNS)
+        usable = np.flatnonzero((pos_counts > 0) & (neg_counts > 0))
+
+        remaining = len(usable) * repeats
+        quota = self._sample_size(remaining)
+
+        for start in range(0, len(usable), TRIPLET_BLOCK_ROWS):
+            rows = np.repeat(usable[start : start + TRIPLET_BLOCK_ROWS], repeats)
+            picks = {
+                "anchor": (positives, pos_counts),
+                "positive": (positives, pos_counts),
+                "negative": (negatives, neg_counts),
+            }
+            slots = {name: (rng.random(len(rows)) * counts[rows]).astype(np.int64) for name, (_, counts) in picks.items()}
+
+            # Exact uniform subsample without replacement, one block at a time
+            keep = np.arange(len(rows))
+            if quota < remaining:
+                take = rng.hypergeometric(len(rows), remaining - len(rows), quota) if quota else 0
+                keep = rng.choice(len(rows), take, replace=False)
+                quota -= take
+            remaining -= len(rows)
+
+            keep = rng.permutation(keep)
+            block = {name: values[rows[keep], slots[name][keep]] for name, (values, _) in picks.items()}
+            if len(keep):
+                yield block
 
     def create_triplet_dataset(self, df: pd.DataFrame) -> Dataset:
         """Create triplet dataset from dataframe."""
-        triplets = []
+        blocks = list(self.iter_triplet_blocks(df))
+        triplets = {
+            name: np.concatenate([block[name] for block in blocks]).tolist() if blocks else [] for name in TRIPLET_COLUMNS
+        }
 
-        for _, row in df.iterrows():
-            rule = row["rule"]
+        logger.info(f"Created {len(triplets['anchor'])} triplets")
+        return Dataset.from_dict(triplets)
 
-            # Collect positive and negative examples
-            positives = [row["positive_example_1"], row["positive_example_2"]]
-            negatives = [row["negative_example_1"], row["negative_example_2"]]
+    def create_iterable_dataset(self, df: pd.DataFrame) -> IterableDataset:
+        """Stream triplets without materializing them; every pass yields the same sequence."""
 
-            # Remove NaN values
-            positives = [p for p in positives if pd.notna(p)]
-            negatives = [n for n in negatives if pd.notna(n)]
+        def generate(frame):
+            for block in self.iter_triplet_blocks(frame):
+                for anchor, positive, negative in zip(block["anchor"], block["positive"], block["negative"]):
+                    yield {"anchor": anchor, "positive": positive, "negative": negative}
 
-            # Create triplets: (anchor, positive, negative)
-            for _ in range(self.config.augmentation_factor):
-                if positives and negatives:
-                    anchor = random.choice(positives)
-                    positive = random.choice(positives)
-                    negative = random.choice(negatives)
+        return IterableDataset.from_generator(generate, features=TRIPLET_FEATURES, gen_kwargs={"frame": df})
 
-                    triplets.append({"anchor": anchor, "positive": positive, "negative": negative})
+    def write_triplet_shards(self, df: pd.DataFrame, output_dir: str, shard_rows: int = 1_000_000) -> List[str]:
+        """Write triplets as Arrow stream shards of up to ``shard_rows`` rows; returns their paths."""
+        os.makedirs(output_dir, exist_ok=True)
+        paths: List[str] = []
+        writer = None
+        written = 0
 
-        # Subsample if needed
-        if self.config.subsample_fraction < 1.0:
-            sample_size = int(len(triplets) * self.config.subsample_fraction)
-            triplets = random.sample(triplets, sample_size)
+        try:
+            for block in self.iter_triplet_blocks(df):
+                table = pa.table({name: pa.array(block[name], type=pa.string()) for name in TRIPLET_COLUMNS})
+                while table.num_rows:
+                    if writer is None or written == shard_rows:
+                        if writer is not None:
+                            writer.close()
+                        paths.append(os.path.join(output_dir, f"triplets-{len(paths):05d}.arrow"))
+                        writer = pa.ipc.new_stream(paths[-1], TRIPLET_SCHEMA)
+                        written = 0
+                    part = table.slice(0, shard_rows - written)
+                    writer.write_table(part)
+                    written += part.num_rows
+                    table = table.slice(part.num_rows)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        logger.info(f"Wrote {len(paths)} triplet shards to {output_dir}")
+        return paths
 
-        logger.info(f"Created {len(triplets)} triplets")
-        return Dataset.from_list(triplets)
+    @staticmethod
+    def load_triplet_shards(paths: List[str]) -> Dataset:
+        """Memory-map shards written by ``write_triplet_shards`` as one dataset."""
+        return concatenate_datasets([Dataset.from_file(path) for path in paths])
+
+    def _sample_size(self, total: int) -> int:
+        if self.config.subsample_fraction < 1.0:
+            return int(total * self.config.subsample_fraction)
+        return total
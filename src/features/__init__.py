@@ -3,9 +3,15 @@ Feature engineering modules.
 """
 
 from .centroids import CentroidBuilder
+from .embedding_store import EmbeddingStore
 from .embeddings import EmbeddingGenerator
+from .encode_pool import EncodePool
+from .near_duplicates import NearDuplicateClusterer
 
 __all__ = [
     "CentroidBuilder",
     "EmbeddingGenerator",
+    "EmbeddingStore",
+    "EncodePool",
+    "NearDuplicateClusterer",
 ]
@@ -1,11 +1,16 @@
 import logging
-from typing import Dict, List
+from typing import Dict, Mapping, Sequence
 
 import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+EXAMPLE_COLUMNS = {
+    "positive": ["positive_example_1", "positive_example_2"],
+    "negative": ["negative_example_1", "negative_example_2"],
+}
+
 
 class CentroidBuilder:
     """Build centroids from examples."""
@@ -14,51 +19,125 @@ class CentroidBuilder:
     def build_rule_centroids(
         df: pd.DataFrame, text_to_embedding: Dict[str, np.ndarray], rule_embeddings: Dict[str, np.ndarray], text_preprocessor
     ) -> Dict:
-        """Create centroids for each rule."""
+        """Create centroids for each rule.
+
+        The cleaned example columns (attached by ``add_clean_columns`` or cleaned here)
+        are flattened into one long (row, column) sequence per polarity, each distinct
+        example is looked up once, and per-rule sums and counts are computed with a
+        single segment reduction. Repeated examples are weighted by how often they occur.
+        """
         logger.info("Building rule centroids...")
 
-        rule_centroids = {}
+        rules, long_tables = CentroidBuilder._example_table(df, text_to_embedding, text_preprocessor)
+        sums: Dict[str, np.ndarray] = {}
+        counts: Dict[str, np.ndarray] = {}
+
+        for kind, (targets, rows, matrix) in long_tables.items():
+            counts[kind] = np.bincount(targets, minlength=len(rules))
+            if matrix is not None:
+                sums[kind] = np.zeros((len(rules), matrix.shape[1]), dtype=matrix.dtype)
+                np.add.at(sums[kind], targets, matrix[rows])
 
-        for rule in df["rule"].unique():
-            rule_data = df[df["rule"] == rule]
-
-            # Collect positive/negative embeddings
-            pos_embeddings = []
-            neg_embeddings = []
-
-            for _, row in rule_data.iterrows():
-                # Positive examples (violating)
-                for col in ["positive_example_1", "positive_example_2"]:
-                    if pd.notna(row[col]):
-                        clean = text_preprocessor.clean_text(row[col])
-                        if clean in text_to_embedding:
-                            pos_embeddings.append(text_to_embedding[clean])
-
-                # Negative examples (compliant)
-                for col in ["negative_example_1", "negative_example_2"]:
-                    if pd.notna(row[col]):
-                        clean = text_preprocessor.clean_text(row[col])
-                        if clean in text_to_embedding:
-                            neg_embeddings.append(text_to_embedding[clean])
-
-            if pos_embeddings and neg_embeddings:
-                pos_arr = np.array(pos_embeddings)
-                neg_arr = np.array(neg_embeddings)
-
-                # Compute and normalize centroids
-                pos_centroid = pos_arr.mean(axis=0)
-                neg_centroid = neg_arr.mean(axis=0)
-
-                pos_centroid /= np.linalg.norm(pos_centroid)
-                neg_centroid /= np.linalg.norm(neg_centroid)
-
-                rule_centroids[rule] = {
-                    "positive": pos_centroid,
-                    "negative": neg_centroid,
-                    "pos_count": len(pos_embeddings),
-                    "neg_count": len(neg_embeddings),
-                    "rule_embedding": rule_embeddings[rule],
-                }
+        if not sums.keys() >= EXAMPLE_COLUMNS.keys():
+            logger.info("Created centroids for 0 rules")
+            return {}
 
+        rule_centroids = CentroidBuilder.finalize_centroids(
+            list(rules), sums["positive"], sums["negative"], counts["positive"], counts["negative"], rule_embeddings
+        )
         logger.info(f"Created centroids for {len(rule_centroids)} rules")
         return rule_centroids
+
+    @staticmethod
+    def build_rule_examples(
+        df: pd.DataFrame, text_to_embedding: Dict[str, np.ndarray], text_preprocessor
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """Collect each rule's distinct positive and negative example embeddings.
+
+        Returns ``{rule: {"positive": (P, D), "negative": (N, D)}}`` for rules with both
+        kinds of examples, as used by the kNN scoring mode.
+        """
+        rules, long_tables = CentroidBuilder._example_table(df, text_to_embedding, text_preprocessor)
+        grouped = {}
+
+        for kind, (targets, rows, matrix) in long_tables.items():
+            if matrix is None:
+                return {}
+            # Distinct (rule, example) pairs, sorted by rule so each rule is one slice
+            pairs = np.unique(np.stack([targets, rows], axis=1), axis=0)
+            bounds = np.searchsorted(pairs[:, 0], np.arange(len(rules) + 1))
+            grouped[kind] = [matrix[pairs[bounds[i] : bounds[i + 1], 1]] for i in range(len(rules))]
+
+        rule_examples = {
+            rule: {"positive": grouped["positive"][i], "negative": grouped["negative"][i]}
+            for i, rule in enumerate(rules)
+            if len(grouped["positive"][i]) and len(grouped["negative"][i])
+        }
+        logger.info(f"Collected examples for {len(rule_examples)} rules")
+        return rule_examples
+
+    @staticmethod
+    def _example_table(df: pd.DataFrame, text_to_embedding: Dict[str, np.ndarray], text_preprocessor):
+        """Flatten example columns into per-polarity (rule code, embedding row) pairs.
+
+        Returns the factorized rules and, per polarity, the rule code and embedding row
+        of every example occurrence that has an embedding, plus the matrix of distinct
+        example embeddings (None when there are none).
+        """
+        rule_codes, rules = pd.factorize(df["rule"], sort=False)
+        tables = {}
+
+        for kind, columns in EXAMPLE_COLUMNS.items():
+            # Row-major (row, column) order: positive_example_1, positive_example_2 per row
+            texts = np.column_stack([text_preprocessor.cleaned_column(df, col).to_numpy(dtype=object) for col in columns])
+            text_codes, unique_texts = pd.factorize(texts.ravel(), sort=False)
+            targets = np.repeat(rule_codes, len(columns))
+
+            embedding_rows = np.full(len(unique_texts) + 1, -1, dtype=np.int64)  # NaN codes (-1) hit the sentinel
+            embeddings = []
+            for i, text in enumerate(unique_texts):
+                embedding = text_to_embedding.get(text)
+                if embedding is not None:
+                    embedding_rows[i] = len(embeddings)
+                    embeddings.append(embedding)
+
+            rows = embedding_rows[text_codes]
+            valid = (rows >= 0) & (targets >= 0)
+            tables[kind] = (targets[valid], rows[valid], np.stack(embeddings) if embeddings else None)
+
+        return rules, tables
+
+    @staticmethod
+    def finalize_centroids(
+        rules: Sequence,
+        pos_sums: np.ndarray,
+        neg_sums: np.ndarray,
+        pos_counts: np.ndarray,
+        neg_counts: np.ndarray,
+        rule_embeddings: Mapping,
+    ) -> Dict:
+        """Turn per-rule (R, D) example sums and counts into normalized centroids.
+
+        Rules without both positive and negative examples get no centroid.
+        """
+        pos_counts = np.asarray(pos_counts)
+        neg_counts = np.asarray(neg_counts)
+        keep = np.flatnonzero((pos_counts > 0) & (neg_counts > 0))
+
+        pos = pos_sums[keep] / pos_counts[keep, None].astype(pos_sums.dtype)
+        neg = neg_sums[keep] / neg_counts[keep, None].astype(neg_sums.dtype)
+        pos /= np.linalg.norm(pos, axis=1, keepdims=True)
+        neg /= np.linalg.norm(neg, axis=1, keepdims=True)
+
+        rule_centroids = {}
+        for row, index in enumerate(keep):
+            rule = rules[index]
+            rule_centroids[rule] = {
+                "positive": pos[row],
+                "negative": neg[row],
+                "pos_count": int(pos_counts[index]),
+                "neg_count": int(neg_counts[index]),
+                "rule_embedding": rule_embeddings.get(rule),
+            }
+
+        return rule_centroids
@@ -0,0 +1,177 @@
+"""
+Persistent, memory-mapped embedding store shared across runs and processes.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+KEY_BYTES = 16
+
+
+class EmbeddingStore:
+    """Append-only embedding matrix on disk, indexed by text hash.
+
+    Each fingerprint gets its own namespace directory; it should identify everything
+    that changes the vectors (weights, ``max_seq_length``, normalization). Holds:
+
+    - ``embeddings.bin``: contiguous ``(rows, dim)`` matrix read through ``np.memmap``
+    - ``keys.bin``: one 16-byte text hash per matrix row
+    - ``meta.json``: committed row count, dimension, dtype and fingerprint
+
+    Readers never lock; they only see rows committed in ``meta.json``, which writers
+    replace atomically after appending. Writers serialize on a file lock, so several
+    processes may share one store.
+    """
+
+    def __init__(self, root_dir: str, fingerprint: str, dtype: str = "float32"):
+        self.fingerprint = fingerprint
+        namespace = hashlib.blake2b(fingerprint.encode("utf-8"), digest_size=8).hexdigest()
+        self.path = Path(root_dir) / namespace
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self.dtype = np.dtype(dtype)
+        self.dim: Optional[int] = None
+        self._rows = 0
+        self._index: Dict[bytes, int] = {}
+        self._matrix: Optional[np.memmap] = None
+
+        self.refresh()
+
+    @property
+    def _matrix_path(self) -> Path:
+        return self.path / "embeddings.bin"
+
+    @property
+    def _keys_path(self) -> Path:
+        return self.path / "keys.bin"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.path / "meta.json"
+
+    @staticmethod
+    def text_key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __contains__(self, text: str) -> bool:
+        return self.text_key(text) in self._index
+
+    def refresh(self):
+        """Pick up rows committed by other processes since the last refresh."""
+        if not self._meta_path.exists():
+            return
+
+        with open(self._meta_path, "r") as f:
+            meta = json.load(f)
+
+        if meta["dtype"] != self.dtype.name:
+            logger.warning("Embedding store %s uses %s; ignoring requested %s", self.path, meta["dtype"], self.dtype.name)
+            self.dtype = np.dtype(meta["dtype"])
+
+        rows = meta["rows"]
+        self.dim = meta["dim"]
+        if rows == self._rows:
+            return
+
+        # Only read the keys appended since the last refresh
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._rows * KEY_BYTES)
+            new_keys = f.read((rows - self._rows) * KEY_BYTES)
+        for offset in range(0, len(new_keys), KEY_BYTES):
+            self._index.setdefault(new_keys[offset : offset + KEY_BYTES], self._rows + offset // KEY_BYTES)
+
+        self._rows = rows
+        self._matrix = np.memmap(self._matrix_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Return float32 embeddings for stored texts and None for unknown ones."""
+        results: List[Optional[np.ndarray]] = []
+        for text in texts:
+            row = self._index.get(self.text_key(text))
+            results.append(None if row is None else np.asarray(self._matrix[row], dtype=np.float32))
+        return results
+
+    def add(self, texts: Sequence[str], embeddings: np.ndarray):
+        """Append embeddings for texts not already stored."""
+        embeddings = np.asarray(embeddings)
+        if len(texts) != len(embeddings):
+            raise ValueError("texts and embeddings must have the same length")
+        if not len(texts):
+            return
+
+        with self._write_lock():
+            self.refresh()
+
+            if self.dim is None:
+                self.dim = int(embeddings.shape[1])
+            elif embeddings.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {embeddings.shape[1]} does not match store dimension {self.dim}")
+
+            new_keys: Dict[bytes, int] = {}
+            for i, text in enumerate(texts):
+                key = self.text_key(text)
+                if key not in self._index and key not in new_keys:
+                    new_keys[key] = i
+            if not new_keys:
+                return
+
+            rows = embeddings[list(new_keys.values())].astype(self.dtype, copy=False)
+
+            # Drop any bytes left behind by a writer that crashed before committing
+            self._append(self._matrix_path, self._rows * self.dim * self.dtype.itemsize, rows.tobytes())
+            self._append(self._keys_path, self._rows * KEY_BYTES, b"".join(new_keys))
+
+            meta = {
+                "fingerprint": self.fingerprint,
+                "dtype": self.dtype.name,
+                "dim": self.dim,
+                "rows": self._rows + len(new_keys),
+            }
+            tmp_path = self._meta_path.with_suffix(".json.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self._meta_path)
+
+            self.refresh()
+
+        logger.info("Stored %d new embeddings (%d total) in %s", len(new_keys), self._rows, self.path)
+
+    @staticmethod
+    def _append(path: Path, committed_bytes: int, payload: bytes):
+        with open(path, "ab") as f:
+            f.truncate(committed_bytes)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        if fcntl is None:
+            yield
+            return
+
+        with open(self.path / ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -10,28 +10,53 @@ from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tupl
 import numpy as np
 import pandas as pd
 
+from src.utils.metrics import REGISTRY
+
 logger = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
     from src.data.preprocessor import TextPreprocessor
+    from src.features.embedding_store import EmbeddingStore
+    from src.features.encode_pool import EncodePool
+    from src.features.near_duplicates import NearDuplicateClusterer
     from src.models.embedding_model import EmbeddingModel
 
 
 class EmbeddingGenerator:
-    """Generate and cache embeddings for arbitrary text collections."""
+    """Generate and cache embeddings for arbitrary text collections.
+
+    With an ``EncodePool`` the texts that still need encoding are sharded across
+    its worker processes instead of going through ``model`` in this process. With a
+    ``NearDuplicateClusterer`` only one representative of each near-duplicate group
+    is encoded and the other members reuse its embedding; ``encodes_saved`` counts
+    the skipped encodes.
+    """
 
-    def __init__(self, model: "EmbeddingModel", batch_size: int = 64, normalize: bool = True):
+    def __init__(
+        self,
+        model: "EmbeddingModel",
+        batch_size: int = 64,
+        normalize: bool = True,
+        store: Optional["EmbeddingStore"] = None,
+        pool: Optional["EncodePool"] = None,
+        near_duplicates: Optional["NearDuplicateClusterer"] = None,
+    ):
         if model is None:
             raise ValueError("An initialized EmbeddingModel instance is required.")
 
         self.model = model
         self.batch_size = batch_size
         self.normalize = normalize
+        self.store = store
+        self.pool = pool
+        self.near_duplicates = near_duplicates
+        self.encodes_saved = 0
 
     def build_text_embeddings(
         self,
         texts: Sequence[str],
         existing_embeddings: Optional[Dict[str, np.ndarray]] = None,
+        reuse_near_duplicates: bool = True,
     ) -> Dict[str, np.ndarray]:
         """Encode a sequence of texts, avoiding redundant computation."""
         embedding_store = dict(existing_embeddings or {})
@@ -40,15 +65,45 @@ class EmbeddingGenerator:
         if not unique_texts:
             return embedding_store
 
-        logger.info("Encoding %d unique texts", len(unique_texts))
-        embeddings = self.model.encode(
-            list(unique_texts),
+        if self.store is not None:
+            # Reuse embeddings persisted by earlier runs; only unseen texts are encoded
+            stored = self.store.get_many(unique_texts)
+            for text, emb in zip(unique_texts, stored):
+                if emb is not None:
+                    embedding_store[text] = emb
+            unique_texts = [text for text, emb in zip(unique_texts, stored) if emb is None]
+            logger.info("Embedding store provided %d texts", len(stored) - len(unique_texts))
+
+            if not unique_texts:
+                return embedding_store
+
+        # Texts to encode, and the position in that list whose embedding each text takes
+        to_encode = unique_texts
+        source = np.arange(len(unique_texts))
+        if self.near_duplicates is not None and reuse_near_duplicates and len(unique_texts) > 1:
+            representative = self.near_duplicates.cluster(unique_texts)
+            encoded_ids, source = np.unique(representative, return_inverse=True)
+            to_encode = [unique_texts[i] for i in encoded_ids]
+            saved = len(unique_texts) - len(to_encode)
+            self.encodes_saved += saved
+            REGISTRY.counter("near_duplicate_encodes_saved_total", "Encodes skipped by near-duplicate reuse").inc(saved)
+            logger.info("Near-duplicate reuse saved %d of %d encodes", saved, len(unique_texts))
+
+        logger.info("Encoding %d unique texts", len(to_encode))
+        encoder = self.pool or self.model
+        embeddings = encoder.encode(
+            list(to_encode),
             batch_size=self.batch_size,
             normalize=self.normalize,
         )
+        logger.info("Padding ratio: %.1f%%", 100 * getattr(encoder, "last_padding_ratio", 0.0))
+
+        for text, index in zip(unique_texts, source):
+            embedding_store[text] = np.asarray(embeddings[index])
 
-        for text, emb in zip(unique_texts, embeddings):
-            embedding_store[text] = np.asarray(emb)
+        if self.store is not None:
+            # Only exact embeddings are persisted; reused ones stay local to this run
+            self.store.add(to_encode, embeddings)
 
         return embedding_store
 
@@ -74,7 +129,8 @@ class EmbeddingGenerator:
             cleaned_rules.append(cleaned_rule)
 
         cleaned_rules = self._deduplicate(cleaned_rules)
-        rule_text_embeddings = self.build_text_embeddings(cleaned_rules, text_embeddings)
+        # Rules are few and distinct; never let two similar rules share an embedding
+        rule_text_embeddings = self.build_text_embeddings(cleaned_rules, text_embeddings, reuse_near_duplicates=False)
 
         rule_embeddings: Dict[str, np.ndarray] = {}
         for rule, cleaned_rule in rule_lookup.items():
@@ -0,0 +1,222 @@
+"""
+Multi-process CPU encoding pool.
+
+Each worker process loads the model once and pins its own ``torch`` thread count,
+so N workers x T threads can use every core of a batch node. Texts are sent to the
+workers in contiguous slices; the workers write their embeddings straight into a
+shared-memory output matrix at the slice offset, so results come back in input
+order without pickling arrays.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import traceback
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from src.models.embedding_model import EmbeddingModel
+
+logger = logging.getLogger(__name__)
+
+
+def _load_embedding_model(model_kwargs: dict):
+    from src.models.embedding_model import EmbeddingModel
+
+    model = EmbeddingModel(**model_kwargs)
+    model.load_model()
+    return model
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers the segment with the resource tracker; spawned workers
+        # share the parent's tracker, so that entry is dropped when the parent unlinks
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(model_factory: Callable, num_threads: int, tasks, results):
+    import torch
+
+    torch.set_num_threads(num_threads)
+    try:
+        model = model_factory()
+        dim = model.encode(["warm-up"], show_progress_bar=False).shape[1]
+    except Exception:
+        results.put(("error", traceback.format_exc()))
+        return
+    results.put(("ready", dim))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        shm_name, shape, start, texts, batch_size, normalize = task
+        try:
+            embeddings = model.encode(texts, batch_size=batch_size, normalize=normalize, show_progress_bar=False)
+            shm = _attach(shm_name)
+            try:
+                output = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+                output[start : start + len(texts)] = embeddings
+                del output
+            finally:
+                shm.close()
+            results.put(("done", len(texts), getattr(model, "last_padding_ratio", 0.0)))
+        except Exception:
+            results.put(("error", traceback.format_exc()))
+
+
+class EncodePool:
+    """Encode texts across worker processes with the ``EmbeddingModel.encode`` contract.
+
+    Args:
+        model_factory: Picklable callable that returns a loaded encoder in a worker
+        num_workers: Worker processes
+        threads_per_worker: ``torch`` threads per worker (default: cores / workers)
+        task_size: Texts per slice handed to a worker
+    """
+
+    def __init__(
+        self,
+        model_factory: Callable,
+        num_workers: int = 2,
+        threads_per_worker: Optional[int] = None,
+        task_size: int = 1024,
+    ):
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+
+        self.model_factory = model_factory
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        self.task_size = task_size
+        self.dim: Optional[int] = None
+        self.last_padding_ratio = 0.0
+
+        self._context = mp.get_context("spawn")  # fork is unsafe once torch threads exist
+        self._tasks = None
+        self._results = None
+        self._workers: List = []
+
+    @classmethod
+    def from_model(cls, model: "EmbeddingModel", **kwargs) -> "EncodePool":
+        """Build a pool whose workers load the same weights and settings as ``model`` (without its cache)."""
+        model_kwargs = {
+            "model_path": model.model_path,
+            "max_seq_length": model.max_seq_length,
+            "use_fp16": model.use_fp16,
+            "model_version": model.model_version,
+            "backend": model.backend,
+            "onnx_dir": model.onnx_dir,
+            "quantize": model.quantize,
+            "num_threads": kwargs.get("threads_per_worker") or model.num_threads,
+            "max_tokens_per_batch": model.max_tokens_per_batch,
+        }
+        return cls(functools.partial(_load_embedding_model, model_kwargs), **kwargs)
+
+    def start(self):
+        """Spawn the workers and wait until every model is loaded."""
+        if self._workers:
+            return
+
+        self._tasks = self._context.Queue()
+        self._results = self._context.Queue()
+
+        # The first worker loads alone, so one-time work (downloads, ONNX export) is not raced
+        self._spawn()
+        self.dim = self._wait_ready(1)
+        for _ in range(self.num_workers - 1):
+            self._spawn()
+        self._wait_ready(self.num_workers - 1)
+
+        logger.info(f"Started {self.num_workers} encode workers with {self.threads_per_worker} threads each")
+
+    def close(self):
+        """Stop the workers."""
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join(timeout=30)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+
+    def __enter__(self) -> "EncodePool":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def encode(
+        self, texts: List[str], batch_size: int = 64, normalize: bool = True, show_progress_bar: bool = False
+    ) -> np.ndarray:
+        """Generate embeddings for texts, in input order."""
+        self.start()
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        shape = (len(texts), self.dim)
+        shm = shared_memory.SharedMemory(create=True, size=len(texts) * self.dim * np.dtype(np.float32).itemsize)
+        try:
+            num_tasks = 0
+            for start in range(0, len(texts), self.task_size):
+                self._tasks.put((shm.name, shape, start, texts[start : start + self.task_size], batch_size, normalize))
+                num_tasks += 1
+
+            # Drain every slice before raising, so a failed call leaves the pool usable
+            padded = 0.0
+            errors = []
+            for _ in range(num_tasks):
+                message = self._next_result()
+                if message[0] == "error":
+                    errors.append(message[1])
+                else:
+                    padded += message[2] * message[1]
+            if errors:
+                raise RuntimeError(f"Encode worker failed:\n{errors[0]}")
+            self.last_padding_ratio = padded / len(texts)
+
+            return np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _spawn(self):
+        worker = self._context.Process(
+            target=_worker_main,
+            args=(self.model_factory, self.threads_per_worker, self._tasks, self._results),
+            daemon=True,
+        )
+        worker.start()
+        self._workers.append(worker)
+
+    def _wait_ready(self, count: int) -> Optional[int]:
+        dim = None
+        for _ in range(count):
+            message = self._next_result()
+            if message[0] == "error":
+                self.close()
+                raise RuntimeError(f"Encode worker failed to load the model:\n{message[1]}")
+            dim = message[1]
+        return dim
+
+    def _next_result(self) -> tuple:
+        while True:
+            try:
+                return self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [worker.pid for worker in self._workers if not worker.is_alive()]
+                if dead:
+                    self.close()
+                    raise RuntimeError(f"Encode workers {dead} exited unexpectedly")
@@ -0,0 +1,121 @@
+"""
+Near-duplicate clustering of texts with MinHash LSH.
+
+Texts are normalized (unicode NFKC, collapsed whitespace, lowercase) and turned into
+sets of character shingles. A MinHash signature estimates the Jaccard similarity of
+two shingle sets; signatures are split into bands and texts sharing any band land in
+the same bucket, so only bucket neighbours are compared. Each text joins the most
+similar earlier representative if its estimated similarity reaches the threshold,
+otherwise it becomes a representative itself: every member is therefore within the
+threshold of the text whose embedding it reuses.
+"""
+
+import logging
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.text_utils import normalize_unicode, normalize_whitespace
+
+logger = logging.getLogger(__name__)
+
+# Odd multiplier for the polynomial shingle hash (wraps modulo 2**64)
+SHINGLE_BASE = np.uint64(0x100000001B3)
+
+
+class NearDuplicateClusterer:
+    """Group texts whose estimated Jaccard similarity reaches ``threshold``.
+
+    Args:
+        threshold: Minimum estimated Jaccard similarity of character shingles
+        num_perm: MinHash signature length
+        bands: LSH bands; must divide ``num_perm``. More bands find more candidates
+        shingle_size: Characters per shingle
+        seed: Seed for the MinHash permutations
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16, shingle_size: int = 5, seed: int = 0):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Multiply-shift hashing: (a * x + b) mod 2**64, keep the high 32 bits
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self._powers = SHINGLE_BASE ** np.arange(shingle_size, dtype=np.uint64)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize a text before shingling."""
+        return normalize_whitespace(normalize_unicode(text)).lower()
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (``num_perm`` uint32 values) of a normalized text."""
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        width = min(self.shingle_size, len(codes))
+        count = len(codes) - width + 1
+        shingles = np.zeros(count, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for offset in range(width):
+                shingles += codes[offset : offset + count] * self._powers[offset]
+            shingles = np.unique(shingles)
+            hashed = (self._a[:, None] * shingles[None, :] + self._b[:, None]) >> np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def cluster(self, texts: Sequence[str]) -> np.ndarray:
+        """Return, for each text, the index of its cluster representative.
+
+        Representatives map to themselves and always precede their members, so the
+        result is deterministic for a given input order.
+        """
+        representative = np.arange(len(texts), dtype=np.int64)
+        signatures = np.empty((max(len(texts), 1), self.num_perm), dtype=np.uint32)
+        rep_ids: List[int] = []
+        exact: Dict[str, int] = {}
+        buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+        for i, text in enumerate(texts):
+            normalized = self.normalize(text)
+            if normalized in exact:
+                representative[i] = exact[normalized]
+                continue
+
+            signature = self.signature(normalized)
+            keys = [
+                (band, signature[band * self.rows_per_band : (band + 1) * self.rows_per_band].tobytes())
+                for band in range(self.bands)
+            ]
+            match = self._best_match(signature, keys, buckets, signatures, rep_ids)
+            if match is not None:
+                representative[i] = match
+                exact[normalized] = match
+                continue
+
+            exact[normalized] = i
+            slot = len(rep_ids)
+            rep_ids.append(i)
+            signatures[slot] = signature
+            for key in keys:
+                buckets.setdefault(key, []).append(slot)
+
+        logger.info(f"Clustered {len(texts)} texts into {len(rep_ids)} groups")
+        return representative
+
+    def _best_match(self, signature, keys, buckets, signatures, rep_ids):
+        candidates = sorted({slot for key in keys for slot in buckets.get(key, ())})
+        if not candidates:
+            return None
+
+        similarity = (signatures[candidates] == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.threshold:
+            return None
+        return rep_ids[candidates[best]]
@@ -2,8 +2,22 @@
 Inference and prediction modules.
 """
 
+from .admission import AdmissionController, QueueFullError
+from .batching import DeadlineExceededError, MicroBatcher
+from .centroid_cache import CentroidCache
+from .chunked import ChunkedInference
+from .knn import ExactIndex, IVFIndex, RuleIndex
 from .predictor import ViolationPredictor
 
 __all__ = [
+    "AdmissionController",
+    "QueueFullError",
+    "DeadlineExceededError",
+    "MicroBatcher",
+    "CentroidCache",
+    "ChunkedInference",
+    "ExactIndex",
+    "IVFIndex",
+    "RuleIndex",
     "ViolationPredictor",
 ]
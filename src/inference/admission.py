@@ -0,0 +1,58 @@
+"""
+Admission control for the online inference service.
+"""
+
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the admission queue is at capacity."""
+
+    def __init__(self, depth: int, retry_after_s: int):
+        super().__init__(f"Admission queue full ({depth} requests in flight)")
+        self.retry_after_s = retry_after_s
+
+
+class AdmissionController:
+    """Bound the number of in-flight model requests.
+
+    Requests beyond ``max_depth`` are rejected immediately instead of queueing
+    behind work the model cannot finish in time. Meant to be used from a single
+    event loop, so the counters need no locking.
+    """
+
+    def __init__(self, max_depth: int = 256, retry_after_s: int = 1):
+        if max_depth < 1:
+            raise ValueError("max_depth must be at least 1")
+
+        self.max_depth = max_depth
+        self.retry_after_s = retry_after_s
+        self.depth = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @contextmanager
+    def admit(self):
+        """Hold a queue slot for the duration of the block."""
+        if self.depth >= self.max_depth:
+            self.rejected += 1
+            logger.warning("Rejecting request: admission queue full (%d/%d)", self.depth, self.max_depth)
+            raise QueueFullError(self.depth, self.retry_after_s)
+
+        self.depth += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
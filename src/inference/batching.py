@@ -0,0 +1,216 @@
+"""
+Request coalescing for online embedding inference.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.metrics import REGISTRY, SIZE_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+EncodeFn = Callable[[List[str]], np.ndarray]
+_Pending = Tuple[List[str], asyncio.Future, Optional[float]]
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a request's deadline passes before its texts reach the model."""
+
+
+class MicroBatcher:
+    """Collect texts from concurrent callers and encode them in shared forward passes.
+
+    The first pending request opens a batching window. The window is flushed once
+    ``max_wait_ms`` has elapsed or ``max_batch_size`` texts are pending, whichever
+    comes first. Texts repeated across requests are encoded once per batch.
+
+    When an ``executor`` is given, ``encode_fn`` runs there so the event loop stays
+    free; up to ``max_concurrent_batches`` batches may be in flight at once.
+    Requests whose deadline has passed are dropped before they reach the model.
+    """
+
+    def __init__(
+        self,
+        encode_fn: EncodeFn,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+        max_concurrent_batches: int = 1,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be non-negative")
+        if max_concurrent_batches < 1:
+            raise ValueError("max_concurrent_batches must be at least 1")
+
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.max_concurrent_batches = max_concurrent_batches
+        self.expired = 0
+
+        self._pending: List[_Pending] = []
+        self._pending_size = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: set = set()
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    @property
+    def pending_texts(self) -> int:
+        """Number of texts waiting for a batch slot."""
+        return self._pending_size
+
+    def start(self):
+        """Start the background batching task on the running event loop."""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+        logger.info("Micro-batcher started (max_batch_size=%d, max_wait_ms=%.1f)", self.max_batch_size, self.max_wait * 1000)
+
+    async def stop(self):
+        """Stop the batching task and fail any requests still waiting."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        pending, self._pending, self._pending_size = self._pending, [], 0
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped"))
+
+    async def encode(self, texts: Sequence[str], deadline: Optional[float] = None) -> np.ndarray:
+        """Queue texts for the next batch and wait for their embeddings.
+
+        Args:
+            texts: Texts to encode
+            deadline: Optional event-loop time (``loop.time()``) after which the
+                request is dropped with DeadlineExceededError instead of encoded
+        """
+        if not self.running:
+            raise RuntimeError("Micro-batcher is not running. Call start() first.")
+
+        texts = list(texts)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((texts, future, deadline))
+        self._pending_size += len(texts)
+        self._wakeup.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await self._wakeup.wait()
+
+            # Hold the window open until it is full or the wait budget is spent
+            deadline = loop.time() + self.max_wait
+            while self._pending_size < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            # Wait for a free batch slot; requests keep accumulating meanwhile
+            await self._slots.acquire()
+            batch = self._take_batch(loop.time())
+            if self._pending:
+                # Leftovers beyond the cap open the next window immediately
+                self._wakeup.set()
+            else:
+                self._wakeup.clear()
+
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = loop.create_task(self._flush(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._on_flush_done)
+
+    def _on_flush_done(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        self._slots.release()
+
+    def _take_batch(self, now: float) -> List[Tuple[List[str], asyncio.Future]]:
+        """Pop pending requests up to the batch cap (always at least one live request)."""
+        batch = []
+        size = 0
+
+        while self._pending:
+            texts, future, deadline = self._pending[0]
+            if batch and size + len(texts) > self.max_batch_size:
+                break
+            self._pending.pop(0)
+            self._pending_size -= len(texts)
+            if future.done():
+                # Caller went away (e.g. client disconnect); skip its work
+                continue
+            if deadline is not None and now > deadline:
+                self.expired += 1
+                future.set_exception(DeadlineExceededError("Request deadline exceeded before encoding"))
+                continue
+            batch.append((texts, future))
+            size += len(texts)
+
+        return batch
+
+    async def _flush(self, batch: List[Tuple[List[str], asyncio.Future]]):
+        """Encode the unique texts of a batch and route embeddings back to callers."""
+        positions: Dict[str, int] = {}
+        unique_texts: List[str] = []
+        for texts, _ in batch:
+            for text in texts:
+                if text not in positions:
+                    positions[text] = len(unique_texts)
+                    unique_texts.append(text)
+
+        logger.debug("Flushing batch of %d requests (%d unique texts)", len(batch), len(unique_texts))
+        REGISTRY.histogram("microbatch_size", "Unique texts per coalesced batch", buckets=SIZE_BUCKETS).observe(
+            len(unique_texts)
+        )
+
+        try:
+            if not unique_texts:
+                embeddings = None
+            elif self.executor is not None:
+                loop = asyncio.get_running_loop()
+                embeddings = np.asarray(await loop.run_in_executor(self.executor, self.encode_fn, unique_texts))
+            else:
+                embeddings = np.asarray(self.encode_fn(unique_texts))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for texts, future in batch:
+            if future.done():
+                continue
+            if embeddings is None:
+                future.set_result(np.empty((0, 0), dtype=np.float32))
+            else:
+                future.set_result(embeddings[[positions[text] for text in texts]])
@@ -0,0 +1,105 @@
+"""
+Cache of rule centroids for online inference.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CentroidCache:
+    """LRU cache of normalized positive/negative centroids keyed by example-set content.
+
+    Entries are evicted in least-recently-used order once either the entry limit or
+    the memory bound (centroid array bytes) is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(rule: str, positives: Sequence[str], negatives: Sequence[str]) -> str:
+        """Hash a rule and its cleaned examples.
+
+        Examples are sorted because centroids are order-independent; duplicates are
+        kept because they weight the mean.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (rule, *sorted(positives), "\x00neg", *sorted(negatives)):
+            encoded = part.encode("utf-8")
+            digest.update(len(encoded).to_bytes(8, "little"))
+            digest.update(encoded)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Return cached (positive, negative) centroids, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, pos_centroid: np.ndarray, neg_centroid: np.ndarray):
+        """Store centroids, evicting least-recently-used entries as needed."""
+        if not self.enabled:
+            return
+
+        entry = (np.array(pos_centroid, copy=True), np.array(neg_centroid, copy=True))
+        size = entry[0].nbytes + entry[1].nbytes
+        if size > self.max_bytes:
+            logger.warning("Centroid entry of %d bytes exceeds cache bound; not cached", size)
+            return
+
+        with self._lock:
+            if key in self._entries:
+                old = self._entries.pop(key)
+                self.bytes_used -= old[0].nbytes + old[1].nbytes
+
+            self._entries[key] = entry
+            self.bytes_used += size
+
+            while len(self._entries) > self.max_entries or self.bytes_used > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_used -= evicted[0].nbytes + evicted[1].nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and current occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes_used": self.bytes_used,
+        }
@@ -0,0 +1,184 @@
+"""
+Bounded-memory inference over large test files.
+
+The in-memory pipeline holds the whole dataframe and every embedding at once. Here
+the input is read in chunks twice: the first pass accumulates per-rule example sums
+(so centroids need no stored embeddings), the second encodes and scores bodies one
+chunk at a time. Scores are spilled to one file per rule and concatenated at the
+end, which reproduces the in-memory submission (rules in order of first appearance,
+rows in input order) without keeping predictions in memory.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.data.loader import DataLoader
+from src.features.centroids import EXAMPLE_COLUMNS, CentroidBuilder
+from src.inference.predictor import ViolationPredictor
+
+logger = logging.getLogger(__name__)
+
+POSITIVE_COLUMNS = EXAMPLE_COLUMNS["positive"]
+NEGATIVE_COLUMNS = EXAMPLE_COLUMNS["negative"]
+
+
+class ChunkedInference:
+    """Build centroids and write predictions chunk by chunk.
+
+    Peak memory is bounded by ``chunksize`` rows plus one embedding per unique text
+    in the current chunk and two running sums per rule.
+    """
+
+    def __init__(
+        self,
+        embedding_generator,
+        predictor: ViolationPredictor,
+        text_preprocessor,
+        chunksize: int = 10000,
+        memory_map: bool = False,
+    ):
+        if chunksize <= 0:
+            raise ValueError("chunksize must be positive")
+
+        self.embedding_generator = embedding_generator
+        self.predictor = predictor
+        self.text_preprocessor = text_preprocessor
+        self.chunksize = chunksize
+        self.memory_map = memory_map
+
+    def build_rule_centroids(self, file_path: str) -> Dict:
+        """Accumulate example embeddings per rule in one pass over the file.
+
+        Embeddings are added to the running sums in the same order as the in-memory
+        ``CentroidBuilder`` segment sum, so the centroids match it exactly.
+        """
+        logger.info("Building rule centroids from chunks...")
+
+        rules: Dict[str, int] = {}
+        rule_embeddings: List[np.ndarray] = []
+        sums = {"positive": None, "negative": None}
+        counts = {"positive": [], "negative": []}
+
+        for chunk in DataLoader.iter_test_data(file_path, self.chunksize, memory_map=self.memory_map):
+            new_rules = [rule for rule in chunk["rule"].unique() if pd.notna(rule) and rule not in rules]
+            if new_rules:
+                cleaned_rules = [self.text_preprocessor.clean_text(rule) for rule in new_rules]
+                embedded = self.embedding_generator.build_text_embeddings(cleaned_rules, reuse_near_duplicates=False)
+                for rule, cleaned in zip(new_rules, cleaned_rules):
+                    rules[rule] = len(rules)
+                    rule_embeddings.append(embedded.get(cleaned))
+                    counts["positive"].append(0)
+                    counts["negative"].append(0)
+
+            rule_index = chunk["rule"].map(rules).to_numpy()
+            chunk = self.text_preprocessor.add_clean_columns(chunk)
+            cleaned_columns = {
+                col: self.text_preprocessor.cleaned_column(chunk, col).fillna("").tolist()
+                for col in POSITIVE_COLUMNS + NEGATIVE_COLUMNS
+            }
+            embeddings = self.embedding_generator.build_text_embeddings(
+                [text for texts in cleaned_columns.values() for text in texts]
+            )
+
+            for kind, columns in (("positive", POSITIVE_COLUMNS), ("negative", NEGATIVE_COLUMNS)):
+                # Row-major over (row, column), matching the in-memory iteration order
+                texts = np.array([cleaned_columns[col] for col in columns], dtype=object).T.ravel()
+                indices = np.repeat(rule_index, len(columns))
+                valid = [i for i, text in enumerate(texts) if text in embeddings and pd.notna(indices[i])]
+                if not valid:
+                    continue
+
+                vectors = np.stack([embeddings[texts[i]] for i in valid])
+                target = indices[valid].astype(np.int64)
+
+                if sums[kind] is None:
+                    sums[kind] = np.zeros((0, vectors.shape[1]), dtype=vectors.dtype)
+                if len(sums[kind]) < len(rules):
+                    padding = np.zeros((len(rules) - len(sums[kind]), vectors.shape[1]), dtype=sums[kind].dtype)
+                    sums[kind] = np.vstack([sums[kind], padding])
+
+                np.add.at(sums[kind], target, vectors)
+                for index, count in zip(*np.unique(target, return_counts=True)):
+                    counts[kind][index] += int(count)
+
+        if sums["positive"] is None or sums["negative"] is None:
+            logger.info("Created centroids for 0 rules")
+            return {}
+
+        for kind, kind_sums in sums.items():
+            if len(kind_sums) < len(rules):
+                padding = np.zeros((len(rules) - len(kind_sums), kind_sums.shape[1]), dtype=kind_sums.dtype)
+                sums[kind] = np.vstack([kind_sums, padding])
+
+        rule_centroids = CentroidBuilder.finalize_centroids(
+            list(rules),
+            sums["positive"],
+            sums["negative"],
+            counts["positive"],
+            counts["negative"],
+            dict(zip(rules, rule_embeddings)),
+        )
+
+        logger.info(f"Created centroids for {len(rule_centroids)} rules")
+        return rule_centroids
+
+    def predict_to_csv(self, file_path: str, output_path: str, rule_centroids: Optional[Dict] = None) -> int:
+        """Score every body chunk by chunk and write the submission to ``output_path``.
+
+        Returns:
+            Number of rows written
+        """
+        if rule_centroids is None:
+            rule_centroids = self.build_rule_centroids(file_path)
+
+        logger.info("Making predictions in chunks...")
+        output_dir = os.path.dirname(output_path) or "."
+        os.makedirs(output_dir, exist_ok=True)
+
+        rule_order: Dict[str, int] = {}
+        total = 0
+
+        with tempfile.TemporaryDirectory(dir=output_dir) as spill_dir:
+            for chunk in DataLoader.iter_test_data(file_path, self.chunksize, memory_map=self.memory_map):
+                bodies = self.text_preprocessor.clean_series(chunk["body"]).fillna("").tolist()
+                embeddings = self.embedding_generator.build_text_embeddings(bodies)
+
+                rules = chunk["rule"].to_numpy()
+                row_ids = chunk["row_id"].to_numpy()
+                for rule in chunk["rule"].unique():
+                    if rule not in rule_centroids:
+                        continue
+                    rule_order.setdefault(rule, len(rule_order))
+
+                    rows = [i for i in np.flatnonzero(rules == rule) if bodies[i] in embeddings]
+                    if not rows:
+                        continue
+
+                    query_embs = np.array([embeddings[bodies[i]] for i in rows])
+                    scores, _, _ = self.predictor.score_embeddings(
+                        query_embs, rule_centroids[rule]["positive"], rule_centroids[rule]["negative"]
+                    )
+
+                    spill_path = os.path.join(spill_dir, f"{rule_order[rule]}.csv")
+                    pd.DataFrame({"row_id": row_ids[rows], "rule_violation": scores}).to_csv(
+                        spill_path, mode="a", header=False, index=False
+                    )
+                    total += len(rows)
+
+            # Rules in order of first appearance, rows in input order within a rule
+            pd.DataFrame({"row_id": [], "rule_violation": []}).to_csv(output_path, index=False)
+            with open(output_path, "a") as out:
+                for index in range(len(rule_order)):
+                    spill_path = os.path.join(spill_dir, f"{index}.csv")
+                    if os.path.exists(spill_path):
+                        with open(spill_path, "r") as spill:
+                            shutil.copyfileobj(spill, out)
+
+        logger.info(f"Made predictions for {total} examples")
+        return total
@@ -0,0 +1,182 @@
+"""
+Top-k nearest-example scoring with per-rule vector indexes.
+
+Instead of comparing a body with one centroid per polarity, each body is compared
+with its k nearest positive and k nearest negative examples of the rule. Small
+example sets are searched exactly with blocked matrix products; large ones use an
+in-process inverted-file (IVF) index: examples are clustered with k-means and a
+query only scans the ``n_probe`` clusters closest to it.
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Queries per matrix product, bounding the (block, examples) distance matrix
+QUERY_BLOCK_ROWS = 4096
+
+
+def _squared_distances(queries: np.ndarray, vectors: np.ndarray, vector_norms: np.ndarray) -> np.ndarray:
+    query_norms = np.einsum("ij,ij->i", queries, queries)
+    distances = query_norms[:, None] + vector_norms[None, :] - 2.0 * (queries @ vectors.T)
+    return np.maximum(distances, 0.0)
+
+
+def _top_k(distances: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Smallest ``k`` entries per row, sorted ascending."""
+    if k < distances.shape[1]:
+        index = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        index = np.broadcast_to(np.arange(distances.shape[1]), distances.shape)
+    values = np.take_along_axis(distances, index, axis=1)
+    order = np.argsort(values, axis=1, kind="stable")
+    return np.take_along_axis(values, order, axis=1), np.take_along_axis(index, order, axis=1)
+
+
+class ExactIndex:
+    """Brute-force search with blocked matrix products."""
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return squared distances and example ids of the ``k`` nearest examples."""
+        k = min(k, len(self))
+        distances = np.empty((len(queries), k), dtype=np.float32)
+        ids = np.empty((len(queries), k), dtype=np.int64)
+
+        for start in range(0, len(queries), QUERY_BLOCK_ROWS):
+            block = queries[start : start + QUERY_BLOCK_ROWS]
+            distances[start : start + len(block)], ids[start : start + len(block)] = _top_k(
+                _squared_distances(block, self.vectors, self.norms), k
+            )
+
+        return distances, ids
+
+
+class IVFIndex:
+    """Approximate search over k-means clusters (inverted file).
+
+    Args:
+        vectors: (N, D) example embeddings
+        n_lists: Number of clusters (default ``4 * sqrt(N)``)
+        n_probe: Clusters scanned per query; higher is slower and more exact
+        n_iter: k-means iterations
+        seed: Seed for the k-means initialization
+    """
+
+    def __init__(self, vectors: np.ndarray, n_lists: Optional[int] = None, n_probe: int = 8, n_iter: int = 10, seed: int = 0):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.n_lists = min(n_lists or int(4 * np.sqrt(len(vectors))), len(vectors))
+        self.n_probe = min(n_probe, self.n_lists)
+
+        self.centroids = self._train(vectors, n_iter, np.random.default_rng(seed))
+        assignment = self._assign(vectors)
+
+        # Store examples grouped by cluster; offsets[l]:offsets[l + 1] is list l
+        order = np.argsort(assignment, kind="stable")
+        self.ids = order
+        self.vectors = vectors[order]
+        self.norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=self.n_lists))])
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), QUERY_BLOCK_ROWS):
+            block = vectors[start : start + QUERY_BLOCK_ROWS]
+            assignment[start : start + len(block)] = np.argmin(_squared_distances(block, self.centroids, norms), axis=1)
+        return assignment
+
+    def _train(self, vectors: np.ndarray, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+        self.centroids = vectors[rng.choice(len(vectors), self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignment = self._assign(vectors)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignment, vectors)
+            counts = np.bincount(assignment, minlength=self.n_lists)
+            filled = counts > 0  # empty clusters keep their previous center
+            self.centroids[filled] = sums[filled] / counts[filled, None]
+        return self.centroids
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return squared distances and example ids of (approximately) the ``k`` nearest examples."""
+        k = min(k, len(self))
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        _, probes = _top_k(_squared_distances(queries, self.centroids, centroid_norms), self.n_probe)
+
+        # Candidate slots: k per probed list, filled list by list
+        candidate_distances = np.full((len(queries), self.n_probe * k), np.inf, dtype=np.float32)
+        candidate_ids = np.full((len(queries), self.n_probe * k), -1, dtype=np.int64)
+
+        for list_id in np.unique(probes):
+            start, end = self.offsets[list_id], self.offsets[list_id + 1]
+            if start == end:
+                continue
+            query_rows, slots = np.nonzero(probes == list_id)
+            distances, local = _top_k(
+                _squared_distances(queries[query_rows], self.vectors[start:end], self.norms[start:end]), k
+            )
+            width = distances.shape[1]
+            columns = slots[:, None] * k + np.arange(width)
+            candidate_distances[query_rows[:, None], columns] = distances
+            candidate_ids[query_rows[:, None], columns] = self.ids[start + local]
+
+        distances, index = _top_k(candidate_distances, k)
+        return distances, np.take_along_axis(candidate_ids, index, axis=1)
+
+
+def build_index(vectors: np.ndarray, exact_max_examples: int = 20000, n_probe: int = 8):
+    """Exact search for small example sets, IVF above ``exact_max_examples``."""
+    if len(vectors) <= exact_max_examples:
+        return ExactIndex(vectors)
+    return IVFIndex(vectors, n_probe=n_probe)
+
+
+class RuleIndex:
+    """Positive and negative example indexes for every rule.
+
+    A body's score is the mean distance to its k nearest negative examples minus the
+    mean distance to its k nearest positive examples (higher = closer to violating),
+    mirroring the centroid score.
+    """
+
+    def __init__(self, rule_examples: Dict, k: int = 5, exact_max_examples: int = 20000, n_probe: int = 8):
+        self.k = k
+        self.indexes = {
+            rule: (
+                build_index(examples["positive"], exact_max_examples, n_probe),
+                build_index(examples["negative"], exact_max_examples, n_probe),
+            )
+            for rule, examples in rule_examples.items()
+        }
+        approximate = sum(isinstance(index, IVFIndex) for pair in self.indexes.values() for index in pair)
+        logger.info(f"Built kNN indexes for {len(self.indexes)} rules ({approximate} approximate)")
+
+    def __contains__(self, rule) -> bool:
+        return rule in self.indexes
+
+    def score(self, rule, queries: np.ndarray) -> np.ndarray:
+        """Score (n, D) query embeddings against one rule's examples."""
+        pos_index, neg_index = self.indexes[rule]
+        pos_distances, _ = pos_index.search(queries, self.k)
+        neg_distances, _ = neg_index.search(queries, self.k)
+        return self._mean_distance(neg_distances) - self._mean_distance(pos_distances)
+
+    @staticmethod
+    def _mean_distance(squared: np.ndarray) -> np.ndarray:
+        # IVF can return fewer than k finite candidates when the probed lists are tiny
+        distances = np.sqrt(squared)
+        finite = np.isfinite(distances)
+        return np.where(finite, distances, 0.0).sum(axis=1) / np.maximum(finite.sum(axis=1), 1)
@@ -1,58 +1,142 @@
 import logging
-from typing import Dict, Tuple
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+if TYPE_CHECKING:
+    from src.inference.knn import RuleIndex
+
 logger = logging.getLogger(__name__)
 
+# Rows scored per gather, bounding the (rows, D) temporaries
+SCORE_BLOCK_ROWS = 65536
+
+SCORING_MODES = ("centroid", "knn")
+
 
 class ViolationPredictor:
-    """Predict rule violations using centroid distance."""
+    """Predict rule violations using centroid distance.
+
+    ``mode="knn"`` instead scores each body by its distance to the k nearest positive
+    and negative examples of its rule, searched through a ``RuleIndex``.
+    """
+
+    def __init__(self, distance_metric: str = "euclidean", mode: str = "centroid"):
+        if mode not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode '{mode}'. Expected one of {SCORING_MODES}")
 
-    def __init__(self, distance_metric: str = "euclidean"):
         self.distance_metric = distance_metric
+        self.mode = mode
+        self.skipped_rows: Dict[str, list] = {"missing_centroid": [], "missing_embedding": []}
+
+    @staticmethod
+    def score_embeddings(
+        query_embs: np.ndarray, pos_centroids: np.ndarray, neg_centroids: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Score query embeddings against row-aligned (or broadcast) centroids.
+
+        Returns violation scores (closer to positive = higher) and the positive and
+        negative distances they were derived from.
+        """
+        pos_distances = np.linalg.norm(query_embs - pos_centroids, axis=1)
+        neg_distances = np.linalg.norm(query_embs - neg_centroids, axis=1)
+        return neg_distances - pos_distances, pos_distances, neg_distances
 
     def predict(
-        self, df: pd.DataFrame, text_to_embedding: Dict[str, np.ndarray], rule_centroids: Dict, text_preprocessor
+        self,
+        df: pd.DataFrame,
+        text_to_embedding: Dict[str, np.ndarray],
+        rule_centroids: Dict,
+        text_preprocessor,
+        rule_index: Optional["RuleIndex"] = None,
     ) -> Tuple[list, np.ndarray]:
-        """Make predictions on test set."""
+        """Make predictions on test set.
+
+        Rules and cleaned bodies (the attached ``clean_body`` column when present) are
+        factorized once, so each distinct body is looked up a single time. In centroid
+        mode every row is then scored by one gather over stacked (R, D) centroid
+        matrices; in kNN mode each rule's distinct bodies are searched in
+        ``rule_index``. Output rows are grouped by rule in order of first appearance,
+        keeping input order within a rule. Rows whose rule has no centroid (or index)
+        or whose body has no embedding are skipped and recorded in ``skipped_rows``.
+        """
         logger.info("Making predictions...")
-
-        row_ids = []
-        predictions = []
-
-        for rule in df["rule"].unique():
-            if rule not in rule_centroids:
-                continue
-
-            rule_data = df[df["rule"] == rule]
-            pos_centroid = rule_centroids[rule]["positive"]
-            neg_centroid = rule_centroids[rule]["negative"]
-
-            valid_embeddings = []
-            valid_row_ids = []
-
-            for _, row in rule_data.iterrows():
-                body = text_preprocessor.clean_text(row["body"])
-                if body in text_to_embedding:
-                    valid_embeddings.append(text_to_embedding[body])
-                    valid_row_ids.append(row["row_id"])
-
-            if not valid_embeddings:
-                continue
-
-            query_embs = np.array(valid_embeddings)
-
-            # Compute distances
-            pos_distances = np.linalg.norm(query_embs - pos_centroid, axis=1)
-            neg_distances = np.linalg.norm(query_embs - neg_centroid, axis=1)
-
-            # Score: closer to positive = higher violation
-            rule_preds = neg_distances - pos_distances
-
-            row_ids.extend(valid_row_ids)
-            predictions.extend(rule_preds)
-
+        if self.mode == "knn" and rule_index is None:
+            raise ValueError("kNN scoring needs a rule_index")
+        scorable = rule_index if self.mode == "knn" else rule_centroids
+
+        rule_codes, rules = pd.factorize(df["rule"], sort=False)
+        body_codes, bodies = pd.factorize(text_preprocessor.cleaned_column(df, "body"), sort=False)
+        row_id_values = df["row_id"].to_numpy()
+
+        # Per-rule centroid rows; rules without centroids map to -1
+        centroid_rows = np.full(len(rules) + 1, -1, dtype=np.int64)
+        known_rules = [i for i, rule in enumerate(rules) if rule in scorable]
+        centroid_rows[known_rules] = np.arange(len(known_rules))
+
+        # Per-body embedding rows; bodies without an embedding (or NaN) map to -1
+        embedding_rows = np.full(len(bodies) + 1, -1, dtype=np.int64)
+        body_embeddings = []
+        for i, body in enumerate(bodies):
+            embedding = text_to_embedding.get(body)
+            if embedding is not None:
+                embedding_rows[i] = len(body_embeddings)
+                body_embeddings.append(embedding)
+
+        row_centroids = centroid_rows[rule_codes]
+        row_embeddings = embedding_rows[body_codes]
+        has_centroid = row_centroids >= 0
+        has_embedding = row_embeddings >= 0
+
+        self.skipped_rows = {
+            "missing_centroid": row_id_values[~has_centroid].tolist(),
+            "missing_embedding": row_id_values[has_centroid & ~has_embedding].tolist(),
+        }
+        if self.skipped_rows["missing_embedding"]:
+            logger.warning(f"Skipped {len(self.skipped_rows['missing_embedding'])} rows whose body has no embedding")
+
+        # Group rows by rule (first appearance), stable so input order holds within a rule
+        valid = np.flatnonzero(has_centroid & has_embedding)
+        order = valid[np.argsort(row_centroids[valid], kind="stable")]
+
+        if len(order) == 0:
+            logger.info("Made predictions for 0 examples")
+            return [], np.array([])
+
+        query_matrix = np.stack(body_embeddings)
+        scoring_args = (order, row_centroids, row_embeddings, query_matrix, rules, known_rules)
+        if self.mode == "knn":
+            predictions = self._score_knn(*scoring_args, rule_index)
+        else:
+            predictions = self._score_centroids(*scoring_args, rule_centroids)
+
+        row_ids = row_id_values[order].tolist()
         logger.info(f"Made predictions for {len(predictions)} examples")
-        return row_ids, np.array(predictions)
+        return row_ids, predictions
+
+    def _score_centroids(self, order, row_centroids, row_embeddings, query_matrix, rules, known_rules, rule_centroids):
+        pos_centroids = np.stack([rule_centroids[rules[i]]["positive"] for i in known_rules])
+        neg_centroids = np.stack([rule_centroids[rules[i]]["negative"] for i in known_rules])
+
+        predictions = np.empty(len(order), dtype=np.result_type(query_matrix, pos_centroids))
+        for start in range(0, len(order), SCORE_BLOCK_ROWS):
+            block = order[start : start + SCORE_BLOCK_ROWS]
+            centroid_index = row_centroids[block]
+            predictions[start : start + len(block)], _, _ = self.score_embeddings(
+                query_matrix[row_embeddings[block]], pos_centroids[centroid_index], neg_centroids[centroid_index]
+            )
+        return predictions
+
+    @staticmethod
+    def _score_knn(order, row_centroids, row_embeddings, query_matrix, rules, known_rules, rule_index):
+        predictions = np.empty(len(order), dtype=np.float32)
+
+        # ``order`` is grouped by rule, so each rule is one contiguous segment
+        segment_rules = row_centroids[order]
+        bounds = np.flatnonzero(np.diff(segment_rules)) + 1
+        for start, end in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(order)]])):
+            unique_rows, inverse = np.unique(row_embeddings[order[start:end]], return_inverse=True)
+            rule = rules[known_rules[segment_rules[start]]]
+            predictions[start:end] = rule_index.score(rule, query_matrix[unique_rows])[inverse]
+        return predictions
@@ -2,10 +2,12 @@
 Model definition and training modules.
 """
 
+from .embedding_cache import EmbeddingCache
 from .embedding_model import EmbeddingModel
 from .trainer import ModelTrainer
 
 __all__ = [
+    "EmbeddingCache",
     "EmbeddingModel",
     "ModelTrainer",
 ]
@@ -0,0 +1,102 @@
+"""
+Multi-process CPU data-parallel training over the gloo backend.
+
+``launch`` starts one process per rank on this machine, each with its own share of
+the cores, and joins them into a gloo process group before calling the training
+function. The transformers ``Trainer`` picks that group up: it gives every rank a
+disjoint slice of each global batch and all-reduces the gradients, so ranks stay
+in sync. The helpers below let training code run a step (writing shards, saving
+the model) on rank 0 only.
+"""
+
+import logging
+import os
+import socket
+from typing import Any, Callable, Optional, Sequence
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+logger = logging.getLogger(__name__)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _run_rank(rank: int, fn: Callable, nproc: int, port: int, threads: int, args: Sequence[Any]):
+    os.environ.update(
+        {
+            "RANK": str(rank),
+            "LOCAL_RANK": str(rank),
+            "WORLD_SIZE": str(nproc),
+            "LOCAL_WORLD_SIZE": str(nproc),
+            "MASTER_ADDR": "127.0.0.1",
+            "MASTER_PORT": str(port),
+            "OMP_NUM_THREADS": str(threads),
+        }
+    )
+    torch.set_num_threads(threads)
+    dist.init_process_group("gloo", rank=rank, world_size=nproc)
+    try:
+        fn(*args)
+    finally:
+        dist.destroy_process_group()
+
+
+def launch(fn: Callable, nproc: int, args: Sequence[Any] = (), threads_per_process: Optional[int] = None):
+    """Run ``fn(*args)`` in ``nproc`` spawned ranks of one gloo process group.
+
+    ``fn`` must be importable (defined at module level). Each rank gets
+    ``threads_per_process`` torch threads (default: cores / nproc). An exception in
+    any rank terminates the others and is re-raised here.
+    """
+    threads = threads_per_process or max(1, (os.cpu_count() or 1) // nproc)
+    port = _free_port()
+    logger.info(f"Launching {nproc} training processes with {threads} threads each")
+    mp.spawn(_run_rank, args=(fn, nproc, port, threads, tuple(args)), nprocs=nproc, join=True)
+
+
+def world_size() -> int:
+    """Ranks in the current process group (from the environment before it is created)."""
+    if dist.is_available() and dist.is_initialized():
+        return dist.get_world_size()
+    return int(os.environ.get("WORLD_SIZE", 1))
+
+
+def rank() -> int:
+    if dist.is_available() and dist.is_initialized():
+        return dist.get_rank()
+    return int(os.environ.get("RANK", 0))
+
+
+def is_main_process() -> bool:
+    return rank() == 0
+
+
+def barrier():
+    if dist.is_available() and dist.is_initialized():
+        dist.barrier()
+
+
+def run_on_main(fn: Callable[[], Any]) -> Any:
+    """Call ``fn`` on rank 0 only and return its (picklable) result on every rank."""
+    if world_size() == 1 or not dist.is_initialized():
+        return fn()
+
+    result = [fn() if is_main_process() else None]
+    dist.broadcast_object_list(result, src=0)
+    return result[0]
+
+
+def all_reduce_sum(value: float) -> float:
+    """Sum a number over all ranks."""
+    if world_size() == 1 or not dist.is_initialized():
+        return value
+
+    total = torch.tensor(float(value), dtype=torch.float64)
+    dist.all_reduce(total)
+    return total.item()
@@ -0,0 +1,104 @@
+"""
+In-process cache of text embeddings.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Byte-bounded LRU cache of embeddings with optional time-to-live.
+
+    Keys are opaque strings (see ``EmbeddingModel.cache_key``). Stored arrays are
+    read-only copies so callers cannot corrupt cached values. Safe to share across
+    threads.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: Optional[float] = None):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Look up several keys at once; misses (and expired entries) come back as None."""
+        now = time.monotonic()
+        results: List[Optional[np.ndarray]] = []
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl_seconds is not None and now - entry[1] > self.ttl_seconds:
+                    self._remove(key)
+                    self.expirations += 1
+                    entry = None
+
+                if entry is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[0])
+
+        return results
+
+    def put_many(self, keys: Sequence[str], embeddings: Sequence[np.ndarray]):
+        """Store embeddings, evicting least-recently-used entries beyond the byte cap."""
+        now = time.monotonic()
+
+        with self._lock:
+            for key, embedding in zip(keys, embeddings):
+                value = np.array(embedding, copy=True)
+                value.setflags(write=False)
+                if value.nbytes > self.max_bytes:
+                    continue
+
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = (value, now)
+                self.bytes_used += value.nbytes
+
+            while self.bytes_used > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        value, _ = self._entries.pop(key)
+        self.bytes_used -= value.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit-rate, eviction and occupancy counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._entries),
+            "bytes_used": self.bytes_used,
+            "max_bytes": self.max_bytes,
+        }
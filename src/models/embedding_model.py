@@ -1,25 +1,109 @@
+import hashlib
 import logging
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import numpy as np
 import torch
 from sentence_transformers import SentenceTransformer, models
+from sentence_transformers.util import batch_to_device
+from tqdm import tqdm
+
+from src.models.embedding_cache import EmbeddingCache
+from src.models.length_batching import iter_batches, record_padding
+from src.utils.metrics import REGISTRY, SIZE_BUCKETS
 
 logger = logging.getLogger(__name__)
 
 
+BACKENDS = ("torch", "onnx")
+
+
+def tokenize_function(model):
+    """The SentenceTransformer's tokenizing call; newer releases renamed tokenize() to preprocess()."""
+    return getattr(model, "preprocess", None) or model.tokenize
+
+
 class EmbeddingModel:
-    """Wrapper for sentence transformer model."""
+    """Wrapper for sentence transformer model.
+
+    ``backend="onnx"`` serves ``encode`` through ONNX Runtime (optionally int8
+    quantized) instead of PyTorch; the graph is exported to ``onnx_dir`` (default
+    ``<model_path>/onnx``) on first load. ``max_tokens_per_batch`` switches from a
+    fixed number of texts per batch to a token budget per padded batch.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        max_seq_length: int = 128,
+        use_fp16: bool = True,
+        cache: Optional[EmbeddingCache] = None,
+        model_version: Optional[str] = None,
+        backend: str = "torch",
+        onnx_dir: Optional[str] = None,
+        quantize: bool = False,
+        num_threads: Optional[int] = None,
+        max_tokens_per_batch: Optional[int] = None,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}'. Expected one of {BACKENDS}")
 
-    def __init__(self, model_path: str, max_seq_length: int = 128, use_fp16: bool = True):
         self.model_path = model_path
         self.max_seq_length = max_seq_length
         self.use_fp16 = use_fp16
+        self.cache = cache
+        self.model_version = model_version
+        self.backend = backend
+        self.onnx_dir = onnx_dir or os.path.join(model_path, "onnx")
+        self.quantize = quantize
+        self.num_threads = num_threads
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.last_padding_ratio = 0.0
         self.model = None
+        self.onnx_encoder = None
+        self._fingerprint: Optional[str] = None
+
+    @property
+    def source_fingerprint(self) -> str:
+        """Identify the weights and tokenization settings, regardless of backend.
+
+        Uses ``model_version`` when given, otherwise the newest modification time of
+        the files in a local model directory, so retrained weights at the same path get
+        a new fingerprint (exported artifacts in subdirectories do not count).
+        """
+        version = self.model_version
+        if version is None and os.path.isdir(self.model_path):
+            with os.scandir(self.model_path) as entries:
+                mtimes = [entry.stat().st_mtime for entry in entries if entry.is_file()]
+            version = str(int(max(mtimes))) if mtimes else None
+        return f"{self.model_path}|{version or ''}|{self.max_seq_length}"
+
+    @property
+    def fingerprint(self) -> str:
+        """Identify the weights, tokenization settings and backend that produced an embedding."""
+        backend = f"{self.backend}-int8" if self.backend == "onnx" and self.quantize else self.backend
+        return f"{self.source_fingerprint}|{backend}"
+
+    def cache_key(self, text: str, normalize: bool = True) -> str:
+        """Hash (model fingerprint, max_seq_length, normalize flag, text) into a cache key."""
+        if self._fingerprint is None:
+            self._fingerprint = self.fingerprint
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{self._fingerprint}|{int(normalize)}\x00".encode("utf-8"))
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def load_model(self) -> Optional[SentenceTransformer]:
+        """Load or initialize model.
+
+        With the ONNX backend the PyTorch model is only loaded when the graph still
+        has to be exported, so the return value may be None.
+        """
+        if self.backend == "onnx":
+            return self._load_onnx()
 
-    def load_model(self) -> SentenceTransformer:
-        """Load or initialize model."""
         try:
             word_embedding = models.Transformer(self.model_path, max_seq_length=self.max_seq_length, do_lower_case=True)
             pooling = models.Pooling(word_embedding.get_word_embedding_dimension(), pooling_mode="mean")
@@ -32,6 +116,7 @@ class EmbeddingModel:
                 else:
                     logger.warning("FP16 requested but CUDA is not available; using FP32 instead.")
 
+            self._fingerprint = self.fingerprint
             logger.info(f"Loaded model from {self.model_path}")
             return self.model
 
@@ -39,18 +124,121 @@ class EmbeddingModel:
             logger.error(f"Failed to load model: {e}")
             raise
 
-    def encode(self, texts: List[str], batch_size: int = 64, normalize: bool = True) -> np.ndarray:
+    def _load_onnx(self) -> Optional[SentenceTransformer]:
+        from src.models.onnx_backend import OnnxEncoder, exported_fingerprint, onnx_model_path
+
+        source = self.source_fingerprint
+        if not os.path.exists(onnx_model_path(self.onnx_dir, self.quantize)):
+            logger.info(f"No ONNX graph in {self.onnx_dir}; exporting from {self.model_path}")
+            self._export_onnx(source)
+        elif exported_fingerprint(self.onnx_dir) != source:
+            logger.info(f"ONNX graph in {self.onnx_dir} is stale; re-exporting from {self.model_path}")
+            self._export_onnx(source)
+
+        self.onnx_encoder = OnnxEncoder(self.onnx_dir, quantize=self.quantize, num_threads=self.num_threads)
+        self._fingerprint = self.fingerprint
+        return self.model
+
+    def _export_onnx(self, source_fingerprint: str):
+        """Export the PyTorch model to ``onnx_dir`` and check the graphs against it."""
+        from src.models.onnx_backend import (
+            INT8_MIN_COSINE,
+            PARITY_TEXTS,
+            OnnxEncoder,
+            check_parity,
+            discard_export,
+            export_onnx,
+        )
+
+        backend, self.backend = self.backend, "torch"
+        try:
+            self.load_model()
+        finally:
+            self.backend = backend
+        export_onnx(self.model, self.onnx_dir, quantize=self.quantize, source_fingerprint=source_fingerprint)
+
+        try:
+            check_parity(self.model, OnnxEncoder(self.onnx_dir, num_threads=self.num_threads), PARITY_TEXTS)
+            if self.quantize:
+                int8 = OnnxEncoder(self.onnx_dir, quantize=True, num_threads=self.num_threads)
+                check_parity(self.model, int8, PARITY_TEXTS, min_cosine=INT8_MIN_COSINE)
+        except AssertionError:
+            discard_export(self.onnx_dir)
+            raise
+
+    def encode(
+        self, texts: List[str], batch_size: int = 64, normalize: bool = True, show_progress_bar: bool = True
+    ) -> np.ndarray:
         """Generate embeddings for texts."""
-        if self.model is None:
+        if self.model is None and self.onnx_encoder is None:
             raise ValueError("Model not loaded. Call load_model() first.")
 
-        embeddings = self.model.encode(
-            sentences=texts,
-            batch_size=batch_size,
-            show_progress_bar=True,
-            convert_to_tensor=False,
-            normalize_embeddings=normalize,
-        )
+        if self.cache is None or not texts:
+            return self._encode(texts, batch_size, normalize, show_progress_bar)
+
+        # Only cache misses go to the transformer; results keep the input order
+        keys = [self.cache_key(text, normalize) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        missing: Dict[str, int] = {}
+        for i, embedding in enumerate(cached):
+            if embedding is None and keys[i] not in missing:
+                missing[keys[i]] = i
+
+        if missing:
+            miss_texts = [texts[i] for i in missing.values()]
+            miss_embeddings = self._encode(miss_texts, batch_size, normalize, show_progress_bar)
+            self.cache.put_many(list(missing), miss_embeddings)
+            computed = dict(zip(missing, miss_embeddings))
+            cached = [embedding if embedding is not None else computed[key] for key, embedding in zip(keys, cached)]
+
+        return np.stack(cached)
+
+    def _encode(self, texts: List[str], batch_size: int, normalize: bool, show_progress_bar: bool = True) -> np.ndarray:
+        """Run the transformer on texts without consulting the cache.
+
+        Tokenization and the forward pass are timed separately so a slowdown can be
+        attributed to one or the other. Texts are grouped by length (see
+        ``iter_batches``) and the output keeps the input order.
+        """
+        if self.onnx_encoder is not None:
+            embeddings = self.onnx_encoder.encode(
+                texts, batch_size, normalize, show_progress_bar, max_tokens_per_batch=self.max_tokens_per_batch
+            )
+            self.last_padding_ratio = self.onnx_encoder.last_padding_ratio
+            return embeddings
+
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        padding_side = getattr(getattr(self.model, "tokenizer", None), "padding_side", "right")
+        batches = iter_batches(texts, tokenize_function(self.model), batch_size, self.max_tokens_per_batch, padding_side)
+
+        self.model.eval()
+        order, outputs = [], []
+        real_tokens = padded_tokens = 0
+        for indices, features in tqdm(batches, desc="Batches", disable=not show_progress_bar):
+            order.append(indices)
+
+            mask = features.get("attention_mask")
+            if mask is not None:
+                real_tokens += int(mask.sum())
+                padded_tokens += mask.numel()
+
+            features = batch_to_device(features, self.model.device)
+            with REGISTRY.timer("model_forward_seconds", "Transformer forward time per batch"), torch.no_grad():
+                embeddings = self.model(features)["sentence_embedding"]
+                if normalize:
+                    embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+                outputs.append(embeddings.float().cpu().numpy())
+
+            REGISTRY.histogram("forward_batch_size", "Texts per forward pass", buckets=SIZE_BUCKETS).observe(len(indices))
+
+        REGISTRY.counter("texts_encoded_total", "Texts run through the transformer").inc(len(texts))
+        self.last_padding_ratio = record_padding(real_tokens, padded_tokens, len(order))
+
+        embeddings = np.empty((len(texts), outputs[0].shape[1]), dtype=np.float32)
+        embeddings[np.concatenate(order)] = np.concatenate(outputs)
         return embeddings
 
     def save(self, output_path: str):
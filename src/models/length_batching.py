@@ -0,0 +1,125 @@
+"""
+Length-aware batch planning for transformer encoding.
+
+Each batch is padded to its longest member, so grouping texts of similar token
+length and capping ``batch_len * longest_len`` (a token budget) instead of the
+number of texts keeps padding, and therefore wasted compute, low.
+"""
+
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Texts per tokenizer call under a token budget; batches are planned within each chunk
+TOKENIZE_CHUNK_TEXTS = 8192
+
+
+def plan_batches(lengths: Sequence[int], batch_size: int, max_tokens_per_batch: Optional[int] = None) -> List[np.ndarray]:
+    """Split indices into batches of similar length, longest first.
+
+    Args:
+        lengths: Per-text length (token counts, or character counts as a proxy)
+        batch_size: Texts per batch when no token budget is given
+        max_tokens_per_batch: Cap on ``len(batch) * max(length in batch)``; replaces
+            ``batch_size`` when set. A text longer than the budget gets its own batch.
+
+    Returns:
+        Index arrays into ``lengths``; concatenated they form the processing order.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    order = np.argsort(-lengths, kind="stable")
+
+    if not max_tokens_per_batch:
+        return [order[start : start + batch_size] for start in range(0, len(order), batch_size)]
+
+    batches = []
+    start = 0
+    while start < len(order):
+        # Sorted longest first, so the first text sets the padded length of the batch
+        longest = max(int(lengths[order[start]]), 1)
+        size = max(1, max_tokens_per_batch // longest)
+        batches.append(order[start : start + size])
+        start += size
+    return batches
+
+
+def trim_batch(features: Dict[str, Any], indices: np.ndarray, padding_side: str = "right") -> Dict[str, Any]:
+    """Rows ``indices`` of features tokenized together, cut to the longest of those rows.
+
+    Works on torch tensors and numpy arrays alike. Per-text values shaped like the
+    attention mask are trimmed, other per-text values only selected, and anything
+    else (e.g. a ``modality`` string) passed through.
+    """
+    mask = features["attention_mask"]
+    num_texts, seq_len = mask.shape
+    width = int(mask[indices].sum(1).max())
+
+    batch = {}
+    for key, value in features.items():
+        shape = tuple(getattr(value, "shape", ()))
+        if shape == (num_texts, seq_len):
+            rows = value[indices]
+            batch[key] = rows[:, seq_len - width :] if padding_side == "left" else rows[:, :width]
+        elif shape and shape[0] == num_texts:
+            batch[key] = value[indices]
+        else:
+            batch[key] = value
+    return batch
+
+
+def iter_batches(
+    texts: Sequence[str],
+    tokenize: Callable[[List[str]], Dict[str, Any]],
+    batch_size: int,
+    max_tokens_per_batch: Optional[int] = None,
+    padding_side: str = "right",
+) -> Iterator[Tuple[np.ndarray, Dict[str, Any]]]:
+    """Yield ``(indices, features)`` per batch, tokenizing every text exactly once.
+
+    Without a token budget, texts are grouped by character length and each batch is
+    tokenized on its own. With one, texts are tokenized ``TOKENIZE_CHUNK_TEXTS`` at a
+    time, batches are planned from the exact token counts within each chunk, and each
+    batch is cut out of the chunk's features (see ``trim_batch``).
+    """
+    if not max_tokens_per_batch:
+        for indices in plan_batches([len(text) for text in texts], batch_size):
+            with REGISTRY.timer("tokenize_seconds", "Tokenization time per tokenizer call"):
+                features = tokenize([texts[i] for i in indices])
+            yield indices, features
+        return
+
+    for start in range(0, len(texts), TOKENIZE_CHUNK_TEXTS):
+        chunk = list(texts[start : start + TOKENIZE_CHUNK_TEXTS])
+        with REGISTRY.timer("tokenize_seconds", "Tokenization time per tokenizer call"):
+            features = tokenize(chunk)
+        lengths = np.asarray(features["attention_mask"].sum(1))
+        for indices in plan_batches(lengths, batch_size, max_tokens_per_batch):
+            yield start + indices, trim_batch(features, indices, padding_side)
+
+
+def padding_ratio(real_tokens: int, padded_tokens: int) -> float:
+    """Fraction of the padded token grid that is padding."""
+    return 1.0 - real_tokens / padded_tokens if padded_tokens else 0.0
+
+
+def record_padding(real_tokens: int, padded_tokens: int, num_batches: int) -> float:
+    """Export token/padding counters for one encode call and return its padding ratio.
+
+    The ratio is logged here only at DEBUG, since this runs on every encode. The
+    counters feed the API's ``padding_ratio`` gauge on /metrics, and
+    ``EmbeddingGenerator`` logs each offline run's ratio at INFO.
+    """
+    if not padded_tokens:
+        return 0.0
+
+    REGISTRY.counter("tokens_total", "Non-padding tokens run through the transformer").inc(real_tokens)
+    REGISTRY.counter("padding_tokens_total", "Padding tokens run through the transformer").inc(padded_tokens - real_tokens)
+
+    ratio = padding_ratio(real_tokens, padded_tokens)
+    logger.debug(f"Encoded {real_tokens} tokens in {num_batches} batches, padding ratio {ratio:.1%}")
+    return ratio
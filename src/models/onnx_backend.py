@@ -0,0 +1,270 @@
+"""
+ONNX Runtime inference backend for CPU serving.
+
+The fine-tuned transformer and its mean pooling are exported together to a single
+ONNX graph, optionally quantized to int8 with dynamic quantization, and served
+through ONNX Runtime with the same output contract as ``EmbeddingModel.encode``.
+Requires the optional ``onnx`` extra (``onnx`` and ``onnxruntime``).
+"""
+
+import inspect
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import torch
+from tqdm import tqdm
+
+from src.models.length_batching import iter_batches, record_padding
+from src.utils.metrics import REGISTRY, SIZE_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model.int8.onnx"
+META_FILE = "onnx_config.json"
+
+# Texts of varied length encoded by both backends after every export
+PARITY_TEXTS = [
+    "ok",
+    "Great post, thanks for sharing!",
+    "Check out my channel for free crypto giveaways, click the link in my profile now",
+    " ".join(["This comment repeats itself to run past the maximum sequence length."] * 40),
+]
+# Worst per-text cosine similarity to PyTorch accepted from an int8 graph
+INT8_MIN_COSINE = 0.98
+
+
+class _MeanPoolingEncoder(torch.nn.Module):
+    """Transformer followed by attention-masked mean pooling (matches ``models.Pooling``)."""
+
+    def __init__(self, transformer: torch.nn.Module, input_names: List[str]):
+        super().__init__()
+        self.transformer = transformer
+        self.input_names = input_names
+
+    def forward(self, *inputs):
+        features = dict(zip(self.input_names, inputs))
+        token_embeddings = self.transformer(**features)[0]
+        mask = features["attention_mask"].unsqueeze(-1).to(token_embeddings.dtype)
+        summed = (token_embeddings * mask).sum(dim=1)
+        counts = torch.clamp(mask.sum(dim=1), min=1e-9)
+        return summed / counts
+
+
+def export_onnx(
+    model,
+    output_dir: str,
+    quantize: bool = False,
+    opset_version: int = 17,
+    source_fingerprint: Optional[str] = None,
+) -> str:
+    """Export a loaded SentenceTransformer (transformer + mean pooling) to ONNX.
+
+    Args:
+        model: SentenceTransformer built by ``EmbeddingModel.load_model``
+        output_dir: Directory for the graph, tokenizer and metadata
+        quantize: Also write a dynamically int8-quantized graph
+        opset_version: ONNX opset to target
+        source_fingerprint: Identifies the weights exported, recorded in the metadata
+            (see ``exported_fingerprint``)
+
+    Returns:
+        Path of the graph to serve (the quantized one when ``quantize`` is set)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    transformer_module = model[0]
+    tokenizer = model.tokenizer
+    dummy = tokenizer(["export sample text", "short"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+
+    encoder = _MeanPoolingEncoder(transformer_module.auto_model, input_names).eval().to("cpu")
+    model_path = os.path.join(output_dir, MODEL_FILE)
+
+    export_kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # The TorchScript exporter handles HF models without the extra onnxscript dependency
+        export_kwargs["dynamo"] = False
+
+    with torch.no_grad():
+        torch.onnx.export(
+            encoder,
+            tuple(dummy[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["sentence_embedding"],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in input_names}, "sentence_embedding": {0: "batch"}},
+            opset_version=opset_version,
+            **export_kwargs,
+        )
+
+    tokenizer.save_pretrained(output_dir)
+    with open(os.path.join(output_dir, META_FILE), "w") as f:
+        json.dump(
+            {
+                "max_seq_length": transformer_module.max_seq_length,
+                "do_lower_case": transformer_module.do_lower_case,
+                "input_names": input_names,
+                "source_fingerprint": source_fingerprint,
+            },
+            f,
+        )
+    logger.info(f"Exported ONNX model to {model_path}")
+
+    quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+    if not quantize:
+        # An int8 graph left from an earlier export would not match the new metadata
+        if os.path.exists(quantized_path):
+            os.remove(quantized_path)
+        return model_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    logger.info(f"Wrote int8 dynamically quantized model to {quantized_path}")
+    return quantized_path
+
+
+def onnx_model_path(onnx_dir: str, quantize: bool = False) -> str:
+    return os.path.join(onnx_dir, QUANTIZED_MODEL_FILE if quantize else MODEL_FILE)
+
+
+def exported_fingerprint(onnx_dir: str) -> Optional[str]:
+    """Source fingerprint recorded by ``export_onnx`` in ``onnx_dir``, or None if there is none."""
+    try:
+        with open(os.path.join(onnx_dir, META_FILE), "r") as f:
+            return json.load(f).get("source_fingerprint")
+    except (OSError, ValueError):
+        return None
+
+
+def discard_export(onnx_dir: str):
+    """Invalidate an export so the next load exports again (the graphs are overwritten then)."""
+    meta_path = os.path.join(onnx_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+
+class OnnxEncoder:
+    """Encode texts with an exported graph through ONNX Runtime."""
+
+    def __init__(self, onnx_dir: str, quantize: bool = False, num_threads: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(onnx_dir, META_FILE), "r") as f:
+            meta = json.load(f)
+
+        self.max_seq_length = meta["max_seq_length"]
+        self.do_lower_case = meta["do_lower_case"]
+        self.input_names = meta["input_names"]
+        self.tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        path = onnx_model_path(onnx_dir, quantize)
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.dimension = self.session.get_outputs()[0].shape[1]
+        self.last_padding_ratio = 0.0
+        logger.info(f"Loaded ONNX Runtime session from {path}")
+
+    def tokenize(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        if self.do_lower_case:
+            texts = [text.lower() for text in texts]
+        encoded = self.tokenizer(
+            texts, padding=True, truncation="longest_first", max_length=self.max_seq_length, return_tensors="np"
+        )
+        return {name: encoded[name].astype(np.int64) for name in self.input_names}
+
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 64,
+        normalize: bool = True,
+        show_progress_bar: bool = False,
+        max_tokens_per_batch: Optional[int] = None,
+    ):
+        """Generate embeddings with the same contract as ``EmbeddingModel.encode``."""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+
+        padding_side = getattr(self.tokenizer, "padding_side", "right")
+        batches = iter_batches(texts, self.tokenize, batch_size, max_tokens_per_batch, padding_side)
+
+        order, outputs = [], []
+        real_tokens = padded_tokens = 0
+        for indices, features in tqdm(batches, desc="Batches", disable=not show_progress_bar):
+            order.append(indices)
+
+            real_tokens += int(features["attention_mask"].sum())
+            padded_tokens += features["attention_mask"].size
+
+            with REGISTRY.timer("model_forward_seconds", "Transformer forward time per batch"):
+                embeddings = self.session.run(None, features)[0].astype(np.float32)
+
+            if normalize:
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                embeddings = embeddings / np.maximum(norms, 1e-12)
+            outputs.append(embeddings)
+
+            REGISTRY.histogram("forward_batch_size", "Texts per forward pass", buckets=SIZE_BUCKETS).observe(len(indices))
+
+        REGISTRY.counter("texts_encoded_total", "Texts run through the transformer").inc(len(texts))
+        self.last_padding_ratio = record_padding(real_tokens, padded_tokens, len(order))
+
+        embeddings = np.empty((len(texts), outputs[0].shape[1]), dtype=np.float32)
+        embeddings[np.concatenate(order)] = np.concatenate(outputs)
+        return embeddings
+
+
+def compare_embeddings(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """Summarize how far candidate embeddings drift from reference ones."""
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+
+    dots = np.sum(reference * candidate, axis=1)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    cosines = dots / np.maximum(norms, 1e-12)
+
+    return {
+        "max_abs_diff": float(np.max(np.abs(reference - candidate))) if len(reference) else 0.0,
+        "min_cosine": float(np.min(cosines)) if len(reference) else 1.0,
+        "mean_cosine": float(np.mean(cosines)) if len(reference) else 1.0,
+    }
+
+
+def check_parity(
+    reference_model,
+    onnx_encoder: OnnxEncoder,
+    texts: List[str],
+    atol: float = 1e-4,
+    min_cosine: Optional[float] = None,
+) -> Dict[str, float]:
+    """Encode texts with both backends and raise if the ONNX output drifts too far.
+
+    ``reference_model`` is an ``EmbeddingModel`` or a plain SentenceTransformer; its
+    embeddings are L2-normalized here to match the ONNX encoder's output. Drift is
+    bounded by ``atol`` on every value or, when ``min_cosine`` is given (int8 graphs),
+    by the worst cosine similarity per text.
+    """
+    reference = np.asarray(reference_model.encode(texts, show_progress_bar=False), dtype=np.float32)
+    reference = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    candidate = onnx_encoder.encode(texts)
+    report = compare_embeddings(reference, candidate)
+
+    if min_cosine is not None:
+        if report["min_cosine"] < min_cosine:
+            raise AssertionError(
+                f"ONNX embeddings have cosine {report['min_cosine']:.5f} to PyTorch (min_cosine={min_cosine})"
+            )
+    elif report["max_abs_diff"] > atol:
+        raise AssertionError(f"ONNX embeddings differ from PyTorch by {report['max_abs_diff']:.2e} (atol={atol:.0e})")
+
+    logger.info(f"ONNX parity check passed: {report}")
+    return report
@@ -0,0 +1,100 @@
+"""
+Batch samplers for triplet training.
+"""
+
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import torch
+from datasets import Dataset
+
+try:
+    from sentence_transformers.base.sampler import DefaultBatchSampler
+except ImportError:  # sentence-transformers < 6
+    from sentence_transformers.sampler import DefaultBatchSampler
+
+from .length_batching import plan_batches
+
+TRIPLET_COLUMNS = ("anchor", "positive", "negative")
+
+
+def triplet_lengths(dataset: Dataset, columns=TRIPLET_COLUMNS) -> np.ndarray:
+    """Length of the longest text of each triplet.
+
+    Token counts for pre-tokenized triplets (``{column}_input_ids``), otherwise
+    character counts as a proxy.
+    """
+    lengths = np.zeros(len(dataset), dtype=np.int64)
+    table = dataset.with_format("arrow")
+    for column in columns:
+        if f"{column}_input_ids" in dataset.column_names:
+            token_counts = pc.list_value_length(table[f"{column}_input_ids"]).fill_null(0)
+            lengths = np.maximum(lengths, token_counts.to_numpy().astype(np.int64))
+        elif column in dataset.column_names:
+            # Arrow computes string lengths without materializing Python strings
+            column_lengths = pc.utf8_length(table[column].cast(pa.string())).fill_null(0)
+            lengths = np.maximum(lengths, column_lengths.to_numpy().astype(np.int64))
+    return lengths
+
+
+class LengthGroupedTripletSampler(DefaultBatchSampler):
+    """Batch triplets of similar length to cut padding, while keeping batches random.
+
+    Each epoch the indices are shuffled and cut into groups of ``group_batches``
+    batches; each group is sorted by length and split into batches, and the batch
+    order is shuffled again. Batches therefore mix lengths across the dataset but
+    hold similar lengths within, as in Hugging Face's length-grouped sampler.
+
+    Args:
+        dataset: Triplet dataset
+        batch_size: Triplets per batch
+        drop_last: Drop the last incomplete batch
+        group_batches: Batches per sorted group; larger groups pad less but are less random
+        seed: Base seed; the epoch is added so every epoch differs reproducibly
+    """
+
+    def __init__(
+        self,
+        dataset: Dataset,
+        batch_size: int,
+        drop_last: bool,
+        valid_label_columns: Optional[List[str]] = None,
+        generator: Optional[torch.Generator] = None,
+        seed: int = 0,
+        group_batches: int = 50,
+    ):
+        super().__init__(
+            dataset,
+            batch_size=batch_size,
+            drop_last=drop_last,
+            valid_label_columns=valid_label_columns,
+            generator=generator,
+            seed=seed,
+        )
+        self.lengths = triplet_lengths(dataset)
+        self.group_batches = group_batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths))
+        group_size = self.batch_size * self.group_batches
+
+        batches = []
+        for start in range(0, len(order), group_size):
+            group = order[start : start + group_size]
+            batches.extend(group[batch] for batch in plan_batches(self.lengths[group], self.batch_size))
+
+        # Only the global last batch may be short; move it to the end before shuffling the rest
+        short = [batch for batch in batches if len(batch) < self.batch_size]
+        full = [batch for batch in batches if len(batch) == self.batch_size]
+        for i in rng.permutation(len(full)):
+            yield full[i].tolist()
+        if short and not self.drop_last:
+            yield short[0].tolist()
+
+    def __len__(self) -> int:
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        return -(-len(self.lengths) // self.batch_size)
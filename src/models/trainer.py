@@ -1,12 +1,60 @@
+import functools
 import logging
+import os
+from typing import Dict, Optional, Union
 
 import torch
-from datasets import Dataset
+from datasets import Dataset, IterableDataset
 from sentence_transformers import SentenceTransformerTrainer, SentenceTransformerTrainingArguments
 from sentence_transformers.losses import TripletLoss
+from transformers.trainer_utils import get_last_checkpoint
+
+from src.data.token_cache import TokenizedTripletCollator, is_tokenized
+
+from . import distributed
+from .length_batching import padding_ratio
 
 logger = logging.getLogger(__name__)
 
+# Texts encoded per triplet (anchor, positive, negative)
+TEXTS_PER_TRIPLET = 3
+
+
+def estimate_activation_memory_mb(model, batch_size: int, bytes_per_value: int = 4) -> Optional[float]:
+    """Activations stored for backward by one triplet batch at ``max_seq_length``, in MiB.
+
+    A transformer layer keeps about ``s*b*h*(34 + 5*a*s/h)`` bytes at 16-bit precision
+    for ``b`` sequences of ``s`` tokens, hidden size ``h`` and ``a`` heads (Korthikanti
+    et al., 2022). Returns None when the model does not expose these dimensions.
+    """
+    try:
+        config = model[0].auto_model.config
+        layers, hidden, heads = config.num_hidden_layers, config.hidden_size, config.num_attention_heads
+        seq_len = model.max_seq_length
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return None
+
+    sequences = batch_size * TEXTS_PER_TRIPLET
+    per_layer = seq_len * sequences * hidden * (34 + 5 * heads * seq_len / hidden)
+    return layers * per_layer * (bytes_per_value / 2) / 2**20
+
+
+class _TokenCountingTrainer(SentenceTransformerTrainer):
+    """Counts real (unpadded) and padded input tokens of every training batch."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    def compute_loss(self, model, inputs, *args, **kwargs):
+        for key, value in inputs.items():
+            if key.endswith("attention_mask") and isinstance(value, torch.Tensor):
+                # Kept as a tensor so counting does not synchronize with the device
+                self.real_tokens = self.real_tokens + value.sum()
+                self.padded_tokens += value.numel()
+        return super().compute_loss(model, inputs, *args, **kwargs)
+
 
 class ModelTrainer:
     """Train sentence transformer with triplet loss."""
@@ -14,41 +62,151 @@ class ModelTrainer:
     def __init__(self, model, training_config):
         self.model = model
         self.config = training_config
+        self.last_throughput: Optional[Dict[str, float]] = None
+
+    def use_gradient_checkpointing(self) -> bool:
+        """Resolve ``gradient_checkpointing``; "auto" enables it only above the activation budget."""
+        setting = getattr(self.config, "gradient_checkpointing", True)
+        if setting != "auto":
+            return bool(setting)
+
+        bytes_per_value = 2 if torch.cuda.is_available() else 4
+        estimate = estimate_activation_memory_mb(self.model, self.config.batch_size, bytes_per_value)
+        if estimate is None:
+            logger.info("Activation memory unknown for this model; enabling gradient checkpointing")
+            return True
 
-    def train(self, train_dataset: Dataset, output_dir: str):
-        """Fine-tune model on triplet dataset."""
-        logger.info(f"Training on {len(train_dataset)} triplets")
+        budget = self.config.activation_memory_budget_mb
+        enabled = estimate > budget
+        logger.info(
+            f"Estimated activation memory {estimate:.0f} MiB vs budget {budget:.0f} MiB; "
+            f"gradient checkpointing {'on' if enabled else 'off'}"
+        )
+        return enabled
+
+    def _dataloader_kwargs(self, train_dataset) -> dict:
+        kwargs = {}
+        if getattr(self.config, "length_grouped_sampler", False):
+            if isinstance(train_dataset, IterableDataset):
+                logger.warning("Length-grouped sampling needs an indexable dataset; ignored for streaming triplets")
+            else:
+                # Imported here so sentence-transformers versions without these samplers load the trainer
+                from .samplers import LengthGroupedTripletSampler
+
+                kwargs["batch_sampler"] = functools.partial(
+                    LengthGroupedTripletSampler, group_batches=self.config.length_group_batches
+                )
+
+        workers = getattr(self.config, "dataloader_num_workers", 0)
+        kwargs["dataloader_num_workers"] = workers
+        if workers > 0:
+            kwargs["dataloader_persistent_workers"] = True
+            if self.config.dataloader_prefetch_factor is not None:
+                kwargs["dataloader_prefetch_factor"] = self.config.dataloader_prefetch_factor
+
+        if distributed.world_size() > 1:
+            if not torch.cuda.is_available():
+                kwargs.update(use_cpu=True, ddp_backend="gloo")
+            # Every rank reads its own share of the data; the default of dispatching
+            # rank 0's batches cannot concatenate batches padded to different lengths
+            kwargs["accelerator_config"] = {"dispatch_batches": False}
+        return kwargs
+
+    def resume_checkpoint(self, checkpoint_dir: str) -> Optional[str]:
+        """Latest checkpoint in ``checkpoint_dir`` when resuming is enabled, else None."""
+        if not getattr(self.config, "resume_from_checkpoint", False) or not os.path.isdir(checkpoint_dir):
+            return None
+        return get_last_checkpoint(checkpoint_dir)
+
+    def train(
+        self,
+        train_dataset: Union[Dataset, IterableDataset],
+        output_dir: str,
+        num_examples: Optional[int] = None,
+        checkpoint_dir: Optional[str] = None,
+    ):
+        """Fine-tune model on triplet dataset.
+
+        A streaming ``IterableDataset`` has no length, so ``num_examples`` must be given
+        to size the schedule. ``train_dataset`` may also hold token ids from
+        ``TokenizedTripletCache``, which are batched without re-tokenizing.
+
+        Under data-parallel training (see ``distributed.launch``) every rank passes the
+        same dataset; each optimizer step then consumes ``batch_size`` triplets per
+        rank, and only rank 0 writes ``final``.
+
+        Checkpoints go to ``checkpoint_dir`` (default ``output_dir``); with
+        ``resume_from_checkpoint`` the latest one there restores the weights, optimizer,
+        scheduler, RNG state and position in the data, which must therefore be the same
+        triplets (the creator is seeded for this). Token throughput of the run is logged
+        and kept in ``last_throughput``.
+        """
+        checkpoint_dir = checkpoint_dir or output_dir
+        dataset_size = num_examples if num_examples is not None else len(train_dataset)
+        logger.info(f"Training on {dataset_size} triplets")
 
         loss = TripletLoss(model=self.model, triplet_margin=self.config.triplet_margin)
 
-        dataset_size = len(train_dataset)
-        steps_per_epoch = max(1, dataset_size // self.config.batch_size)
+        steps_per_epoch = max(1, dataset_size // (self.config.batch_size * distributed.world_size()))
         max_steps = steps_per_epoch * self.config.epochs
+        saving = {"save_strategy": "epoch"}
+        if getattr(self.config, "checkpoint_steps", None):
+            saving = {"save_strategy": "steps", "save_steps": self.config.checkpoint_steps}
 
         args = SentenceTransformerTrainingArguments(
-            output_dir=output_dir,
+            output_dir=checkpoint_dir,
             num_train_epochs=self.config.epochs,
             per_device_train_batch_size=self.config.batch_size,
             learning_rate=self.config.learning_rate,
             warmup_steps=0,
             logging_steps=max(1, max_steps // 4),
-            save_strategy="epoch",
             save_total_limit=1,
             fp16=torch.cuda.is_available(),
             max_grad_norm=self.config.max_grad_norm,
             gradient_accumulation_steps=self.config.gradient_accumulation_steps,
-            gradient_checkpointing=True,
+            gradient_checkpointing=self.use_gradient_checkpointing(),
             dataloader_drop_last=False,
             max_steps=max_steps,
+            seed=getattr(self.config, "seed", 42),
             report_to="none",
+            **saving,
+            **self._dataloader_kwargs(train_dataset),
         )
 
-        trainer = SentenceTransformerTrainer(model=self.model, args=args, train_dataset=train_dataset, loss=loss)
+        # Cached token ids skip tokenization; they only need padding into batches
+        collator = TokenizedTripletCollator.from_model(self.model) if is_tokenized(train_dataset) else None
+        trainer = _TokenCountingTrainer(
+            model=self.model, args=args, train_dataset=train_dataset, loss=loss, data_collator=collator
+        )
 
-        trainer.train()
+        resume = self.resume_checkpoint(checkpoint_dir)
+        if resume:
+            logger.info(f"Resuming training from {resume}")
+        output = trainer.train(resume_from_checkpoint=resume)
+        self.last_throughput = self._throughput(trainer, output.metrics["train_runtime"])
 
         final_path = f"{output_dir}/final"
-        self.model.save(final_path)
-        logger.info(f"Training completed. Model saved to {final_path}")
+        if trainer.is_world_process_zero():
+            self.model.save(final_path)
+            logger.info(f"Training completed. Model saved to {final_path}")
+        distributed.barrier()
 
         return self.model
+
+    @staticmethod
+    def _throughput(trainer: _TokenCountingTrainer, runtime: float) -> Dict[str, float]:
+        # Summed over ranks, so tokens/sec is the throughput of the whole job
+        real_tokens = int(distributed.all_reduce_sum(int(trainer.real_tokens)))
+        padded_tokens = int(distributed.all_reduce_sum(trainer.padded_tokens))
+        throughput = {
+            "train_runtime": runtime,
+            "tokens": real_tokens,
+            "padded_tokens": padded_tokens,
+            "tokens_per_second": real_tokens / runtime if runtime > 0 else 0.0,
+            "padding_ratio": padding_ratio(real_tokens, padded_tokens),
+        }
+        logger.info(
+            f"Throughput: {throughput['tokens_per_second']:.0f} tokens/s over {runtime:.1f}s "
+            f"({throughput['padding_ratio']:.1%} padding)"
+        )
+        return throughput
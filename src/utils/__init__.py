@@ -3,11 +3,14 @@ Utility functions and helpers.
 """
 
 from .logging_utils import get_logger, setup_logging
+from .metrics import REGISTRY, MetricsRegistry
 from .text_utils import clean_url, extract_domain
 
 __all__ = [
     "setup_logging",
     "get_logger",
+    "MetricsRegistry",
+    "REGISTRY",
     "clean_url",
     "extract_domain",
 ]
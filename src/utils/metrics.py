@@ -0,0 +1,199 @@
+"""
+Lightweight in-process metrics for hot-path instrumentation.
+
+Histograms use fixed buckets, so recording is a bisect plus a few additions under
+a lock: cheap enough to leave on in production. Metrics can be rendered in the
+Prometheus text exposition format or summarized as a dictionary.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond tokenization up to slow batches
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Batch-size buckets (texts per forward pass)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """Monotonically increasing value."""
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Cumulative fixed-bucket histogram with approximate quantiles."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+        if total == 0:
+            return 0.0
+
+        target = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= target and count > 0:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (target - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """Named collection of counters, histograms and callback gauges."""
+
+    def __init__(self, prefix: str = "rvd"):
+        self.prefix = prefix
+        self._counters: Dict[str, Dict[LabelKey, Counter]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None) -> Counter:
+        """Get or create a counter."""
+        return self._get_or_create(self._counters, name, help, labels, Counter)
+
+    def histogram(
+        self,
+        name: str,
+        help: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Get or create a histogram."""
+        return self._get_or_create(self._histograms, name, help, labels, lambda: Histogram(buckets))
+
+    def gauge(self, name: str, fn: Callable[[], float], help: str = ""):
+        """Register a gauge whose value is read from ``fn`` at export time."""
+        with self._lock:
+            self._gauges[name] = fn
+            self._help[name] = help
+
+    @contextmanager
+    def timer(self, name: str, help: str = "", labels: Optional[Dict[str, str]] = None):
+        """Record the duration of the enclosed block in seconds."""
+        histogram = self.histogram(name, help, labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def _get_or_create(self, family: dict, name: str, help: str, labels, factory):
+        key = _label_key(labels)
+        children = family.get(name)
+        if children is not None and key in children and (not help or self._help.get(name)):
+            return children[key]
+
+        with self._lock:
+            children = family.setdefault(name, {})
+            if key not in children:
+                children[key] = factory()
+            if help or name not in self._help:
+                self._help[name] = help or self._help.get(name, "")
+            return children[key]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Summarize every metric as plain Python values (for JSON endpoints)."""
+        result: Dict[str, Dict] = {"counters": {}, "histograms": {}, "gauges": {}}
+
+        for name, children in list(self._counters.items()):
+            for key, counter in list(children.items()):
+                result["counters"][name + _format_labels(key)] = counter.value
+        for name, children in list(self._histograms.items()):
+            for key, histogram in list(children.items()):
+                result["histograms"][name + _format_labels(key)] = histogram.summary()
+        for name, fn in list(self._gauges.items()):
+            result["gauges"][name] = fn()
+
+        return result
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        for name, children in sorted(self._counters.items()):
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full_name} {self._help.get(name, '')}")
+            lines.append(f"# TYPE {full_name} counter")
+            for key, counter in sorted(children.items()):
+                lines.append(f"{full_name}{_format_labels(key)} {counter.value}")
+
+        for name, children in sorted(self._histograms.items()):
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full_name} {self._help.get(name, '')}")
+            lines.append(f"# TYPE {full_name} histogram")
+            for key, histogram in sorted(children.items()):
+                with histogram._lock:
+                    counts = list(histogram.counts)
+                    total, total_sum = histogram.count, histogram.sum
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, counts):
+                    cumulative += count
+                    lines.append(f"{full_name}_bucket{_format_labels(key, ('le', repr(float(bound))))} {cumulative}")
+                lines.append(f"{full_name}_bucket{_format_labels(key, ('le', '+Inf'))} {total}")
+                lines.append(f"{full_name}_sum{_format_labels(key)} {total_sum}")
+                lines.append(f"{full_name}_count{_format_labels(key)} {total}")
+
+        for name, fn in sorted(self._gauges.items()):
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full_name} {self._help.get(name, '')}")
+            lines.append(f"# TYPE {full_name} gauge")
+            lines.append(f"{full_name} {float(fn())}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide default registry used by the pipeline and the API
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,258 @@
+"""
+Tests for the FastAPI service, run against the stub embedding model.
+"""
+
+import asyncio
+import functools
+import json
+
+import pytest
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+
+from benchmarks.run import start_api, stop_api
+from benchmarks.stub_model import StubEmbeddingModel
+
+
+@pytest.fixture(scope="module")
+def service():
+    api, loop = start_api(functools.partial(StubEmbeddingModel, dim=16))
+    yield api, loop
+    stop_api(api, loop)
+
+
+@pytest.fixture
+def api(service):
+    api, _ = service
+    api.centroid_cache.clear()
+    return api
+
+
+@pytest.fixture
+def run(service):
+    """Run a coroutine on the loop the service's micro-batcher lives on."""
+    _, loop = service
+    return loop.run_until_complete
+
+
+def make_item(text="some comment", rule="no spam", positives=("buy now", "click here"), negatives=("hello",)):
+    return {"text": text, "rule": rule, "positive_examples": list(positives), "negative_examples": list(negatives)}
+
+
+def ndjson(*lines) -> bytes:
+    """One line per item; dicts are serialized, strings sent as they are."""
+    return "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines).encode("utf-8")
+
+
+def asgi_scope(path: str, spec_version: str = "2.0", content_type: str = "application/x-ndjson") -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": spec_version},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("ascii"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", content_type.encode("ascii"))],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+
+
+async def post(api, path: str, body: bytes, content_type: str = "application/x-ndjson"):
+    """Send ``body`` to ``path`` over ASGI; returns the status and the body chunks.
+
+    Like a real server, ``receive`` blocks after the body until the response is complete.
+    """
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent, complete = [], asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            complete.set()
+
+    await api.app(asgi_scope(path, content_type=content_type), receive, send)
+    return sent[0]["status"], [message["body"] for message in sent[1:] if message["body"]]
+
+
+def post_stream(api, body: bytes):
+    return post(api, "/stream_predict", body)
+
+
+@pytest.fixture
+def encoded(api, monkeypatch):
+    """Texts sent to the micro-batcher, one list per encode call."""
+    calls = []
+    encode = api.batcher.encode
+
+    async def recording_encode(texts, deadline=None):
+        calls.append(list(texts))
+        return await encode(texts, deadline=deadline)
+
+    monkeypatch.setattr(api.batcher, "encode", recording_encode)
+    return calls
+
+
+class TestBatchPredict:
+    """Test suite for the /predict and /batch_predict endpoints."""
+
+    def test_repeated_texts_encoded_once(self, api, run, encoded):
+        """Test that texts repeated across items are encoded once and scored identically."""
+        items = [make_item(), make_item(), make_item(text="other comment"), make_item()]
+
+        results = run(api.batch_predict([api.PredictionRequest(**item) for item in items], None))
+
+        texts = [text for call in encoded for text in call]
+        assert sorted(texts) == sorted(["some comment", "other comment", "buy now", "click here", "hello"])
+        assert results[0] == results[1] == results[3]
+        assert results[2].text == "other comment"
+
+    def test_invalid_item_fails_alone(self, api, run):
+        """Test that an item without examples gets an error while the rest are scored."""
+        items = [make_item(), make_item(positives=()), make_item(text="other comment")]
+
+        results = run(api.batch_predict([api.PredictionRequest(**item) for item in items], None))
+
+        assert results[1] == {"error": "positive_examples and negative_examples must not be empty"}
+        assert results[0].text == "some comment" and results[2].text == "other comment"
+
+    def test_centroids_shared_and_cached_across_items(self, api, run, encoded):
+        """Test that items sharing a rule compute its centroids once, and later batches reuse them."""
+        first = [make_item(text=f"comment {i}") for i in range(3)]
+        second = [make_item(text=f"later comment {i}") for i in range(2)]
+
+        run(api.batch_predict([api.PredictionRequest(**item) for item in first], None))
+        hits = api.centroid_cache.hits
+        run(api.batch_predict([api.PredictionRequest(**item) for item in second], None))
+
+        assert len(api.centroid_cache) == 1
+        assert api.centroid_cache.hits == hits + 1
+        assert [text for call in encoded[-1:] for text in call] == ["later comment 0", "later comment 1"]
+
+    def test_predict_rejects_empty_examples(self, api, run):
+        """Test that /predict answers 422, not 500, for a request without examples."""
+        body = json.dumps(make_item(negatives=())).encode("utf-8")
+
+        status, chunks = run(post(api, "/predict", body, content_type="application/json"))
+
+        assert status == 422
+        assert json.loads(b"".join(chunks))["detail"] == "positive_examples and negative_examples must not be empty"
+
+
+def test_prometheus_help_for_gauge_inputs(api, run):
+    """Test that counters read by the scrape-time gauges are exported with a description."""
+    run(api.get_metrics(format="prometheus"))
+    text = run(api.get_metrics(format="prometheus")).body.decode("utf-8")
+
+    for name in ("texts_encoded_total", "tokens_total", "padding_tokens_total", "model_forward_seconds"):
+        help_line = next(line for line in text.splitlines() if line.startswith(f"# HELP {api.REGISTRY.prefix}_{name} "))
+        assert help_line.split(" ", 3)[3].strip()
+
+
+class TestStreamPredict:
+    """Test suite for the /stream_predict endpoint."""
+
+    def test_results_are_windowed(self, api, run, monkeypatch):
+        """Test that results arrive one chunk per window of stream_window_size lines, in input order."""
+        monkeypatch.setattr(api.config.inference, "stream_window_size", 2)
+        body = ndjson(*[make_item(text=f"comment {i}") for i in range(5)])
+
+        status, chunks = run(post_stream(api, body))
+
+        assert status == 200
+        assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+        results = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+        assert [result["index"] for result in results] == list(range(5))
+        assert [result["text"] for result in results] == [f"comment {i}" for i in range(5)]
+
+    def test_invalid_lines_fail_alone(self, api, run):
+        """Test that malformed or incomplete lines get an error result without failing their neighbours."""
+        body = ndjson(make_item(), "", "not json", "", {"text": "missing fields"}, make_item())
+
+        _, chunks = run(post_stream(api, body))
+
+        results = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+        assert [result["index"] for result in results] == [0, 1, 2, 3]
+        assert "violation_score" in results[0] and "violation_score" in results[3]
+        assert results[1]["error"].startswith("Invalid request line")
+        assert results[2]["error"].startswith("Invalid request line")
+
+    def test_slot_released_after_stream(self, api, run):
+        """Test that a completed stream gives its admission slot back."""
+        admitted = api.admission.admitted
+
+        status, _ = run(post_stream(api, ndjson(make_item())))
+
+        assert status == 200
+        assert api.admission.admitted == admitted + 1
+        assert api.admission.depth == 0
+
+    @pytest.mark.parametrize("spec_version", ["2.0", "2.4"])
+    def test_slot_released_when_client_leaves_before_first_chunk(self, api, run, spec_version):
+        """Test that the slot is released when sending the response start fails."""
+        messages = [{"type": "http.request", "body": ndjson(make_item()), "more_body": False}]
+
+        async def receive():
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            raise OSError("client gone")
+
+        with pytest.raises((OSError, ClientDisconnect)):
+            run(api.app(asgi_scope("/stream_predict", spec_version), receive, send))
+        assert api.admission.depth == 0
+
+    def test_slot_released_when_client_leaves_during_upload(self, api, run):
+        """Test that the slot is released when the client disconnects mid-body."""
+        messages = [
+            {"type": "http.request", "body": ndjson(make_item()), "more_body": True},
+            {"type": "http.disconnect"},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        with pytest.raises(ClientDisconnect):
+            run(api.app(asgi_scope("/stream_predict", "2.4"), receive, send))
+        assert api.admission.depth == 0
+
+    def test_stream_stops_when_client_leaves_after_upload(self, api, run):
+        """Test that a disconnect after the body stops the stream and releases the slot."""
+        messages = [{"type": "http.request", "body": ndjson(make_item()), "more_body": False}]
+
+        async def receive():
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            pass
+
+        run(api.app(asgi_scope("/stream_predict"), receive, send))
+        assert api.admission.depth == 0
+
+    def test_background_task_runs(self, api, run, monkeypatch):
+        """Test that a background task attached to the stream response still runs."""
+        calls = []
+        make_response = api.DuplexStreamingResponse
+
+        def with_background(*args, **kwargs):
+            response = make_response(*args, **kwargs)
+            response.background = BackgroundTask(calls.append, "done")
+            return response
+
+        monkeypatch.setattr(api, "DuplexStreamingResponse", with_background)
+        run(post_stream(api, ndjson(make_item())))
+
+        assert calls == ["done"]
@@ -0,0 +1,138 @@
+"""
+Tests for request coalescing in the micro-batcher.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.inference.admission import AdmissionController, QueueFullError
+from src.inference.batching import DeadlineExceededError, MicroBatcher
+
+
+class RecordingEncoder:
+    """Deterministic encoder that records every batch it receives."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        if self.fail:
+            raise RuntimeError("encode failed")
+        return np.array([[len(text), ord(text[0])] for text in texts], dtype=np.float32)
+
+
+def run_with_batcher(batcher, coro_factory):
+    """Run a coroutine against a started batcher and stop it afterwards."""
+
+    async def runner():
+        batcher.start()
+        try:
+            return await coro_factory()
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(runner())
+
+
+class TestMicroBatcher:
+    """Test suite for MicroBatcher class."""
+
+    def test_concurrent_requests_share_one_batch(self):
+        """Test that concurrent callers are coalesced into a single encode call."""
+        encoder = RecordingEncoder()
+        batcher = MicroBatcher(encoder, max_batch_size=64, max_wait_ms=20)
+
+        results = run_with_batcher(
+            batcher, lambda: asyncio.gather(batcher.encode(["a", "bb"]), batcher.encode(["ccc"]), batcher.encode(["a"]))
+        )
+
+        assert len(encoder.calls) == 1
+        assert sorted(encoder.calls[0]) == ["a", "bb", "ccc"]  # "a" deduplicated
+        np.testing.assert_array_equal(results[0], [[1, ord("a")], [2, ord("b")]])
+        np.testing.assert_array_equal(results[1], [[3, ord("c")]])
+        np.testing.assert_array_equal(results[2], [[1, ord("a")]])
+
+    def test_batch_cap_splits_batches(self):
+        """Test that the batch cap flushes before the wait window expires."""
+        encoder = RecordingEncoder()
+        batcher = MicroBatcher(encoder, max_batch_size=2, max_wait_ms=50)
+
+        run_with_batcher(batcher, lambda: asyncio.gather(*(batcher.encode([text]) for text in ["a", "b", "c", "d"])))
+
+        assert [len(call) for call in encoder.calls] == [2, 2]
+
+    def test_oversized_request_is_encoded_alone(self):
+        """Test that a request larger than the cap still gets served."""
+        encoder = RecordingEncoder()
+        batcher = MicroBatcher(encoder, max_batch_size=2, max_wait_ms=1)
+
+        result = run_with_batcher(batcher, lambda: batcher.encode(["a", "b", "c"]))
+
+        assert result.shape == (3, 2)
+
+    def test_encode_error_propagates_to_callers(self):
+        """Test that encoder failures are raised in every waiting caller."""
+        batcher = MicroBatcher(RecordingEncoder(fail=True), max_wait_ms=1)
+
+        with pytest.raises(RuntimeError, match="encode failed"):
+            run_with_batcher(batcher, lambda: batcher.encode(["a"]))
+
+    def test_encode_requires_start(self):
+        """Test that encoding before start() is rejected."""
+        batcher = MicroBatcher(RecordingEncoder())
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(batcher.encode(["a"]))
+
+    def test_encode_runs_on_executor(self):
+        """Test that encoding is dispatched to the given executor."""
+        threads = []
+
+        def encoder(texts):
+            threads.append(threading.current_thread().name)
+            return np.ones((len(texts), 2))
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="encode") as executor:
+            batcher = MicroBatcher(encoder, max_wait_ms=1, executor=executor)
+            result = run_with_batcher(batcher, lambda: batcher.encode(["a", "b"]))
+
+        assert result.shape == (2, 2)
+        assert threads[0].startswith("encode")
+
+    def test_expired_request_is_dropped(self):
+        """Test that requests past their deadline never reach the model."""
+        encoder = RecordingEncoder()
+        batcher = MicroBatcher(encoder, max_wait_ms=20)
+
+        async def expired():
+            deadline = asyncio.get_running_loop().time() - 1.0
+            return await batcher.encode(["a"], deadline=deadline)
+
+        with pytest.raises(DeadlineExceededError):
+            run_with_batcher(batcher, expired)
+
+        assert encoder.calls == []
+        assert batcher.expired == 1
+
+
+class TestAdmissionController:
+    """Test suite for AdmissionController class."""
+
+    def test_rejects_beyond_max_depth(self):
+        """Test that requests beyond the queue depth are rejected."""
+        admission = AdmissionController(max_depth=1, retry_after_s=3)
+
+        with admission.admit():
+            with pytest.raises(QueueFullError) as excinfo:
+                with admission.admit():
+                    pass
+
+        assert excinfo.value.retry_after_s == 3
+        assert admission.depth == 0
+        assert admission.stats()["rejected"] == 1
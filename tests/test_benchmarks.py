@@ -0,0 +1,54 @@
+"""
+Tests for the offline benchmark helpers.
+"""
+
+import numpy as np
+
+from benchmarks.run import compare
+from benchmarks.stub_model import StubEmbeddingModel
+from benchmarks.synthetic import make_jigsaw_frame
+
+
+class TestSyntheticData:
+    """Test suite for the synthetic Jigsaw generator."""
+
+    def test_deterministic(self):
+        """Test that the same seed produces the same frame."""
+        first = make_jigsaw_frame(rows=200, rules=5, seed=3)
+        second = make_jigsaw_frame(rows=200, rules=5, seed=3)
+
+        assert first.equals(second)
+        assert first["rule"].nunique() == 5
+
+    def test_url_density(self):
+        """Test that the URL share follows url_density."""
+        df = make_jigsaw_frame(rows=2000, url_density=0.5)
+
+        assert 0.4 < df["body"].str.contains("https://").mean() < 0.6
+
+
+class TestStubEmbeddingModel:
+    """Test suite for the stub embedding model."""
+
+    def test_seeded_unit_vectors(self):
+        """Test that vectors depend only on the text and seed."""
+        model = StubEmbeddingModel(dim=8)
+        model.load_model()
+
+        embeddings = model.encode(["a", "b", "a"], show_progress_bar=False)
+
+        assert embeddings.shape == (3, 8)
+        np.testing.assert_array_equal(embeddings[0], embeddings[2])
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+
+
+def test_compare_flags_regressions():
+    """Test that only slowdowns beyond the tolerance are flagged."""
+    baseline = {"results": {"a": {"min_seconds": 1.0}, "b": {"min_seconds": 1.0}}}
+    current = {"results": {"a": {"min_seconds": 1.05}, "b": {"min_seconds": 1.5}, "c": {"min_seconds": 1.0}}}
+
+    report = compare(baseline, current, tolerance=0.1)
+
+    assert not report["a"]["regression"]
+    assert report["b"]["regression"]
+    assert "c" not in report
@@ -0,0 +1,63 @@
+"""
+Tests for the API centroid cache.
+"""
+
+import numpy as np
+
+from src.inference.centroid_cache import CentroidCache
+
+
+def make_centroids(dim=4, value=1.0):
+    return np.full(dim, value, dtype=np.float32), np.full(dim, -value, dtype=np.float32)
+
+
+class TestCentroidCache:
+    """Test suite for CentroidCache class."""
+
+    def test_key_ignores_example_order(self):
+        """Test that example order does not change the key."""
+        key_a = CentroidCache.make_key("rule", ["p1", "p2"], ["n1"])
+        key_b = CentroidCache.make_key("rule", ["p2", "p1"], ["n1"])
+        assert key_a == key_b
+
+    def test_key_separates_positives_and_negatives(self):
+        """Test that moving an example between sets changes the key."""
+        key_a = CentroidCache.make_key("rule", ["a", "b"], [])
+        key_b = CentroidCache.make_key("rule", ["a"], ["b"])
+        assert key_a != key_b
+
+    def test_hit_and_miss_counters(self):
+        """Test hit/miss accounting."""
+        cache = CentroidCache()
+        key = cache.make_key("rule", ["p"], ["n"])
+
+        assert cache.get(key) is None
+        cache.put(key, *make_centroids())
+        pos, neg = cache.get(key)
+
+        np.testing.assert_array_equal(pos, np.ones(4))
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction_by_entries(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = CentroidCache(max_entries=2)
+        cache.put("a", *make_centroids())
+        cache.put("b", *make_centroids())
+        cache.get("a")
+        cache.put("c", *make_centroids())
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_memory_bound(self):
+        """Test that the byte bound limits the number of entries."""
+        entry_bytes = sum(c.nbytes for c in make_centroids())
+        cache = CentroidCache(max_entries=100, max_bytes=3 * entry_bytes)
+
+        for i in range(10):
+            cache.put(str(i), *make_centroids())
+
+        assert len(cache) == 3
+        assert cache.bytes_used <= 3 * entry_bytes
@@ -0,0 +1,75 @@
+"""
+Tests for centroid construction.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.preprocessor import TextPreprocessor
+from src.features.centroids import CentroidBuilder
+
+
+@pytest.fixture
+def example_data():
+    """Two rules; Rule B has no negative examples with embeddings."""
+    df = pd.DataFrame(
+        {
+            "rule": ["Rule A", "Rule A", "Rule B"],
+            "positive_example_1": ["p1", "p1", "p3"],
+            "positive_example_2": ["p2", np.nan, "p3"],
+            "negative_example_1": ["n1", "n2", "unknown"],
+            "negative_example_2": [np.nan, "n1", np.nan],
+        }
+    )
+    text_to_embedding = {
+        "p1": np.array([1.0, 0.0], dtype=np.float32),
+        "p2": np.array([0.0, 1.0], dtype=np.float32),
+        "p3": np.array([1.0, 1.0], dtype=np.float32),
+        "n1": np.array([-1.0, 0.0], dtype=np.float32),
+        "n2": np.array([0.0, -1.0], dtype=np.float32),
+    }
+    rule_embeddings = {"Rule A": np.array([0.5, 0.5]), "Rule B": np.array([0.1, 0.9])}
+    return df, text_to_embedding, rule_embeddings
+
+
+class TestCentroidBuilder:
+    """Test suite for CentroidBuilder class."""
+
+    def test_duplicates_weighted_by_occurrence(self, example_data):
+        """Test that repeated examples count once per occurrence."""
+        df, text_to_embedding, rule_embeddings = example_data
+
+        centroids = CentroidBuilder.build_rule_centroids(df, text_to_embedding, rule_embeddings, TextPreprocessor())
+
+        entry = centroids["Rule A"]
+        assert entry["pos_count"] == 3 and entry["neg_count"] == 3
+        expected_pos = np.array([2.0, 1.0]) / np.linalg.norm([2.0, 1.0])
+        expected_neg = np.array([-2.0, -1.0]) / np.linalg.norm([2.0, 1.0])
+        np.testing.assert_allclose(entry["positive"], expected_pos, rtol=1e-6)
+        np.testing.assert_allclose(entry["negative"], expected_neg, rtol=1e-6)
+        np.testing.assert_array_equal(entry["rule_embedding"], rule_embeddings["Rule A"])
+
+    def test_rule_without_negatives_is_skipped(self, example_data):
+        """Test that rules need both positive and negative examples."""
+        df, text_to_embedding, rule_embeddings = example_data
+
+        centroids = CentroidBuilder.build_rule_centroids(df, text_to_embedding, rule_embeddings, TextPreprocessor())
+
+        assert list(centroids) == ["Rule A"]
+
+    def test_no_embeddings(self, example_data):
+        """Test that missing embeddings produce no centroids."""
+        df, _, rule_embeddings = example_data
+
+        assert CentroidBuilder.build_rule_centroids(df, {}, rule_embeddings, TextPreprocessor()) == {}
+
+    def test_rule_examples_are_distinct(self, example_data):
+        """Test that kNN examples are deduplicated per rule and need both polarities."""
+        df, text_to_embedding, _ = example_data
+
+        rule_examples = CentroidBuilder.build_rule_examples(df, text_to_embedding, TextPreprocessor())
+
+        assert list(rule_examples) == ["Rule A"]
+        assert len(rule_examples["Rule A"]["positive"]) == 2
+        assert len(rule_examples["Rule A"]["negative"]) == 2
@@ -0,0 +1,104 @@
+"""
+Tests for bounded-memory chunked inference.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.preprocessor import TextPreprocessor
+from src.features.centroids import CentroidBuilder
+from src.features.embeddings import EmbeddingGenerator
+from src.inference.chunked import ChunkedInference
+from src.inference.predictor import ViolationPredictor
+
+
+class HashEmbeddingModel:
+    """Deterministic stand-in for EmbeddingModel: each text maps to a seeded vector."""
+
+    def encode(self, texts, batch_size=64, normalize=True, show_progress_bar=True):
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest(), "little")
+            vector = np.random.default_rng(seed).normal(size=8).astype(np.float32)
+            vectors.append(vector / np.linalg.norm(vector))
+        return np.stack(vectors)
+
+
+@pytest.fixture
+def test_csv(tmp_path):
+    """Interleaved rules, repeated examples and missing values across chunk boundaries."""
+    rng = np.random.default_rng(0)
+    n = 57
+    texts = [f"comment {i} see https://www.example.com/r/{i}/x/y" for i in range(20)]
+
+    def column(missing=0.1):
+        values = rng.choice(texts, size=n).astype(object)
+        values[rng.random(n) < missing] = np.nan
+        return values
+
+    df = pd.DataFrame(
+        {
+            "row_id": np.arange(n) + 1000,
+            "body": column(),
+            "rule": rng.choice(["No spam", "No ads", "Be civil"], size=n),
+            "positive_example_1": column(),
+            "positive_example_2": column(),
+            "negative_example_1": column(),
+            "negative_example_2": column(),
+        }
+    )
+    path = tmp_path / "test.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+class TestChunkedInference:
+    """Test suite for ChunkedInference class."""
+
+    def test_output_matches_in_memory_path(self, test_csv, tmp_path):
+        """Test that the chunked submission is byte-identical to the in-memory one."""
+        preprocessor = TextPreprocessor()
+        generator = EmbeddingGenerator(HashEmbeddingModel())
+        predictor = ViolationPredictor()
+
+        df = pd.read_csv(test_csv)
+        text_to_embedding, rule_embeddings = generator.build_dataframe_embeddings(df, preprocessor)
+        rule_centroids = CentroidBuilder().build_rule_centroids(df, text_to_embedding, rule_embeddings, preprocessor)
+        row_ids, predictions = predictor.predict(df, text_to_embedding, rule_centroids, preprocessor)
+        expected = tmp_path / "expected.csv"
+        pd.DataFrame({"row_id": row_ids, "rule_violation": predictions}).to_csv(expected, index=False)
+
+        chunked = ChunkedInference(generator, predictor, preprocessor, chunksize=7)
+        output = tmp_path / "out" / "submission.csv"
+        written = chunked.predict_to_csv(str(test_csv), str(output))
+
+        assert written == len(row_ids)
+        assert output.read_bytes() == expected.read_bytes()
+
+    def test_centroids_match_builder(self, test_csv):
+        """Test that running sums reproduce CentroidBuilder centroids and counts."""
+        preprocessor = TextPreprocessor()
+        generator = EmbeddingGenerator(HashEmbeddingModel())
+
+        df = pd.read_csv(test_csv)
+        text_to_embedding, rule_embeddings = generator.build_dataframe_embeddings(df, preprocessor)
+        expected = CentroidBuilder().build_rule_centroids(df, text_to_embedding, rule_embeddings, preprocessor)
+
+        centroids = ChunkedInference(generator, ViolationPredictor(), preprocessor, chunksize=5).build_rule_centroids(
+            str(test_csv)
+        )
+
+        assert list(centroids) == list(expected)
+        for rule, entry in expected.items():
+            np.testing.assert_array_equal(centroids[rule]["positive"], entry["positive"])
+            np.testing.assert_array_equal(centroids[rule]["negative"], entry["negative"])
+            assert centroids[rule]["pos_count"] == entry["pos_count"]
+            assert centroids[rule]["neg_count"] == entry["neg_count"]
+
+    def test_invalid_chunksize(self):
+        """Test that a non-positive chunk size is rejected."""
+        with pytest.raises(ValueError):
+            ChunkedInference(EmbeddingGenerator(HashEmbeddingModel()), ViolationPredictor(), TextPreprocessor(), chunksize=0)
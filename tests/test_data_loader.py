@@ -77,3 +77,79 @@ class TestDataLoader:
 
         unique_rules = df["rule"].nunique()
         assert unique_rules == 2  # Rule A and Rule B
+
+
+@pytest.fixture
+def columnar_frame():
+    """Frame with every required column plus one the loader should not read."""
+    return pd.DataFrame(
+        {
+            "row_id": [1, 2, 3],
+            "body": ["Test body 1", None, "Test body 3"],
+            "rule": ["Rule A", "Rule B", "Rule A"],
+            "positive_example_1": ["Pos 1", "Pos 2", "Pos 3"],
+            "positive_example_2": ["Pos 4", "Pos 5", "Pos 6"],
+            "negative_example_1": ["Neg 1", "Neg 2", "Neg 3"],
+            "negative_example_2": ["Neg 4", "Neg 5", "Neg 6"],
+            "subreddit": ["a", "b", "c"],
+        }
+    )
+
+
+class TestColumnarLoading:
+    """Test suite for Parquet and Arrow IPC inputs."""
+
+    def test_load_parquet_projects_columns(self, columnar_frame, tmp_path):
+        """Test that only required columns are read and rule is categorical."""
+        path = str(tmp_path / "test.parquet")
+        columnar_frame.to_parquet(path, index=False)
+
+        df = DataLoader.load_test_data(path)
+
+        assert "subreddit" not in df.columns
+        assert isinstance(df["rule"].dtype, pd.CategoricalDtype)
+        assert df["rule"].nunique() == 2
+        assert pd.isna(df["body"][1])
+
+    @pytest.mark.parametrize("memory_map", [False, True])
+    def test_load_arrow(self, columnar_frame, tmp_path, memory_map):
+        """Test Arrow IPC loading with and without memory mapping."""
+        path = str(tmp_path / "test.arrow")
+        columnar_frame.to_feather(path)
+
+        df = DataLoader.load_test_data(path, memory_map=memory_map)
+
+        assert list(df.columns) == [col for col in columnar_frame.columns if col != "subreddit"]
+        assert df["body"].tolist()[0] == "Test body 1"
+
+    def test_validate_schema(self, columnar_frame, tmp_path):
+        """Test validation against a file schema without loading rows."""
+        path = str(tmp_path / "test.parquet")
+        columnar_frame.drop(columns=["negative_example_2"]).to_parquet(path, index=False)
+
+        assert DataLoader.validate_data(DataLoader.read_schema(path)) is False
+
+    def test_iter_parquet_chunks(self, columnar_frame, tmp_path):
+        """Test chunked reading of Parquet files."""
+        path = str(tmp_path / "test.parquet")
+        columnar_frame.to_parquet(path, index=False)
+
+        chunks = list(DataLoader.iter_test_data(path, chunksize=2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert chunks[1]["row_id"].tolist() == [3]
+
+    @pytest.mark.parametrize("memory_map", [False, True])
+    def test_iter_arrow_chunks_by_record_batch(self, columnar_frame, tmp_path, monkeypatch, memory_map):
+        """Test that Arrow files are streamed batch by batch and re-sliced to chunksize."""
+        path = str(tmp_path / "test.arrow")
+        frame = pd.concat([columnar_frame] * 3, ignore_index=True).assign(row_id=range(9))
+        frame.to_feather(path, chunksize=2)
+        monkeypatch.setattr(DataLoader, "_read_table", None)
+
+        chunks = list(DataLoader.iter_test_data(path, chunksize=4, memory_map=memory_map))
+
+        assert [len(chunk) for chunk in chunks] == [4, 4, 1]
+        assert [row for chunk in chunks for row in chunk["row_id"]] == list(range(9))
+        assert all("subreddit" not in chunk.columns for chunk in chunks)
+        assert isinstance(chunks[0]["rule"].dtype, pd.CategoricalDtype)
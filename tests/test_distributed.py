@@ -0,0 +1,33 @@
+"""
+Tests for multi-process CPU training helpers.
+"""
+
+import json
+
+from src.models import distributed
+
+
+def _record_rank(output_dir):
+    """Rank body: exercise the collective helpers and write what this rank saw."""
+    shared = distributed.run_on_main(lambda: f"from rank {distributed.rank()}")
+    total = distributed.all_reduce_sum(distributed.rank() + 1)
+    with open(f"{output_dir}/rank-{distributed.rank()}.json", "w") as f:
+        json.dump({"world_size": distributed.world_size(), "shared": shared, "total": total}, f)
+
+
+def test_single_process_helpers():
+    """Test that the helpers are no-ops outside a process group."""
+    assert distributed.world_size() == 1
+    assert distributed.is_main_process()
+    assert distributed.run_on_main(lambda: 42) == 42
+    assert distributed.all_reduce_sum(3.0) == 3.0
+    distributed.barrier()
+
+
+def test_launch_runs_every_rank_in_one_group(tmp_path):
+    """Test that launched ranks share rank 0's result and reduce across the group."""
+    distributed.launch(_record_rank, 2, args=(str(tmp_path),), threads_per_process=1)
+
+    for rank in range(2):
+        with open(tmp_path / f"rank-{rank}.json") as f:
+            assert json.load(f) == {"world_size": 2, "shared": "from rank 0", "total": 3.0}
@@ -0,0 +1,107 @@
+"""
+Tests for the embedding cache and cached encoding in EmbeddingModel.
+"""
+
+import time
+
+import numpy as np
+import pytest
+import torch
+
+from src.models.embedding_cache import EmbeddingCache
+from src.models.embedding_model import EmbeddingModel
+
+
+class CountingSentenceTransformer:
+    """Stand-in for SentenceTransformer that records which texts it tokenizes."""
+
+    device = torch.device("cpu")
+
+    def __init__(self):
+        self.encoded = []
+
+    def eval(self):
+        return self
+
+    def tokenize(self, texts):
+        self.encoded.extend(texts)
+        return {"lengths": torch.tensor([[float(len(text))] for text in texts])}
+
+    def __call__(self, features):
+        lengths = features["lengths"]
+        return {"sentence_embedding": torch.cat([lengths, torch.ones_like(lengths)], dim=1)}
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+
+@pytest.fixture
+def cached_model():
+    model = EmbeddingModel(model_path="stub-model", cache=EmbeddingCache(max_bytes=1024))
+    model.model = CountingSentenceTransformer()
+    return model
+
+
+class TestEmbeddingCache:
+    """Test suite for EmbeddingCache class."""
+
+    def test_get_many_reports_hits_and_misses(self):
+        """Test hit/miss accounting across a multi-key lookup."""
+        cache = EmbeddingCache(max_bytes=1024)
+        cache.put_many(["a"], [np.ones(2, dtype=np.float32)])
+
+        results = cache.get_many(["a", "b"])
+
+        assert results[0] is not None and results[1] is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_byte_cap_evicts_lru(self):
+        """Test that the byte cap evicts least-recently-used entries."""
+        cache = EmbeddingCache(max_bytes=16)  # room for two 8-byte entries
+        cache.put_many(["a", "b"], [np.ones(2, dtype=np.float32)] * 2)
+        cache.get_many(["a"])
+        cache.put_many(["c"], [np.ones(2, dtype=np.float32)])
+
+        assert cache.get_many(["b"]) == [None]
+        assert cache.stats()["evictions"] == 1
+        assert cache.bytes_used == 16
+
+    def test_ttl_expires_entries(self):
+        """Test that entries older than the TTL are treated as misses."""
+        cache = EmbeddingCache(max_bytes=1024, ttl_seconds=0.01)
+        cache.put_many(["a"], [np.ones(2, dtype=np.float32)])
+        time.sleep(0.02)
+
+        assert cache.get_many(["a"]) == [None]
+        assert cache.stats()["expirations"] == 1
+
+    def test_cached_values_are_read_only(self):
+        """Test that callers cannot mutate cached embeddings."""
+        cache = EmbeddingCache(max_bytes=1024)
+        cache.put_many(["a"], [np.ones(2, dtype=np.float32)])
+
+        with pytest.raises(ValueError):
+            cache.get_many(["a"])[0][0] = 5.0
+
+
+class TestCachedEncode:
+    """Test suite for cached EmbeddingModel.encode."""
+
+    def test_only_misses_are_encoded(self, cached_model):
+        """Test that repeated texts skip the transformer."""
+        cached_model.encode(["aa", "b"], normalize=False, show_progress_bar=False)
+        embeddings = cached_model.encode(["ccc", "aa", "ccc", "b"], normalize=False, show_progress_bar=False)
+
+        assert cached_model.model.encoded == ["aa", "b", "ccc"]
+        np.testing.assert_array_equal(embeddings[:, 0], [3, 2, 3, 1])
+
+    def test_key_depends_on_normalize_flag(self, cached_model):
+        """Test that normalized and raw embeddings are cached separately."""
+        assert cached_model.cache_key("a", normalize=True) != cached_model.cache_key("a", normalize=False)
+
+    def test_key_depends_on_max_seq_length(self):
+        """Test that changing the truncation length changes the key."""
+        short = EmbeddingModel(model_path="stub-model", max_seq_length=64)
+        long = EmbeddingModel(model_path="stub-model", max_seq_length=128)
+        assert short.cache_key("a") != long.cache_key("a")
@@ -0,0 +1,83 @@
+"""
+Tests for the persistent embedding store.
+"""
+
+import numpy as np
+import pytest
+
+from src.features.embedding_store import EmbeddingStore
+from src.features.embeddings import EmbeddingGenerator
+
+
+class CountingModel:
+    """Stand-in for EmbeddingModel that records which texts it encodes."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=64, normalize=True):
+        self.encoded.extend(texts)
+        return np.array([[len(text), 0.5, -1.0] for text in texts], dtype=np.float32)
+
+
+class TestEmbeddingStore:
+    """Test suite for EmbeddingStore class."""
+
+    def test_add_and_get(self, tmp_path):
+        """Test round-tripping embeddings through the store."""
+        store = EmbeddingStore(str(tmp_path), "model-a")
+        store.add(["a", "bb"], np.array([[1.0, 2.0], [3.0, 4.0]]))
+
+        results = store.get_many(["bb", "missing", "a"])
+
+        np.testing.assert_array_equal(results[0], [3.0, 4.0])
+        assert results[1] is None
+        np.testing.assert_array_equal(results[2], [1.0, 2.0])
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test that a new instance (or process) sees committed rows."""
+        writer = EmbeddingStore(str(tmp_path), "model-a")
+        reader = EmbeddingStore(str(tmp_path), "model-a")
+        writer.add(["a"], np.array([[1.0, 2.0]]))
+        writer.add(["b", "a"], np.array([[5.0, 6.0], [9.0, 9.0]]))
+
+        reader.refresh()
+
+        assert len(reader) == 2
+        np.testing.assert_array_equal(reader.get_many(["a"])[0], [1.0, 2.0])  # first write wins
+
+    def test_namespaced_by_fingerprint(self, tmp_path):
+        """Test that different model fingerprints do not share rows."""
+        EmbeddingStore(str(tmp_path), "model-a").add(["a"], np.array([[1.0, 2.0]]))
+
+        assert "a" not in EmbeddingStore(str(tmp_path), "model-b")
+
+    def test_float16_storage(self, tmp_path):
+        """Test half-precision storage returns float32 arrays."""
+        store = EmbeddingStore(str(tmp_path), "model-a", dtype="float16")
+        store.add(["a"], np.array([[0.1, 0.2]], dtype=np.float32))
+
+        result = store.get_many(["a"])[0]
+
+        assert result.dtype == np.float32
+        np.testing.assert_allclose(result, [0.1, 0.2], atol=1e-3)
+
+    def test_dimension_mismatch(self, tmp_path):
+        """Test that mixing embedding sizes is rejected."""
+        store = EmbeddingStore(str(tmp_path), "model-a")
+        store.add(["a"], np.array([[1.0, 2.0]]))
+
+        with pytest.raises(ValueError):
+            store.add(["b"], np.array([[1.0, 2.0, 3.0]]))
+
+    def test_generator_only_encodes_unseen_texts(self, tmp_path):
+        """Test incremental runs through EmbeddingGenerator."""
+        model = CountingModel()
+        EmbeddingGenerator(model, store=EmbeddingStore(str(tmp_path), "model-a")).build_text_embeddings(["a", "bb"])
+
+        generator = EmbeddingGenerator(model, store=EmbeddingStore(str(tmp_path), "model-a"))
+        embeddings = generator.build_text_embeddings(["bb", "ccc", "a"])
+
+        assert model.encoded == ["a", "bb", "ccc"]
+        assert set(embeddings) == {"a", "bb", "ccc"}
+        np.testing.assert_array_equal(embeddings["bb"], [2.0, 0.5, -1.0])
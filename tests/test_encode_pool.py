@@ -0,0 +1,63 @@
+"""
+Tests for the multi-process encoding pool.
+"""
+
+import numpy as np
+import pytest
+
+from src.features.embeddings import EmbeddingGenerator
+from src.features.encode_pool import EncodePool
+
+
+class LengthModel:
+    """Picklable stand-in encoder: embeds a text as (length, first character code)."""
+
+    last_padding_ratio = 0.25
+
+    def encode(self, texts, batch_size=64, normalize=True, show_progress_bar=True):
+        if any(text == "boom" for text in texts):
+            raise ValueError("cannot encode boom")
+        return np.array([[len(text), ord(text[0])] for text in texts], dtype=np.float32)
+
+
+def load_length_model():
+    return LengthModel()
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with EncodePool(load_length_model, num_workers=2, threads_per_worker=1, task_size=7) as encode_pool:
+        yield encode_pool
+
+
+class TestEncodePool:
+    """Test suite for EncodePool class."""
+
+    def test_results_keep_input_order(self, pool):
+        """Test that sharded results come back in input order."""
+        texts = [f"{chr(97 + i % 26)}{'x' * i}" for i in range(50)]
+
+        embeddings = pool.encode(texts)
+
+        np.testing.assert_array_equal(embeddings, LengthModel().encode(texts))
+        assert pool.last_padding_ratio == pytest.approx(0.25)
+
+    def test_empty_input(self, pool):
+        """Test that no texts give an empty (0, dim) matrix."""
+        assert pool.encode([]).shape == (0, 2)
+
+    def test_generator_uses_pool(self, pool):
+        """Test that EmbeddingGenerator routes encoding through the pool."""
+        generator = EmbeddingGenerator(model=object(), pool=pool)
+
+        embeddings = generator.build_text_embeddings(["aa", "b", "aa"])
+
+        assert set(embeddings) == {"aa", "b"}
+        np.testing.assert_array_equal(embeddings["aa"], [2, 97])
+
+    def test_worker_error_is_raised(self, pool):
+        """Test that a failing slice surfaces its traceback and the pool stays usable."""
+        with pytest.raises(RuntimeError, match="cannot encode boom"):
+            pool.encode(["a"] * 10 + ["boom"])
+
+        np.testing.assert_array_equal(pool.encode(["ab"]), [[2, 97]])
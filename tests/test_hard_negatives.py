@@ -0,0 +1,61 @@
+"""
+Tests for hard-negative mining.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.data.hard_negatives import HardNegativeMiner, top_k_similar
+from src.features.embeddings import EmbeddingGenerator
+
+VECTORS = {
+    "p1": [1.0, 0.0, 0.0],
+    "p2": [0.9, 0.1, 0.0],
+    "n_easy": [-1.0, 0.0, 0.0],
+    "n_hard": [0.8, 0.2, 0.0],
+    "n_mid": [0.0, 1.0, 0.0],
+    "q1": [0.0, 0.0, 1.0],
+    "m1": [0.0, 0.0, 0.9],
+}
+
+
+class LookupModel:
+    """Stand-in encoder returning fixed vectors per text."""
+
+    def encode(self, texts, batch_size=64, normalize=True):
+        vectors = np.array([VECTORS[text] for text in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_blocked_top_k_matches_brute_force():
+    """Test that small blocks give the same neighbours as one matrix product."""
+    rng = np.random.default_rng(0)
+    queries, pool = rng.normal(size=(37, 8)), rng.normal(size=(101, 8))
+
+    ids, sims = top_k_similar(queries, pool, k=5, block_size=16)
+
+    expected = np.argsort(-(queries @ pool.T), axis=1, kind="stable")[:, :5]
+    np.testing.assert_array_equal(ids, expected)
+    assert np.all(np.diff(sims, axis=1) <= 0)
+
+
+def test_mines_hardest_negatives_within_rule():
+    """Test that anchors get their rule's most similar negatives and never another rule's."""
+    df = pd.DataFrame(
+        {
+            "rule": ["A", "A", "B"],
+            "positive_example_1": ["p1", "p2", "q1"],
+            "positive_example_2": [np.nan, "p1", np.nan],
+            "negative_example_1": ["n_easy", "n_mid", "m1"],
+            "negative_example_2": ["n_hard", np.nan, np.nan],
+        }
+    )
+    miner = HardNegativeMiner(EmbeddingGenerator(LookupModel()), negatives_per_anchor=2, block_size=1, seed=0)
+
+    triplets = miner.mine(df).to_pandas()
+
+    rule_a = triplets[triplets["anchor"].isin(["p1", "p2"])]
+    assert len(rule_a) == 4
+    assert set(rule_a["negative"]) == {"n_hard", "n_mid"}
+    assert set(zip(rule_a["anchor"], rule_a["positive"])) == {("p1", "p2"), ("p2", "p1")}
+    assert triplets[triplets["anchor"] == "q1"][["positive", "negative"]].values.tolist() == [["q1", "m1"]]
@@ -0,0 +1,83 @@
+"""
+Tests for incremental fine-tuning rule selection and checkpoint resume.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.incremental import changed_rules, changeset_id, incremental_rows, load_manifest, rule_fingerprints, save_manifest
+from src.models.trainer import ModelTrainer
+
+
+@pytest.fixture
+def rules_df():
+    rules = np.repeat([f"rule {i}" for i in range(10)], 20)
+    return pd.DataFrame(
+        {
+            "rule": rules,
+            "positive_example_1": [f"p{i}" for i in range(len(rules))],
+            "positive_example_2": [np.nan] * len(rules),
+            "negative_example_1": [f"n{i}" for i in range(len(rules))],
+            "negative_example_2": ["shared"] * len(rules),
+        }
+    )
+
+
+def test_fingerprints_ignore_row_order(rules_df):
+    """Test that shuffling rows keeps every fingerprint."""
+    shuffled = rules_df.sample(frac=1.0, random_state=0)
+
+    assert rule_fingerprints(shuffled) == rule_fingerprints(rules_df)
+
+
+def test_changed_and_new_rules_are_detected(rules_df):
+    """Test that an edited example and a new rule are selected, and nothing else."""
+    previous = rule_fingerprints(rules_df)
+    edited = rules_df.copy()
+    edited.loc[5, "negative_example_1"] = "edited"
+    new_rule = pd.DataFrame({"rule": ["rule new"], "positive_example_1": ["p"], "negative_example_1": ["n"]})
+    current = rule_fingerprints(pd.concat([edited, new_rule], ignore_index=True))
+
+    assert changed_rules(current, previous) == ["rule 0", "rule new"]
+    assert changed_rules(previous, previous) == []
+
+
+def test_incremental_rows_scale_with_the_change(rules_df):
+    """Test that changed rules are kept whole plus a seeded replay sample of the rest."""
+    rows = incremental_rows(rules_df, ["rule 3"], replay_fraction=0.5, seed=0)
+
+    assert (rows["rule"] == "rule 3").sum() == 20
+    assert (rows["rule"] != "rule 3").sum() == 10
+    assert rows.index.is_monotonic_increasing
+    assert rows.equals(incremental_rows(rules_df, ["rule 3"], replay_fraction=0.5, seed=0))
+
+
+def test_changeset_id_depends_on_fingerprints(rules_df):
+    """Test that the same change maps to the same id and a different change does not."""
+    current = rule_fingerprints(rules_df)
+
+    assert changeset_id(current, ["rule 1", "rule 2"]) == changeset_id(current, ["rule 2", "rule 1"])
+    assert changeset_id(current, ["rule 1"]) != changeset_id(dict(current, **{"rule 1": "other"}), ["rule 1"])
+
+
+def test_manifest_round_trip(tmp_path, rules_df):
+    """Test that a saved manifest loads back, and a missing one is empty."""
+    fingerprints = rule_fingerprints(rules_df)
+
+    assert load_manifest(str(tmp_path)) == {}
+    save_manifest(str(tmp_path / "final"), fingerprints)
+    assert load_manifest(str(tmp_path / "final")) == fingerprints
+
+
+def test_resume_picks_latest_checkpoint(tmp_path):
+    """Test that resuming finds the highest-numbered checkpoint, only when enabled."""
+    for step in (5, 40, 10):
+        (tmp_path / f"checkpoint-{step}").mkdir()
+
+    resuming = ModelTrainer(None, SimpleNamespace(resume_from_checkpoint=True))
+    assert resuming.resume_checkpoint(str(tmp_path)).endswith("checkpoint-40")
+    assert resuming.resume_checkpoint(str(tmp_path / "missing")) is None
+    assert ModelTrainer(None, SimpleNamespace(resume_from_checkpoint=False)).resume_checkpoint(str(tmp_path)) is None
@@ -0,0 +1,102 @@
+"""
+Tests for kNN-over-examples scoring.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.preprocessor import TextPreprocessor
+from src.inference.knn import ExactIndex, IVFIndex, RuleIndex, build_index
+from src.inference.predictor import ViolationPredictor
+
+
+def brute_force(queries, vectors, k):
+    distances = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+    ids = np.argsort(distances, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(distances, ids, axis=1), ids
+
+
+@pytest.fixture
+def clustered_vectors():
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 16)).astype(np.float32) * 4
+    vectors = centers[rng.integers(0, 20, 3000)] + rng.normal(size=(3000, 16)).astype(np.float32)
+    queries = centers[rng.integers(0, 20, 200)] + rng.normal(size=(200, 16)).astype(np.float32)
+    return vectors, queries
+
+
+class TestIndexes:
+    """Test suite for the exact and IVF indexes."""
+
+    def test_exact_matches_brute_force(self, clustered_vectors):
+        """Test that the blocked exact search returns the true neighbours."""
+        vectors, queries = clustered_vectors
+        distances, ids = ExactIndex(vectors).search(queries, 5)
+        expected_distances, expected_ids = brute_force(queries, vectors, 5)
+
+        np.testing.assert_array_equal(ids, expected_ids)
+        np.testing.assert_allclose(distances, expected_distances, rtol=1e-3, atol=1e-3)
+
+    def test_k_larger_than_index(self):
+        """Test that k is capped at the number of examples."""
+        distances, ids = ExactIndex(np.eye(3, dtype=np.float32)).search(np.zeros((2, 3), dtype=np.float32), 10)
+        assert distances.shape == ids.shape == (2, 3)
+
+    def test_ivf_recall(self, clustered_vectors):
+        """Test that the IVF index finds most of the exact neighbours."""
+        vectors, queries = clustered_vectors
+        _, ids = IVFIndex(vectors, n_probe=8).search(queries, 10)
+        _, expected_ids = brute_force(queries, vectors, 10)
+
+        recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(ids, expected_ids)])
+        assert recall > 0.9
+
+    def test_build_index_switches_on_size(self, clustered_vectors):
+        """Test that large example sets get an approximate index."""
+        vectors, _ = clustered_vectors
+        assert isinstance(build_index(vectors, exact_max_examples=5000), ExactIndex)
+        assert isinstance(build_index(vectors, exact_max_examples=1000), IVFIndex)
+
+
+class TestKnnPredictor:
+    """Test suite for the kNN scoring mode of ViolationPredictor."""
+
+    @pytest.fixture
+    def knn_data(self):
+        df = pd.DataFrame({"row_id": [1, 2, 3, 4], "body": ["a", "b", "a", "c"], "rule": ["R1", "R2", "R1", "R3"]})
+        text_to_embedding = {
+            "a": np.array([1.0, 0.0], dtype=np.float32),
+            "b": np.array([0.0, 1.0], dtype=np.float32),
+            "c": np.array([0.5, 0.5], dtype=np.float32),
+        }
+        rule_examples = {
+            "R1": {"positive": np.array([[1.0, 0.0], [0.9, 0.1]]), "negative": np.array([[-1.0, 0.0]])},
+            "R2": {"positive": np.array([[0.0, -1.0]]), "negative": np.array([[0.0, 1.0], [0.1, 0.9]])},
+        }
+        return df, text_to_embedding, rule_examples
+
+    def test_knn_scores(self, knn_data):
+        """Test that kNN scores follow the nearest examples and skip unknown rules."""
+        df, text_to_embedding, rule_examples = knn_data
+        predictor = ViolationPredictor(mode="knn")
+
+        row_ids, predictions = predictor.predict(
+            df, text_to_embedding, {}, TextPreprocessor(), rule_index=RuleIndex(rule_examples, k=2)
+        )
+
+        assert row_ids == [1, 3, 2]
+        assert predictions[0] == pytest.approx(predictions[1])
+        assert predictions[0] > 0 > predictions[2]
+        assert predictor.skipped_rows["missing_centroid"] == [4]
+
+    def test_knn_requires_index(self, knn_data):
+        """Test that kNN mode refuses to run without a rule index."""
+        df, text_to_embedding, _ = knn_data
+        with pytest.raises(ValueError):
+            ViolationPredictor(mode="knn").predict(df, text_to_embedding, {}, TextPreprocessor())
+
+    def test_unknown_mode(self):
+        """Test that an unknown scoring mode is rejected."""
+        with pytest.raises(ValueError):
+            ViolationPredictor(mode="cosine-lsh")
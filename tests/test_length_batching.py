@@ -0,0 +1,90 @@
+"""
+Tests for length-bucketed batch planning.
+"""
+
+import numpy as np
+import pytest
+
+from src.models.length_batching import iter_batches, padding_ratio, plan_batches
+
+
+class TestPlanBatches:
+    """Test suite for plan_batches."""
+
+    def test_fixed_batch_size_sorts_longest_first(self):
+        """Test that without a budget batches hold batch_size texts, longest first."""
+        batches = plan_batches([3, 10, 1, 7], batch_size=2)
+
+        assert [b.tolist() for b in batches] == [[1, 3], [0, 2]]
+
+    def test_token_budget_bounds_padded_batch(self):
+        """Test that each batch fits the budget given its longest member."""
+        lengths = [100, 5, 5, 5, 5, 50, 50]
+        batches = plan_batches(lengths, batch_size=2, max_tokens_per_batch=100)
+
+        for batch in batches:
+            assert len(batch) * max(lengths[i] for i in batch) <= 100
+        assert sorted(np.concatenate(batches).tolist()) == list(range(len(lengths)))
+        assert [len(b) for b in batches] == [1, 2, 4]
+
+    def test_text_over_budget_gets_own_batch(self):
+        """Test that a text longer than the budget is still encoded."""
+        batches = plan_batches([500, 2], batch_size=8, max_tokens_per_batch=100)
+
+        assert [b.tolist() for b in batches] == [[0], [1]]
+
+    def test_padding_ratio(self):
+        """Test padding ratio arithmetic, including the empty case."""
+        assert padding_ratio(75, 100) == 0.25
+        assert padding_ratio(0, 0) == 0.0
+
+
+class WordTokenizer:
+    """Pads whitespace tokens to the longest text of each call, counting texts seen."""
+
+    def __init__(self, padding_side="right"):
+        self.padding_side = padding_side
+        self.texts_seen = 0
+
+    def __call__(self, texts):
+        self.texts_seen += len(texts)
+        rows = [[len(word) for word in text.split()] for text in texts]
+        width = max(len(ids) for ids in rows)
+        input_ids = np.zeros((len(rows), width), dtype=np.int64)
+        mask = np.zeros_like(input_ids)
+        for i, ids in enumerate(rows):
+            span = slice(0, len(ids)) if self.padding_side == "right" else slice(width - len(ids), width)
+            input_ids[i, span] = ids
+            mask[i, span] = 1
+        return {"input_ids": input_ids, "attention_mask": mask, "modality": "text"}
+
+
+class TestIterBatches:
+    """Test suite for iter_batches."""
+
+    TEXTS = ["a bb ccc", "d", "ee ff", "g hh ii jj kk", "l", "mm nn"]
+
+    @pytest.mark.parametrize("padding_side", ["right", "left"])
+    def test_budget_batches_match_per_batch_tokenization(self, padding_side):
+        """Test that batches cut from a shared tokenization equal tokenizing each batch alone."""
+        tokenizer = WordTokenizer(padding_side)
+
+        batches = list(iter_batches(self.TEXTS, tokenizer, 4, max_tokens_per_batch=6, padding_side=padding_side))
+
+        assert tokenizer.texts_seen == len(self.TEXTS)
+        assert sorted(np.concatenate([indices for indices, _ in batches]).tolist()) == list(range(len(self.TEXTS)))
+        for indices, features in batches:
+            expected = WordTokenizer(padding_side)([self.TEXTS[i] for i in indices])
+            np.testing.assert_array_equal(features["input_ids"], expected["input_ids"])
+            np.testing.assert_array_equal(features["attention_mask"], expected["attention_mask"])
+            assert features["modality"] == "text"
+            assert features["attention_mask"].size <= 6 or len(indices) == 1
+
+    def test_fixed_batches_tokenize_each_text_once(self):
+        """Test that without a budget each batch is tokenized on its own, once."""
+        tokenizer = WordTokenizer()
+
+        batches = list(iter_batches(self.TEXTS, tokenizer, batch_size=4))
+
+        assert tokenizer.texts_seen == len(self.TEXTS)
+        assert [len(indices) for indices, _ in batches] == [4, 2]
@@ -0,0 +1,66 @@
+"""
+Tests for the in-process metrics registry.
+"""
+
+import pytest
+
+from src.utils.metrics import Histogram, MetricsRegistry
+
+
+class TestHistogram:
+    """Test suite for Histogram class."""
+
+    def test_observe_counts_and_sum(self):
+        """Test that observations land in the right buckets."""
+        histogram = Histogram(buckets=(1.0, 2.0))
+        for value in (0.5, 1.5, 1.5, 3.0):
+            histogram.observe(value)
+
+        assert histogram.counts == [1, 2, 1]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(6.5)
+
+    def test_quantile_within_bucket(self):
+        """Test that quantiles are interpolated inside the matching bucket."""
+        histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+        for _ in range(100):
+            histogram.observe(1.5)
+
+        assert 1.0 <= histogram.quantile(0.99) <= 2.0
+
+
+class TestMetricsRegistry:
+    """Test suite for MetricsRegistry class."""
+
+    def test_timer_records_duration(self):
+        """Test that the timer context manager observes one value."""
+        registry = MetricsRegistry()
+        with registry.timer("stage_seconds"):
+            pass
+
+        assert registry.histogram("stage_seconds").count == 1
+
+    def test_render_prometheus(self):
+        """Test the Prometheus text format output."""
+        registry = MetricsRegistry(prefix="test")
+        registry.counter("requests_total", "Requests", labels={"endpoint": "/predict"}).inc(3)
+        registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)).observe(0.5)
+        registry.gauge("queue_depth", lambda: 7, "Depth")
+
+        text = registry.render_prometheus()
+
+        assert "# TYPE test_requests_total counter" in text
+        assert 'test_requests_total{endpoint="/predict"} 3.0' in text
+        assert 'test_latency_seconds_bucket{le="0.1"} 0' in text
+        assert 'test_latency_seconds_bucket{le="1.0"} 1' in text
+        assert 'test_latency_seconds_bucket{le="+Inf"} 1' in text
+        assert "test_latency_seconds_count 1" in text
+        assert "test_queue_depth 7.0" in text
+
+    def test_help_filled_in_after_anonymous_lookup(self):
+        """Test that help text given later replaces an empty one."""
+        registry = MetricsRegistry(prefix="test")
+        registry.counter("texts_total")
+        registry.counter("texts_total", "Texts encoded")
+
+        assert "# HELP test_texts_total Texts encoded" in registry.render_prometheus()
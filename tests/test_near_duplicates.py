@@ -0,0 +1,81 @@
+"""
+Tests for near-duplicate embedding reuse.
+"""
+
+import numpy as np
+import pytest
+
+from src.features.embedding_store import EmbeddingStore
+from src.features.embeddings import EmbeddingGenerator
+from src.features.near_duplicates import NearDuplicateClusterer
+
+SPAM = "Buy cheap designer watches today at our online store, free shipping worldwide http://spam.example/a/123"
+
+
+class CountingModel:
+    """Stand-in for EmbeddingModel that records which texts it encodes."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=64, normalize=True):
+        self.encoded.extend(texts)
+        return np.array([[len(text), 0.5, -1.0] for text in texts], dtype=np.float32)
+
+
+class TestNearDuplicateClusterer:
+    """Test suite for NearDuplicateClusterer class."""
+
+    def test_variants_share_a_representative(self):
+        """Test that whitespace, unicode, case and URL-suffix variants cluster together."""
+        texts = [
+            SPAM,
+            SPAM.replace(" ", "   ", 3),
+            "ＢＵＹ" + SPAM[3:],
+            SPAM + "4",
+            "I really enjoyed this thread about growing tomatoes on a balcony",
+            "",
+        ]
+
+        representative = NearDuplicateClusterer(threshold=0.9).cluster(texts)
+
+        assert representative.tolist() == [0, 0, 0, 0, 4, 5]
+
+    def test_threshold_controls_merging(self):
+        """Test that a stricter threshold keeps a different username apart."""
+        texts = [SPAM + " contact u/alice", SPAM + " contact u/bob"]
+
+        assert NearDuplicateClusterer(threshold=0.7).cluster(texts).tolist() == [0, 0]
+        assert NearDuplicateClusterer(threshold=1.0).cluster(texts).tolist() == [0, 1]
+
+    def test_invalid_bands(self):
+        """Test that bands must divide the signature length."""
+        with pytest.raises(ValueError):
+            NearDuplicateClusterer(num_perm=64, bands=10)
+
+
+class TestNearDuplicateReuse:
+    """Test suite for near-duplicate reuse in EmbeddingGenerator."""
+
+    def test_members_reuse_representative_embedding(self, tmp_path):
+        """Test that only representatives are encoded and persisted."""
+        model = CountingModel()
+        store = EmbeddingStore(str(tmp_path), "model-a")
+        generator = EmbeddingGenerator(model, store=store, near_duplicates=NearDuplicateClusterer(threshold=0.9))
+
+        embeddings = generator.build_text_embeddings([SPAM, "unrelated text", SPAM + "4"])
+
+        assert model.encoded == [SPAM, "unrelated text"]
+        assert generator.encodes_saved == 1
+        np.testing.assert_array_equal(embeddings[SPAM + "4"], embeddings[SPAM])
+        assert len(store) == 2
+
+    def test_rules_are_never_merged(self):
+        """Test that rule texts opt out of near-duplicate reuse."""
+        model = CountingModel()
+        generator = EmbeddingGenerator(model, near_duplicates=NearDuplicateClusterer(threshold=0.5))
+
+        generator.build_text_embeddings([SPAM, SPAM + "4"], reuse_near_duplicates=False)
+
+        assert model.encoded == [SPAM, SPAM + "4"]
+        assert generator.encodes_saved == 0
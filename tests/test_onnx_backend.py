@@ -0,0 +1,113 @@
+"""
+Tests for the ONNX Runtime backend helpers.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from benchmarks.ddp_scaling import build_tiny_model
+from src.models.embedding_model import EmbeddingModel
+from src.models.onnx_backend import (
+    PARITY_TEXTS,
+    OnnxEncoder,
+    check_parity,
+    compare_embeddings,
+    exported_fingerprint,
+    onnx_model_path,
+)
+
+
+@pytest.fixture(scope="module")
+def tiny_model_dir(tmp_path_factory):
+    """A random two-layer BERT whose vocabulary covers the parity texts."""
+    pytest.importorskip("onnxruntime")
+    model_dir = str(tmp_path_factory.mktemp("tiny-bert"))
+    build_tiny_model(model_dir, PARITY_TEXTS + ["hello world"], hidden_size=32, layers=2, max_seq_length=64)
+    return model_dir
+
+
+def load_onnx(model_dir, onnx_dir, **kwargs):
+    model = EmbeddingModel(model_dir, max_seq_length=32, use_fp16=False, backend="onnx", onnx_dir=onnx_dir, **kwargs)
+    model.load_model()
+    return model
+
+
+class TestOnnxBackend:
+    """Test suite for ONNX backend selection and parity reporting."""
+
+    def test_unknown_backend_rejected(self):
+        """Test that only supported backends are accepted."""
+        with pytest.raises(ValueError):
+            EmbeddingModel(model_path="stub-model", backend="tensorrt")
+
+    def test_fingerprint_depends_on_quantization(self):
+        """Test that int8 and fp32 embeddings never share cache entries."""
+        fp32 = EmbeddingModel(model_path="stub-model", backend="onnx")
+        int8 = EmbeddingModel(model_path="stub-model", backend="onnx", quantize=True)
+        assert fp32.fingerprint != int8.fingerprint
+        assert fp32.cache_key("a") != int8.cache_key("a")
+
+    def test_compare_embeddings(self):
+        """Test drift summary between reference and candidate embeddings."""
+        reference = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+        candidate = np.array([[1.0, 0.0], [0.0, 0.5]], dtype=np.float32)
+
+        report = compare_embeddings(reference, candidate)
+
+        assert report["max_abs_diff"] == pytest.approx(0.5)
+        assert report["min_cosine"] == pytest.approx(1.0)
+
+    def test_export_matches_pytorch(self, tiny_model_dir, tmp_path):
+        """Test that the exported graph encodes like PyTorch and records its source."""
+        onnx_model = load_onnx(tiny_model_dir, str(tmp_path))
+        torch_model = EmbeddingModel(tiny_model_dir, max_seq_length=32, use_fp16=False)
+        torch_model.load_model()
+
+        texts = ["hello world", "ok"] + PARITY_TEXTS
+        reference = torch_model.encode(texts, show_progress_bar=False)
+        np.testing.assert_allclose(onnx_model.encode(texts, show_progress_bar=False), reference, atol=1e-4)
+        assert exported_fingerprint(str(tmp_path)) == torch_model.source_fingerprint
+
+        # A plain SentenceTransformer does not normalize; check_parity does it itself
+        report = check_parity(torch_model.model, onnx_model.onnx_encoder, texts)
+        assert report["min_cosine"] > 0.9999
+
+    def test_quantized_export_passes_cosine_parity(self, tiny_model_dir, tmp_path):
+        """Test that the int8 graph is exported and held to the cosine bound."""
+        model = load_onnx(tiny_model_dir, str(tmp_path), quantize=True)
+
+        assert os.path.exists(onnx_model_path(str(tmp_path), quantize=True))
+        assert model.encode(["hello world"], show_progress_bar=False).shape == (1, 32)
+
+    def test_reexport_when_source_changes(self, tiny_model_dir, tmp_path):
+        """Test that a graph exported from older weights is replaced on load."""
+        model_dir, onnx_dir = str(tmp_path / "model"), str(tmp_path / "onnx")
+        shutil.copytree(tiny_model_dir, model_dir)
+        load_onnx(model_dir, onnx_dir)
+        exported = exported_fingerprint(onnx_dir)
+        graph_mtime = os.stat(onnx_model_path(onnx_dir)).st_mtime_ns
+
+        load_onnx(model_dir, onnx_dir)
+        assert os.stat(onnx_model_path(onnx_dir)).st_mtime_ns == graph_mtime
+
+        # Retraining into the same directory rewrites the weights
+        later = os.path.getmtime(os.path.join(model_dir, "model.safetensors")) + 60
+        os.utime(os.path.join(model_dir, "model.safetensors"), (later, later))
+        model = load_onnx(model_dir, onnx_dir)
+
+        assert exported_fingerprint(onnx_dir) == model.source_fingerprint != exported
+        assert os.stat(onnx_model_path(onnx_dir)).st_mtime_ns != graph_mtime
+
+    def test_parity_failure_raises(self, tiny_model_dir, tmp_path):
+        """Test that a graph that drifts from the reference fails the check."""
+        load_onnx(tiny_model_dir, str(tmp_path))
+
+        class Shifted:
+            def encode(self, texts, show_progress_bar=False):
+                return OnnxEncoder(str(tmp_path)).encode(texts) + 0.1
+
+        with pytest.raises(AssertionError):
+            check_parity(Shifted(), OnnxEncoder(str(tmp_path)), PARITY_TEXTS)
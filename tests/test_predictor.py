@@ -101,3 +101,33 @@ class TestViolationPredictor:
 
         assert len(row_ids) == len(predictions)
         assert predictions.ndim == 1  # 1D array
+
+    def test_predict_reports_skipped_rows(self, sample_data):
+        """Test that rows without an embedding or centroid are reported."""
+        df, text_to_embedding, rule_centroids = sample_data
+        preprocessor = TextPreprocessor()
+
+        del text_to_embedding["Body 2"]
+        del rule_centroids["Rule B"]
+
+        predictor = ViolationPredictor()
+        predictor.predict(df, text_to_embedding, rule_centroids, preprocessor)
+
+        assert predictor.skipped_rows == {"missing_centroid": [3], "missing_embedding": [2]}
+
+    def test_predict_groups_rows_by_rule(self, sample_data):
+        """Test that output rows are grouped by rule in order of first appearance."""
+        df, text_to_embedding, rule_centroids = sample_data
+        df = pd.DataFrame(
+            {"row_id": [1, 2, 3], "body": ["Body 1", "Body 3", "Body 2"], "rule": ["Rule A", "Rule B", "Rule A"]}
+        )
+        preprocessor = TextPreprocessor()
+
+        predictor = ViolationPredictor()
+        row_ids, predictions = predictor.predict(df, text_to_embedding, rule_centroids, preprocessor)
+
+        assert row_ids == [1, 3, 2]
+        expected, _, _ = ViolationPredictor.score_embeddings(
+            text_to_embedding["Body 2"][None, :], rule_centroids["Rule A"]["positive"], rule_centroids["Rule A"]["negative"]
+        )
+        assert predictions[1] == pytest.approx(expected[0])
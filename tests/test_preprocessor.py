@@ -79,3 +79,25 @@ class TestTextPreprocessor:
 
         # Should only have non-None texts
         assert all(text is not None and text != "" for text in unique_texts)
+
+    def test_clean_series_matches_clean_text(self):
+        """Test vectorized cleaning against the scalar path, keeping NaN."""
+        series = pd.Series(["see https://www.a.com/x/y/z", None, "no links", "see https://www.a.com/x/y/z"])
+
+        cleaned = TextPreprocessor.clean_series(series)
+
+        assert cleaned[0] == TextPreprocessor.clean_text(series[0]) == "see <url>: (a.com/x/y)"
+        assert pd.isna(cleaned[1])
+        assert cleaned[2] == "no links"
+        assert list(cleaned.index) == list(series.index)
+
+    def test_add_clean_columns(self):
+        """Test that cleaned copies are attached once and reused."""
+        df = pd.DataFrame({"body": ["https://example.com/a"], "rule": ["r"]})
+
+        cleaned = TextPreprocessor.add_clean_columns(df)
+
+        assert "clean_body" not in df.columns
+        assert cleaned["clean_body"][0] == "<url>: (example.com/a)"
+        assert TextPreprocessor.add_clean_columns(cleaned) is cleaned
+        assert TextPreprocessor.cleaned_column(cleaned, "body").equals(cleaned["clean_body"])
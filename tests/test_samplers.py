@@ -0,0 +1,125 @@
+"""
+Tests for length-grouped triplet sampling and training memory settings.
+"""
+
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+from datasets import Dataset
+
+from config.model_config import TrainingConfig
+from src.models.samplers import LengthGroupedTripletSampler, triplet_lengths
+from src.models.trainer import ModelTrainer, estimate_activation_memory_mb
+
+
+def make_dataset(count=203, seed=0):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, 500, count)
+    return Dataset.from_dict(
+        {
+            "anchor": ["a" * n for n in lengths],
+            "positive": ["p"] * count,
+            "negative": ["n" * (n // 2) for n in lengths],
+        }
+    )
+
+
+class FakeTransformer:
+    """Indexable like a SentenceTransformer, exposing only its first module's config."""
+
+    def __init__(self, layers=12, hidden=768, heads=12, max_seq_length=256):
+        self.max_seq_length = max_seq_length
+        self.config = SimpleNamespace(num_hidden_layers=layers, hidden_size=hidden, num_attention_heads=heads)
+
+    def __getitem__(self, index):
+        return SimpleNamespace(auto_model=SimpleNamespace(config=self.config))
+
+
+def make_config(**overrides):
+    values = dict(
+        epochs=1, batch_size=32, learning_rate=2e-5, triplet_margin=0.25, augmentation_factor=1, subsample_fraction=1.0
+    )
+    values.update(overrides)
+    return TrainingConfig(**values)
+
+
+def test_triplet_lengths_use_longest_text():
+    """Test that a triplet's length is its longest text, with missing texts counted as empty."""
+    dataset = Dataset.from_dict({"anchor": ["abc", "a"], "positive": ["abcde", None], "negative": ["", "ab"]})
+
+    np.testing.assert_array_equal(triplet_lengths(dataset), [5, 2])
+    np.testing.assert_array_equal(triplet_lengths(dataset.select([1])), [2])
+
+
+def test_sampler_yields_every_index_once():
+    """Test that every triplet is sampled exactly once, with only the final batch short."""
+    dataset = make_dataset()
+    sampler = LengthGroupedTripletSampler(dataset, batch_size=16, drop_last=False, seed=1, group_batches=4)
+
+    batches = list(sampler)
+
+    assert len(batches) == len(sampler) == 13
+    assert sorted(i for batch in batches for i in batch) == list(range(len(dataset)))
+    assert all(len(batch) == 16 for batch in batches[:-1])
+
+    sampler.drop_last = True
+    assert len(list(sampler)) == len(sampler) == 12
+
+
+def test_sampler_groups_similar_lengths():
+    """Test that grouped batches need far less padding than random ones."""
+    dataset = make_dataset(count=2000)
+    lengths = triplet_lengths(dataset)
+    sampler = LengthGroupedTripletSampler(dataset, batch_size=16, drop_last=False, seed=0, group_batches=50)
+
+    def padded(batches):
+        return sum(lengths[batch].max() * len(batch) for batch in batches)
+
+    random_batches = np.array_split(np.random.default_rng(0).permutation(len(dataset)), len(sampler))
+    assert padded(list(sampler)) < 0.7 * padded(random_batches)
+
+
+def test_sampler_is_deterministic_per_seed_and_epoch():
+    """Test that the order depends only on the seed and the epoch."""
+    dataset = make_dataset()
+
+    def order(seed, epoch):
+        sampler = LengthGroupedTripletSampler(dataset, batch_size=16, drop_last=False, seed=seed)
+        sampler.set_epoch(epoch)
+        return list(sampler)
+
+    assert order(3, 0) == order(3, 0)
+    assert order(3, 0) != order(3, 1)
+    assert order(3, 0) != order(4, 0)
+
+
+def test_activation_estimate():
+    """Test the activation estimate against the per-layer formula, and its fallback."""
+    model = FakeTransformer(layers=2, hidden=64, heads=4, max_seq_length=128)
+
+    sequences = 8 * 3
+    expected = 2 * 128 * sequences * 64 * (34 + 5 * 4 * 128 / 64) / 2**20
+    assert np.isclose(estimate_activation_memory_mb(model, batch_size=8, bytes_per_value=2), expected)
+    assert np.isclose(estimate_activation_memory_mb(model, batch_size=8, bytes_per_value=4), 2 * expected)
+    assert estimate_activation_memory_mb(object(), batch_size=8) is None
+
+
+def test_auto_gradient_checkpointing_follows_budget():
+    """Test that "auto" checkpoints only above the budget and explicit settings win."""
+    model = FakeTransformer()
+    estimate = estimate_activation_memory_mb(model, batch_size=32)
+
+    assert not ModelTrainer(model, make_config(activation_memory_budget_mb=estimate * 2)).use_gradient_checkpointing()
+    assert ModelTrainer(model, make_config(activation_memory_budget_mb=estimate / 2)).use_gradient_checkpointing()
+    assert ModelTrainer(object(), make_config()).use_gradient_checkpointing()
+    explicit = make_config(gradient_checkpointing=False, activation_memory_budget_mb=1)
+    assert not ModelTrainer(model, explicit).use_gradient_checkpointing()
+
+
+def test_trainer_imports_sampler_lazily():
+    """Test that loading the trainer does not need the sampler base class."""
+    code = "import sys, src.models.trainer; assert 'src.models.samplers' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
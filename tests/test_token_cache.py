@@ -0,0 +1,175 @@
+"""
+Tests for the tokenized triplet cache and its collator.
+"""
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from src.data.token_cache import TOKEN_COLUMNS, TokenizedTripletCache, TokenizedTripletCollator, is_tokenized
+from src.data.triplet_dataset import TRIPLET_COLUMNS, TripletDatasetCreator
+from src.models.samplers import triplet_lengths
+
+
+class FakeTokenizer:
+    """Tokenizer over single-letter words; id 0 is padding, 27 unknown."""
+
+    pad_token_id = 0
+    padding_side = "right"
+    is_fast = False
+
+    def __init__(self):
+        self.vocab = {"[PAD]": 0, **{chr(ord("a") + i): i + 1 for i in range(26)}, "[UNK]": 27}
+
+    def get_vocab(self):
+        return dict(self.vocab)
+
+
+class FakeModel:
+    """Indexable like a SentenceTransformer, with a ``preprocess`` shaped like BERT's."""
+
+    def __init__(self, max_seq_length=4):
+        self.max_seq_length = max_seq_length
+        self.tokenizer = FakeTokenizer()
+        self.calls = 0
+
+    def __getitem__(self, index):
+        return SimpleNamespace(tokenizer=self.tokenizer, do_lower_case=False)
+
+    def preprocess(self, texts):
+        self.calls += 1
+        rows = [[self.tokenizer.vocab.get(word, 27) for word in text.split()][: self.max_seq_length] for text in texts]
+        width = max(len(ids) for ids in rows)
+        input_ids = torch.zeros((len(rows), width), dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+        for i, ids in enumerate(rows):
+            input_ids[i, : len(ids)] = torch.tensor(ids)
+            attention_mask[i, : len(ids)] = 1
+        return {
+            "input_ids": input_ids,
+            "token_type_ids": torch.zeros_like(input_ids),
+            "attention_mask": attention_mask,
+            "modality": "text",
+        }
+
+
+class LegacyFakeModel(FakeModel):
+    """Older sentence-transformers API: ``tokenize`` instead of ``preprocess``."""
+
+    def __getattribute__(self, name):
+        if name == "preprocess":
+            raise AttributeError(name)
+        return super().__getattribute__(name)
+
+    def tokenize(self, texts):
+        return FakeModel.preprocess(self, texts)
+
+
+@pytest.fixture
+def example_df():
+    return pd.DataFrame(
+        {
+            "rule": ["r1", "r2", "r3"],
+            "positive_example_1": ["a b c", "d e", "f g h i j k"],
+            "positive_example_2": ["b c", np.nan, "g"],
+            "negative_example_1": ["x y", "z", np.nan],
+            "negative_example_2": [np.nan, "w v u", "t"],
+        }
+    )
+
+
+def make_creator(seed=0, augmentation_factor=3):
+    return TripletDatasetCreator(SimpleNamespace(augmentation_factor=augmentation_factor, subsample_fraction=1.0, seed=seed))
+
+
+def test_cache_matches_text_triplets(tmp_path, example_df):
+    """Test that cached ids are the unpadded tokenization of the creator's triplets."""
+    model = FakeModel()
+    dataset = TokenizedTripletCache(str(tmp_path)).get_or_build(example_df, model, make_creator())
+    texts = make_creator().create_triplet_dataset(example_df)
+
+    assert is_tokenized(dataset) and not is_tokenized(texts)
+    assert dataset.column_names == TOKEN_COLUMNS
+    assert len(dataset) == len(texts)
+    for name in TRIPLET_COLUMNS:
+        expected = [model.preprocess([text])["input_ids"][0].tolist() for text in texts[name]]
+        assert dataset[f"{name}_input_ids"] == expected
+
+
+def test_cache_hit_skips_tokenization(tmp_path, example_df):
+    """Test that a second build with the same inputs reuses the entry untouched."""
+    cache = TokenizedTripletCache(str(tmp_path))
+    model = FakeModel()
+    first = cache.get_or_build(example_df, model, make_creator())
+    calls = model.calls
+
+    second = cache.get_or_build(example_df, model, make_creator())
+
+    assert model.calls == calls
+    assert second[:] == first[:]
+    assert os.listdir(tmp_path) == [cache.fingerprint(example_df, model, make_creator().config)]
+
+
+def test_fingerprint_tracks_inputs(example_df):
+    """Test that data, tokenizer length and triplet sampling settings all change the key."""
+    fingerprint = TokenizedTripletCache.fingerprint
+    config = make_creator().config
+    base = fingerprint(example_df, FakeModel(), config)
+
+    assert fingerprint(example_df.copy(), FakeModel(), config) == base
+    edited = example_df.copy()
+    edited.loc[0, "negative_example_1"] = "x y z"
+    assert fingerprint(edited, FakeModel(), config) != base
+    assert fingerprint(example_df, FakeModel(max_seq_length=8), config) != base
+    assert fingerprint(example_df, FakeModel(), make_creator(seed=1).config) != base
+    assert fingerprint(example_df, FakeModel(), make_creator(augmentation_factor=2).config) != base
+
+
+def test_collator_matches_text_batches(tmp_path, example_df):
+    """Test that collated cached ids equal the model's own padded preprocessing."""
+    model = FakeModel()
+    dataset = TokenizedTripletCache(str(tmp_path)).get_or_build(example_df, model, make_creator())
+    texts = make_creator().create_triplet_dataset(example_df)
+    collator = TokenizedTripletCollator.from_model(model)
+
+    batch = collator([dataset[i] for i in range(4)])
+
+    for name in TRIPLET_COLUMNS:
+        expected = model.preprocess(texts[name][:4])
+        for key in ("input_ids", "token_type_ids", "attention_mask"):
+            torch.testing.assert_close(batch[f"{name}_{key}"], expected[key])
+        assert batch[f"{name}_modality"] == "text"
+
+
+def test_older_sentence_transformers_tokenize(tmp_path, example_df):
+    """Test that models exposing only ``tokenize`` build the same entry and batches."""
+    model = LegacyFakeModel()
+    dataset = TokenizedTripletCache(str(tmp_path)).get_or_build(example_df, model, make_creator())
+    expected = TokenizedTripletCache(str(tmp_path / "current")).get_or_build(example_df, FakeModel(), make_creator())
+
+    assert not hasattr(model, "preprocess")
+    assert dataset[:] == expected[:]
+    batch = TokenizedTripletCollator.from_model(model)([dataset[i] for i in range(2)])
+    assert batch["anchor_modality"] == "text"
+
+
+def test_collator_left_padding():
+    """Test that left padding right-aligns ids and mask."""
+    batch = TokenizedTripletCollator(pad_token_id=9, padding_side="left")(
+        [{name: ids for name in TOKEN_COLUMNS} for ids in ([1, 2, 3], [4])]
+    )
+
+    torch.testing.assert_close(batch["anchor_input_ids"], torch.tensor([[1, 2, 3], [9, 9, 4]]))
+    torch.testing.assert_close(batch["anchor_attention_mask"], torch.tensor([[1, 1, 1], [0, 0, 1]]))
+
+
+def test_triplet_lengths_count_tokens(tmp_path, example_df):
+    """Test that sampler lengths of a tokenized dataset are token counts."""
+    dataset = TokenizedTripletCache(str(tmp_path)).get_or_build(example_df, FakeModel(), make_creator())
+
+    expected = [max(len(dataset[i][name]) for name in TOKEN_COLUMNS) for i in range(len(dataset))]
+    np.testing.assert_array_equal(triplet_lengths(dataset), expected)
@@ -0,0 +1,81 @@
+"""
+Tests for triplet dataset creation.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.triplet_dataset import TripletDatasetCreator
+
+
+@pytest.fixture
+def example_df():
+    """Rows with missing examples; the last two rows cannot form a triplet."""
+    return pd.DataFrame(
+        {
+            "rule": ["r1", "r1", "r2", "r2", "r3"],
+            "positive_example_1": ["p1", np.nan, "p3", "p4", np.nan],
+            "positive_example_2": ["p2", "p5", np.nan, "p6", np.nan],
+            "negative_example_1": ["n1", "n2", np.nan, np.nan, "n5"],
+            "negative_example_2": [np.nan, "n3", "n4", np.nan, "n6"],
+        }
+    )
+
+
+def make_creator(augmentation_factor=4, subsample_fraction=1.0, seed=0):
+    return TripletDatasetCreator(
+        SimpleNamespace(augmentation_factor=augmentation_factor, subsample_fraction=subsample_fraction, seed=seed)
+    )
+
+
+class TestTripletDatasetCreator:
+    """Test suite for TripletDatasetCreator class."""
+
+    def test_triplets_come_from_their_row(self, example_df):
+        """Test that every triplet uses its own row's non-null examples."""
+        dataset = make_creator().create_triplet_dataset(example_df)
+        allowed = {
+            "p1": ({"p1", "p2"}, {"n1"}),
+            "p2": ({"p1", "p2"}, {"n1"}),
+            "p5": ({"p5"}, {"n2", "n3"}),
+            "p3": ({"p3"}, {"n4"}),
+        }
+
+        assert len(dataset) == 3 * 4
+        for triplet in dataset:
+            positives, negatives = allowed[triplet["anchor"]]
+            assert triplet["positive"] in positives
+            assert triplet["negative"] in negatives
+
+    def test_seeded_and_reproducible(self, example_df):
+        """Test that the seed fixes the triplets and a new seed changes them."""
+        first = make_creator(augmentation_factor=50, seed=1).create_triplet_dataset(example_df)
+        second = make_creator(augmentation_factor=50, seed=1).create_triplet_dataset(example_df)
+        other = make_creator(augmentation_factor=50, seed=2).create_triplet_dataset(example_df)
+
+        assert first.to_list() == second.to_list()
+        assert first.to_list() != other.to_list()
+
+    def test_subsample_is_exact(self, example_df):
+        """Test that subsampling keeps exactly the requested share."""
+        creator = make_creator(augmentation_factor=10, subsample_fraction=0.35)
+
+        assert len(creator.create_triplet_dataset(example_df)) == creator.count_triplets(example_df) == 10
+
+    def test_streaming_matches_in_memory(self, example_df, tmp_path):
+        """Test that the iterable dataset and Arrow shards yield the in-memory triplets."""
+        creator = make_creator(augmentation_factor=7, subsample_fraction=0.5)
+        expected = creator.create_triplet_dataset(example_df).to_list()
+
+        iterable = creator.create_iterable_dataset(example_df)
+        streamed = list(iterable)
+        paths = creator.write_triplet_shards(example_df, str(tmp_path), shard_rows=4)
+        sharded = creator.load_triplet_shards(paths).to_list()
+
+        assert streamed == expected
+        assert iterable.features == creator.create_triplet_dataset(example_df).features
+        assert len(paths) == 3
+        assert sharded == expected